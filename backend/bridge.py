@@ -1,24 +1,139 @@
 from .services.bookmark_service import BookmarkService
 from .services.draw_service import DrawService
+from .services.highlight_reel import REEL_LABELS, event_ranges
+from .services.media_identity import MediaResolver
 from .services.project_data_service import ProjectDataService
-from .services.video_editor_service import VideoEditorService
+from .services.task_registry import TaskRegistry
+import json
 import os
+import threading
 import webview
 
 
+# Services below import cv2/numpy, so they are built on first use (or by prewarm) instead of before the window opens.
+LAZY_SERVICES = ("analytics", "heatmaps", "geometry", "frames", "images", "editor", "tracking", "scenes", "waveforms")
+PREWARM_ORDER = ("frames", "editor", "heatmaps", "analytics", "waveforms")
+
+
 class ApiBridge:
     def __init__(self, media_server=None):
-        self.editor = VideoEditorService()
-        self.bookmarks = BookmarkService()
-        self.draw = DrawService(self.editor)
-        self.project_data = ProjectDataService()
+        self.media = MediaResolver()
+        self.tasks = TaskRegistry()
+        self.project_data = ProjectDataService(media=self.media)
+        self.bookmarks = BookmarkService(self.media)
+        self.draw = DrawService(lambda: self.editor, media=self.media)
+        self._services_lock = threading.RLock()
         self.media_server = media_server
+        if media_server:
+            media_server.route("/waveform", lambda query: self.waveforms.serve(query))
+            media_server.route("/frame", lambda query: self.frames.serve(query))
+            # Tile URLs carry the image version, so a tile never changes under its URL.
+            media_server.route("/tile", lambda query: self.images.serve(query), "max-age=31536000, immutable")
+
+    def __getattr__(self, name):
+        # Only called for attributes that are not set yet; dir() does not list them, so pywebview does not build them either.
+        if name not in LAZY_SERVICES:
+            raise AttributeError(name)
+        with self._services_lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = self._create(name)
+            return self.__dict__[name]
+
+    def _create(self, name):
+        if name == "analytics":
+            from .services.tracking_analytics_service import TrackingAnalyticsService
+            return TrackingAnalyticsService(self.project_data)
+        if name == "heatmaps":
+            from .services.heatmap_service import HeatmapService
+            return HeatmapService(self.project_data)
+        if name == "geometry":
+            from .services.tactical_geometry_service import TacticalGeometryService
+            return TacticalGeometryService(self.project_data)
+        if name == "frames":
+            from .services.frame_service import FrameService
+            return FrameService(self.media)
+        if name == "images":
+            from .services.image_service import ImageService
+            return ImageService(self.media, self.tasks)
+        if name == "editor":
+            from .services.video_editor_service import VideoEditorService
+            return VideoEditorService(self.media, layers=self.heatmaps, tasks=self.tasks, frames=self.frames, images=self.images)
+        if name == "tracking":
+            from .services.player_tracking_service import PlayerTrackingService
+            return PlayerTrackingService(self.project_data, self.media, self.tasks)
+        if name == "scenes":
+            from .services.scene_detection_service import SceneDetectionService
+            return SceneDetectionService(self.project_data, self.media, self.tasks)
+        from .services.waveform_service import WaveformService
+        return WaveformService(self.project_data, self.media, self.tasks)
+
+    def prewarm(self, *_):
+        for name in PREWARM_ORDER:
+            getattr(self, name)
 
     def load_project(self, video_path):
         return self.project_data.load(video_path)
 
     def save_project(self, params):
-        return self.project_data.save(params.get("video_path"), params.get("data"))
+        return self.project_data.save(params.get("video_path"), params.get("data"), compact=params.get("compact"))
+
+    def patch_project(self, params):
+        params = params or {}
+        return self.project_data.patch(params.get("video_path"), params.get("revision"), params.get("ops"))
+
+    def get_revisions(self, video_path):
+        return {
+            "project": self.project_data.revision(video_path),
+            "drawings": self.draw.revision(video_path),
+            "bookmarks": self.bookmarks.revision(video_path),
+        }
+
+    def get_tracking_analytics(self, params):
+        params = params or {}
+        return self.analytics.get_analytics(
+            params.get("video_path"),
+            rate=params.get("rate", 10),
+            time_from=params.get("time_from"),
+            time_to=params.get("time_to"),
+            step=params.get("step", 1),
+            metrics=params.get("metrics"),
+            triangles=params.get("triangles"),
+        )
+
+    def get_tactical_geometry(self, params):
+        params = params or {}
+        return self.geometry.get_geometry(
+            params.get("video_path"),
+            time_from=params.get("time_from"),
+            time_to=params.get("time_to"),
+            rate=params.get("rate", 5),
+            kinds=params.get("kinds"),
+            pressure_radius=params.get("pressure_radius", 3.0),
+            lane_width=params.get("lane_width", 1.0),
+            save=bool(params.get("save")),
+        )
+
+    def get_heatmap(self, params):
+        params = params or {}
+        return self.heatmaps.get_heatmap(
+            params.get("video_path"),
+            time_from=params.get("time_from"),
+            time_to=params.get("time_to"),
+            group=params.get("group", "all"),
+            width=params.get("width", 960),
+            height=params.get("height", 540),
+            sigma=params.get("sigma", 1.5),
+            opacity=params.get("opacity", 0.65),
+        )
+
+    def get_ghost_trail(self, params):
+        params = params or {}
+        return self.heatmaps.get_ghost_trail(
+            params.get("video_path"),
+            params.get("time", 0),
+            length=params.get("length", 3),
+            group=params.get("group", "all"),
+        )
 
     def choose_video_file(self):
         return self.choose_media_file()
@@ -83,6 +198,79 @@ class ApiBridge:
             quality=params.get("quality", 90),
             include_draws=params.get("include_draws", True),
             overlay_data=params.get("overlay_data"),
+            profile=params.get("profile"),
+            target_size_mb=params.get("target_size_mb"),
+            max_height=params.get("max_height"),
+            fps=params.get("fps"),
+            decoder=params.get("decoder", "auto"),
+            trace=params.get("trace", False),
+            threads=params.get("threads"),
+        )
+
+    def export_reel(self, params):
+        params = params or {}
+        video_path = params.get("video_path")
+        ranges = params.get("ranges")
+        if ranges is None:
+            events = self.project_data.snapshot(video_path).get("events") or []
+            ranges = event_ranges(
+                events,
+                labels=params.get("labels") or REEL_LABELS,
+                event_ids=params.get("event_ids"),
+                pre_roll=params.get("pre_roll", 3),
+                post_roll=params.get("post_roll", 5),
+            )
+        return self.editor.export_reel(
+            video_path,
+            ranges,
+            overlay_data=params.get("overlay_data"),
+            include_draws=params.get("include_draws", True),
+            profile=params.get("profile"),
+            quality=params.get("quality", 90),
+            max_height=params.get("max_height"),
+            decoder=params.get("decoder", "auto"),
+            trace=params.get("trace", False),
+            threads=params.get("threads"),
+        )
+
+    def export_still(self, params):
+        params = params or {}
+        return self.editor.export_still(
+            params.get("video_path"),
+            overlay_data=params.get("overlay_data"),
+            display_time=params.get("time", 0),
+            image_format=params.get("format", "png"),
+            quality=params.get("quality", 95),
+        )
+
+    def get_image_tiles(self, image_path):
+        result = self.images.get_tiles(image_path)
+        if result.get("tiled") and self.media_server:
+            result["tile_url"] = self.media_server.url_for(image_path, "/tile") + f"&v={result['version']}" + "&level={level}&x={x}&y={y}"
+        return result
+
+    def preview_overlays(self, params):
+        params = params or {}
+        if params.get("end") is not None:
+            return self.editor.render_preview_strip(
+                params.get("video_path"),
+                params.get("start", 0),
+                params.get("end"),
+                count=params.get("count", 8),
+                overlay_data=params.get("overlay_data"),
+                width=params.get("width", 320),
+                columns=params.get("columns"),
+                max_height=params.get("max_height"),
+                profile=params.get("profile"),
+            )
+        return self.editor.render_preview(
+            params.get("video_path"),
+            params.get("time", 0),
+            overlay_data=params.get("overlay_data"),
+            image_format=params.get("format", "jpeg"),
+            width=params.get("width"),
+            max_height=params.get("max_height"),
+            profile=params.get("profile"),
         )
 
     def get_export_status(self, task_id):
@@ -91,6 +279,72 @@ class ApiBridge:
     def cancel_export(self, task_id):
         return self.editor.cancel_export(task_id)
 
+    def start_tracking(self, params):
+        params = params or {}
+        return self.tracking.start_tracking(
+            params.get("video_path"),
+            params.get("time_from"),
+            time_to=params.get("time_to"),
+            targets=params.get("targets"),
+            rate=params.get("rate", 10),
+        )
+
+    def start_scene_detection(self, params):
+        params = params or {}
+        return self.scenes.start_detection(
+            params.get("video_path"),
+            time_from=params.get("time_from", 0),
+            time_to=params.get("time_to"),
+            sample_rate=params.get("sample_rate", 10),
+            cut_threshold=params.get("cut_threshold", 0.3),
+            activity_factor=params.get("activity_factor", 2.5),
+        )
+
+    def get_waveform(self, params):
+        params = params or {}
+        return self.waveforms.get_waveform(
+            params.get("video_path"),
+            time_from=params.get("time_from", 0),
+            time_to=params.get("time_to"),
+            pixels=params.get("pixels", 1000),
+        )
+
+    def get_audio_peaks(self, params):
+        params = params or {}
+        return self.waveforms.get_audio_peaks(params.get("video_path"), rise_db=params.get("rise_db", 10.0), save=bool(params.get("save")))
+
+    def get_frame(self, params):
+        params = params or {}
+        return self.frames.get_frame(
+            params.get("video_path"),
+            seconds=params.get("time"),
+            index=params.get("frame"),
+            image_format=params.get("format", "jpeg"),
+            quality=params.get("quality", 90),
+            width=params.get("width"),
+        )
+
+    def get_task_status(self, task_id):
+        return self.tasks.status(task_id)
+
+    def cancel_task(self, task_id):
+        return self.tasks.cancel(task_id)
+
+    def subscribe_tasks(self, params=None):
+        params = params or {}
+        subscription = self.tasks.events.subscribe(self._push_task_event, params.get("task_ids"))
+        return {"status": "success", "subscription": subscription}
+
+    def unsubscribe_tasks(self, subscription):
+        if not self.tasks.events.unsubscribe(subscription):
+            return {"status": "error", "message": "Subscription was not found."}
+        return {"status": "success"}
+
+    def _push_task_event(self, task):
+        window = webview.windows[0] if webview.windows else None
+        if window:
+            window.evaluate_js(f"window.dispatchEvent(new CustomEvent('motuo:task', {{ detail: {json.dumps(task)} }}))")
+
     def open_path_in_explorer(self, path):
         clean_path = os.path.abspath(str(path or ""))
         target = clean_path if os.path.isdir(clean_path) else os.path.dirname(clean_path)
@@ -105,8 +359,14 @@ class ApiBridge:
     def save_bookmarks(self, params):
         return self.bookmarks.save_marks(params["video_path"], params["marks"])
 
+    def patch_bookmarks(self, params):
+        return self.bookmarks.patch_marks(params["video_path"], params.get("revision"), params.get("ops"))
+
     def save_drawings(self, params):
-        return self.draw.save_drawing_data(params["video_path"], params["drawing_data"])
+        return self.draw.save_drawing_data(params["video_path"], params["drawing_data"], compact=params.get("compact"))
 
     def get_drawings(self, video_path):
         return self.draw.get_drawings(video_path)
+
+    def patch_drawings(self, params):
+        return self.draw.patch_drawing_data(params["video_path"], params.get("revision"), params.get("ops"))
@@ -1,24 +1,28 @@
 import json
-import os
+
+from .document_patch import DocumentStore, RevisionConflict, apply_list_ops
+from .media_identity import MediaResolver
 
 class BookmarkService:
-    def __init__(self):
+    def __init__(self, media=None):
         self.extension = ".bookmarks.json"
+        self.media = media or MediaResolver()
+        self.store = DocumentStore()
 
     def _get_json_path(self, video_path):
-        # Limpiar ruta de protocolos de navegador si existen
-        clean_path = video_path.replace('file:///', '').replace('file://', '')
-        # Si sigue siendo un blob o ruta inválida, fallar preventivamente
-        if "http://localhost" in clean_path or "blob:" in clean_path:
-            raise ValueError("Ruta de video inválida para guardar marcadores.")
-        return os.path.normpath(clean_path) + self.extension
+        # El resolver limpia protocolos de navegador y rechaza blobs o URLs remotas
+        return self.media.resolve(video_path).sidecar(self.extension)
 
     def get_list(self, video_path):
         try:
             path = self._get_json_path(video_path)
-            if not os.path.exists(path): return []
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    marks = json.load(f)
+            except FileNotFoundError:
+                return []
+            self.store.remember(path, marks)
+            return list(marks)
         except Exception as e:
             print(f"Error cargando marcadores: {e}")
             return []
@@ -26,9 +30,31 @@ class BookmarkService:
     def save_marks(self, video_path, marks_list):
         try:
             path = self._get_json_path(video_path)
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(marks_list, f, indent=4, ensure_ascii=False)
-            return {"status": "success"}
+            with self.store.lock(path):
+                revision = self.store.next_revision(path)
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(marks_list, f, indent=4, ensure_ascii=False)
+                self.store.remember(path, marks_list, revision)
+            return {"status": "success", "revision": revision}
         except Exception as e:
             print(f"Error guardando marcadores: {e}")
+            return {"status": "error", "message": str(e)}
+
+    def revision(self, video_path):
+        return self.store.revision(self._get_json_path(video_path))
+
+    def patch_marks(self, video_path, revision, ops):
+        try:
+            path = self._get_json_path(video_path)
+            with self.store.lock(path):
+                marks = self.store.cached(path)
+                if marks is None:
+                    marks = self.get_list(video_path)
+                self.store.check(path, revision)
+                # Los marcadores no tienen id: se editan por indice (insert/replace/remove)
+                return self.save_marks(video_path, apply_list_ops(marks, ops))
+        except RevisionConflict as conflict:
+            return {"status": "conflict", "revision": conflict.revision, "message": str(conflict)}
+        except Exception as e:
+            print(f"Error aplicando cambios a marcadores: {e}")
             return {"status": "error", "message": str(e)}
\ No newline at end of file
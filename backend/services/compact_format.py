@@ -0,0 +1,158 @@
+import json
+import math
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+
+
+MAGIC = b"MOTUOC1\n"
+# Compact documents never take the .json name, so older builds and other tools never read binary as JSON.
+COMPACT_EXTENSION = ".motuo"
+# Coordinates are percentages of the frame; 1e-4 % keeps sub-pixel precision even on 8K sources.
+# Packing is lossy: every packed coordinate is rounded to the nearest 1 / SCALE (at most 5e-5 off).
+SCALE = 10000
+# Free-line paths written by the editor ("M x y L x y ...") are packed like point lists and written back
+# in the same form with at most four decimals. Any other path string stays in the JSON header as is.
+_PATH = re.compile(r"M -?\d+(?:\.\d+)? -?\d+(?:\.\d+)?(?: L -?\d+(?:\.\d+)? -?\d+(?:\.\d+)?)*")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_LIMIT = (2 ** 31 - 1) / SCALE
+_HEADER = struct.Struct("<I")
+
+
+def compact_path(path):
+    base, extension = os.path.splitext(path)
+    return (base if extension == ".json" else path) + COMPACT_EXTENSION
+
+
+def stored_path(path):
+    # The newer of the two files wins, so a JSON save from an older build is not shadowed by a stale compact file.
+    compact = compact_path(path)
+    try:
+        compact_mtime = os.stat(compact).st_mtime_ns
+    except OSError:
+        return path
+    try:
+        return compact if compact_mtime >= os.stat(path).st_mtime_ns else path
+    except OSError:
+        return compact
+
+
+def write_document(path, data, compact=None, indent=2):
+    if compact is None:
+        compact = is_compact_file(stored_path(path))
+    target = compact_path(path) if compact else path
+    temp_path = f"{target}.tmp"
+    if compact:
+        values = array("i")
+        header = json.dumps(_pack(data, values), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        header = zlib.compress(header, 1)
+        if sys.byteorder == "big":
+            values.byteswap()
+        with open(temp_path, "wb") as file:
+            file.write(MAGIC)
+            file.write(_HEADER.pack(len(header)))
+            file.write(header)
+            file.write(values.tobytes())
+    else:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=indent, ensure_ascii=False)
+    os.replace(temp_path, target)
+    stale = path if compact else compact_path(path)
+    if os.path.exists(stale):
+        os.remove(stale)
+    return target
+
+
+def read_document(path):
+    with open(stored_path(path), "rb") as file:
+        raw = file.read()
+    if not raw.startswith(MAGIC):
+        return json.loads(raw.decode("utf-8"))
+
+    offset = len(MAGIC)
+    (header_length,) = _HEADER.unpack_from(raw, offset)
+    offset += _HEADER.size
+    header = json.loads(zlib.decompress(raw[offset:offset + header_length]).decode("utf-8"))
+    values = array("i")
+    values.frombytes(raw[offset + header_length:])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return _unpack(header, [value / SCALE for value in values])
+
+
+def is_compact_file(path):
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _pack(value, values):
+    if isinstance(value, dict):
+        # User keys starting with "$" get one more "$", so they can never be taken for a "$pts" or "$path" placeholder.
+        return {_escape(key): _pack_path(child, values) if key == "path" else _pack(child, values) for key, child in value.items()}
+    if isinstance(value, list):
+        if value and all(_is_xy(point) for point in value):
+            offset = len(values)
+            for point in value:
+                values.append(round(point["x"] * SCALE))
+                values.append(round(point["y"] * SCALE))
+            return {"$pts": [offset, len(value)]}
+        return [_pack(child, values) for child in value]
+    return value
+
+
+def _pack_path(value, values):
+    if not isinstance(value, str) or not _PATH.fullmatch(value):
+        return _pack(value, values)
+    numbers = [float(number) for number in _NUMBER.findall(value)]
+    if not all(_is_finite(number) for number in numbers):
+        return value
+    offset = len(values)
+    values.extend(round(number * SCALE) for number in numbers)
+    return {"$path": [offset, len(numbers) // 2]}
+
+
+def _unpack(value, values):
+    if isinstance(value, dict):
+        if len(value) == 1 and "$pts" in value:
+            offset, count = value["$pts"]
+            coordinates = iter(values[offset:offset + 2 * count])
+            return [{"x": x, "y": y} for x, y in zip(coordinates, coordinates)]
+        if len(value) == 1 and "$path" in value:
+            offset, count = value["$path"]
+            coordinates = iter(values[offset:offset + 2 * count])
+            return " ".join(f"{'L' if index else 'M'} {_format(x)} {_format(y)}" for index, (x, y) in enumerate(zip(coordinates, coordinates)))
+        return {_unescape(key): _unpack(child, values) for key, child in value.items()}
+    if isinstance(value, list):
+        return [_unpack(child, values) for child in value]
+    return value
+
+
+def _format(value):
+    text = f"{value:.4f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _escape(key):
+    return f"${key}" if isinstance(key, str) and key.startswith("$") else key
+
+
+def _unescape(key):
+    return key[1:] if key.startswith("$$") else key
+
+
+def _is_xy(point):
+    if not isinstance(point, dict) or len(point) != 2:
+        return False
+    x = point.get("x")
+    y = point.get("y")
+    return _is_finite(x) and _is_finite(y)
+
+
+def _is_finite(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) and abs(value) < _LIMIT
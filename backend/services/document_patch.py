@@ -0,0 +1,136 @@
+import copy
+import os
+import threading
+
+from .compact_format import stored_path
+
+
+LIST_OPS = {"upsert", "update", "delete", "insert", "replace", "remove"}
+_DELETED = object()
+
+
+class RevisionConflict(Exception):
+    def __init__(self, revision):
+        super().__init__("Document was changed by another save. Reload and retry.")
+        self.revision = revision
+
+
+class DocumentStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._path_locks = {}
+
+    def lock(self, path):
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.RLock())
+
+    def revision(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+            return entry["revision"] if entry else 0
+
+    def check(self, path, revision):
+        current = self.revision(path)
+        if revision is not None and int(revision) != current:
+            raise RevisionConflict(current)
+        return current
+
+    def cached(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+        if not entry or entry["data"] is None or entry["signature"] != _signature(path):
+            return None
+        return entry["data"]
+
+    def remember(self, path, data, revision=None):
+        # The cache keeps its own copy: callers may edit what load() or save() handed them without touching it.
+        data = copy.deepcopy(data)
+        with self._lock:
+            entry = self._entries.get(path)
+            if revision is None:
+                revision = entry["revision"] if entry else 0
+            self._entries[path] = {"data": data, "revision": revision, "signature": _signature(path)}
+            return revision
+
+    def next_revision(self, path):
+        return self.revision(path) + 1
+
+
+def apply_list_ops(items, ops):
+    result = list(items or [])
+    positions = None
+    for op in ops or []:
+        kind = (op or {}).get("op")
+        if kind not in LIST_OPS:
+            raise ValueError(f"Unknown patch op: {kind}")
+
+        if kind in {"insert", "replace", "remove"}:
+            index = int(op.get("index"))
+            if positions is not None:
+                result = [item for item in result if item is not _DELETED]
+            positions = None
+            if kind == "insert":
+                result.insert(max(0, min(index, len(result))), op.get("item"))
+                continue
+            if not 0 <= index < len(result):
+                raise ValueError(f"Patch index out of range: {index}")
+            if kind == "replace":
+                result[index] = op.get("item")
+            else:
+                del result[index]
+            continue
+
+        if positions is None:
+            positions = {item["id"]: index for index, item in enumerate(result) if isinstance(item, dict) and item.get("id") is not None}
+        item = op.get("item") or {}
+        item_id = op.get("id", item.get("id"))
+        if item_id is None:
+            raise ValueError(f"Patch op needs an id: {kind}")
+        position = positions.get(item_id)
+        if kind == "upsert":
+            if position is None:
+                positions[item_id] = len(result)
+                result.append(item)
+            else:
+                result[position] = item
+        elif position is None:
+            raise ValueError(f"Patch target was not found: {item_id}")
+        elif kind == "update":
+            result[position] = {**result[position], **(op.get("patch") or {})}
+        else:
+            # Deleted slots are compacted once at the end, so bulk deletes stay linear.
+            result[position] = _DELETED
+            del positions[item_id]
+    if positions is not None:
+        result = [item for item in result if item is not _DELETED]
+    return result
+
+
+def apply_document_ops(data, ops, collections):
+    result = dict(data or {})
+    pending = {}
+    for op in ops or []:
+        kind = (op or {}).get("op")
+        if kind == "set":
+            key = op.get("key")
+            if not key or key in collections or key in {"video_path", "revision"}:
+                raise ValueError(f"Key cannot be set by patch: {key}")
+            result[key] = op.get("value")
+            continue
+        collection = op.get("collection")
+        if collection not in collections:
+            raise ValueError(f"Unknown patch collection: {collection}")
+        pending.setdefault(collection, []).append(op)
+
+    for collection, collection_ops in pending.items():
+        result[collection] = apply_list_ops(result.get(collection), collection_ops)
+    return result
+
+
+def _signature(path):
+    try:
+        stat = os.stat(stored_path(path))
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
@@ -1,36 +1,59 @@
-import json
-import os
+from .compact_format import read_document, write_document
+from .document_patch import DocumentStore, RevisionConflict, apply_list_ops
+from .media_identity import MediaResolver
 
 
 class DrawService:
-    def __init__(self, editor_service):
+    def __init__(self, editor_service, compact=None, media=None):
         self.editor_service = editor_service
         self.extension = ".drawings.json"
+        self.media = media or MediaResolver()
+        self.compact = compact
+        self.store = DocumentStore()
 
     def _drawing_path(self, video_path):
-        clean_path = str(video_path or "").replace("file:///", "").replace("file://", "")
-        if not clean_path or "http://localhost" in clean_path or "blob:" in clean_path:
-            raise ValueError("Invalid video path")
-        return os.path.normpath(clean_path) + self.extension
+        return self.media.resolve(video_path).sidecar(self.extension)
 
-    def save_drawing_data(self, video_path, drawing_data):
+    def save_drawing_data(self, video_path, drawing_data, compact=None):
         try:
             path = self._drawing_path(video_path)
-            with open(path, "w", encoding="utf-8") as file:
-                json.dump(drawing_data or [], file, indent=2, ensure_ascii=False)
-            return {"status": "success", "path": path}
+            with self.store.lock(path):
+                revision = self.store.next_revision(path)
+                written_path = write_document(path, drawing_data or [], compact=self.compact if compact is None else compact)
+                self.store.remember(path, drawing_data or [], revision)
+            return {"status": "success", "path": written_path, "revision": revision}
         except Exception as error:
             return {"status": "error", "message": str(error)}
 
     def get_drawings(self, video_path):
         try:
             path = self._drawing_path(video_path)
-            if not os.path.exists(path):
+            try:
+                drawings = read_document(path)
+            except FileNotFoundError:
                 return []
-            with open(path, "r", encoding="utf-8") as file:
-                return json.load(file)
+            self.store.remember(path, drawings)
+            return list(drawings)
         except Exception:
             return []
 
+    def revision(self, video_path):
+        return self.store.revision(self._drawing_path(video_path))
+
+    def patch_drawing_data(self, video_path, revision, ops):
+        try:
+            path = self._drawing_path(video_path)
+            with self.store.lock(path):
+                drawings = self.store.cached(path)
+                if drawings is None:
+                    drawings = self.get_drawings(video_path)
+                self.store.check(path, revision)
+                return self.save_drawing_data(video_path, apply_list_ops(drawings, ops))
+        except RevisionConflict as conflict:
+            return {"status": "conflict", "revision": conflict.revision, "message": str(conflict)}
+        except Exception as error:
+            return {"status": "error", "message": str(error)}
+
     def export_video_with_drawings(self, video_path, drawing_id):
-        return self.editor_service.export_clip(video_path, 0, 0, {"drawing_id": drawing_id})
+        editor = self.editor_service() if callable(self.editor_service) else self.editor_service
+        return editor.export_clip(video_path, 0, 0, {"drawing_id": drawing_id})
@@ -0,0 +1,87 @@
+import os
+
+
+# threads=None leaves x264 on all cores; the slow archive preset keeps them busy for minutes, so one is left for playback.
+ENCODING_PROFILES = {
+    "draft": {"preset": "ultrafast", "crf": (34, 26), "tune": "fastdecode", "audio_bitrate": 96, "max_height": 720, "threads": None},
+    "share": {"preset": "veryfast", "crf": (28, 18), "tune": None, "audio_bitrate": 160, "max_height": None, "threads": None},
+    "archive": {"preset": "slow", "crf": (22, 14), "tune": None, "audio_bitrate": 192, "max_height": None, "threads": max(1, (os.cpu_count() or 2) - 1)},
+}
+DEFAULT_PROFILE = "share"
+QUALITY_RANGE = (50, 100)
+
+
+def crf_for_quality(profile, quality):
+    # quality 50..100 maps linearly onto the profile's CRF range (worst..best).
+    worst, best = ENCODING_PROFILES[profile]["crf"]
+    low, high = QUALITY_RANGE
+    ratio = (max(low, min(int(quality), high)) - low) / (high - low)
+    return int(round(worst + (best - worst) * ratio))
+
+
+def resolve_encoding(profile=None, quality=90, target_size_mb=None, max_height=None, threads=None):
+    name = profile if profile in ENCODING_PROFILES else DEFAULT_PROFILE
+    settings = ENCODING_PROFILES[name]
+    height = settings["max_height"] if max_height is None else int(max_height or 0) or None
+    return {
+        "profile": name,
+        "preset": settings["preset"],
+        "crf": crf_for_quality(name, quality),
+        "tune": settings["tune"],
+        "audio_bitrate": settings["audio_bitrate"],
+        "max_height": max(16, height - height % 2) if height else None,
+        "target_size_mb": float(target_size_mb) if target_size_mb else None,
+        "threads": int(threads) if threads else settings["threads"],
+    }
+
+
+def fit_encoding(encoding, source_height):
+    # The height cap only ever shrinks: a source already within it keeps its size and can still be stream-copied.
+    if encoding["max_height"] and source_height and source_height <= encoding["max_height"]:
+        return {**encoding, "max_height": None}
+    return encoding
+
+
+def needs_reencode(encoding):
+    return bool(encoding and (encoding["max_height"] or encoding["target_size_mb"] or encoding.get("fps")))
+
+
+def video_bitrate(encoding, duration):
+    # Target size covers audio and container as well; ~2% is kept back for the mp4 overhead.
+    total_kbits = encoding["target_size_mb"] * 8 * 1024 * 0.98
+    return max(64, int(total_kbits / max(0.1, duration) - encoding["audio_bitrate"]))
+
+
+def video_args(encoding):
+    scale = ["-vf", f"scale=-2:'min({encoding['max_height']},ih)'"] if encoding["max_height"] else []
+    args = ["-c:v", "libx264", "-preset", encoding["preset"], "-pix_fmt", "yuv420p", *scale]
+    if encoding["tune"]:
+        args += ["-tune", encoding["tune"]]
+    if encoding.get("fps"):
+        args += ["-r", f"{encoding['fps']:g}"]
+    if encoding["threads"]:
+        args += ["-threads", str(encoding["threads"])]
+    return args
+
+
+def encode_commands(ffmpeg, input_args, output_path, encoding, duration, audio=True):
+    common = video_args(encoding)
+    audio_args = ["-c:a", "aac", "-b:a", f"{encoding['audio_bitrate']}k"] if audio else ["-an"]
+    head = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", *input_args, "-map", "0:v:0"]
+    tail = [*(["-map", "0:a?"] if audio else []), *audio_args, "-movflags", "+faststart", output_path]
+
+    if not encoding["target_size_mb"]:
+        return [head + common + ["-crf", str(encoding["crf"])] + tail]
+
+    bitrate = video_bitrate(encoding, duration)
+    passlog = f"{os.path.splitext(output_path)[0]}_2pass"
+    rate = ["-b:v", f"{bitrate}k", "-maxrate", f"{int(bitrate * 1.5)}k", "-bufsize", f"{bitrate * 2}k", "-passlogfile", passlog]
+    return [
+        head + common + rate + ["-pass", "1", "-an", "-f", "mp4", os.devnull],
+        head + common + rate + ["-pass", "2"] + tail,
+    ]
+
+
+def pass_log_files(output_path):
+    passlog = f"{os.path.splitext(output_path)[0]}_2pass"
+    return [f"{passlog}-0.log", f"{passlog}-0.log.mbtree"]
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ExportProfiler:
+    def __init__(self, trace_path=None):
+        # Totals are always kept (a dict update per call); individual spans are only stored when tracing.
+        self.trace_path = trace_path
+        self.started_at = time.perf_counter()
+        self.timers = {}
+        self.counters = {}
+        self._events = [] if trace_path else None
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, started_at, elapsed=None):
+        elapsed = time.perf_counter() - started_at if elapsed is None else elapsed
+        with self._lock:
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += elapsed
+            timer[1] += 1
+            if self._events is not None:
+                thread = threading.current_thread()
+                self._threads.setdefault(thread.ident, thread.name)
+                self._events.append((name, started_at, elapsed, thread.ident))
+
+    @contextmanager
+    def span(self, name):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started_at)
+
+    def count(self, name, amount=1):
+        if amount:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name, value):
+        with self._lock:
+            self.counters[name] = value
+
+    def summary(self):
+        with self._lock:
+            return {
+                "wall_seconds": round(time.perf_counter() - self.started_at, 3),
+                "timers": {name: {"seconds": round(total, 4), "calls": calls} for name, (total, calls) in self.timers.items()},
+                "counters": dict(self.counters),
+            }
+
+    def write_trace(self):
+        if not self.trace_path:
+            return None
+        with self._lock:
+            events = [
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                for tid, name in self._threads.items()
+            ]
+            events += [
+                {
+                    "name": name,
+                    "cat": "export",
+                    "ph": "X",
+                    "pid": 1,
+                    "tid": tid,
+                    "ts": round((started_at - self.started_at) * 1_000_000, 1),
+                    "dur": round(elapsed * 1_000_000, 1),
+                }
+                for name, started_at, elapsed, tid in self._events
+            ]
+            counters = dict(self.counters)
+        temp_path = f"{self.trace_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"counters": counters}}, file)
+        os.replace(temp_path, self.trace_path)
+        return self.trace_path
@@ -0,0 +1,210 @@
+import base64
+import math
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from .media_identity import MediaResolver
+
+
+CACHE_BYTES = 256 * 1024 * 1024
+DECODERS_PER_FILE = 2
+MAX_DECODERS = 6
+FORWARD_DECODE_LIMIT = 90
+IMAGE_FORMATS = {
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "jpg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+    "png": (".png", "image/png", None),
+}
+
+
+class FrameDecoder:
+    def __init__(self, media):
+        self.key = media.key
+        self.capture = cv2.VideoCapture(media.path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video: {media.path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.position = 0
+
+    def read(self, index):
+        # Short forward steps decode through the gap; anything else seeks (keyframe + decode forward).
+        if not self.position <= index <= self.position + FORWARD_DECODE_LIMIT:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.position = index
+        while self.position < index:
+            if not self.capture.grab():
+                return None
+            self.position += 1
+        ok, frame = self.capture.read()
+        if not ok:
+            return None
+        self.position += 1
+        return frame
+
+    def release(self):
+        self.capture.release()
+
+
+class FrameService:
+    def __init__(self, media=None, cache_bytes=CACHE_BYTES):
+        self.media = media or MediaResolver()
+        self.cache_bytes = cache_bytes
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._frames = OrderedDict()
+        self._frame_bytes = 0
+        self._idle = OrderedDict()
+        self._counts = {}
+        self._open = 0
+        self._info = {}
+
+    def info(self, video_path):
+        media = self.media.resolve(video_path)
+        with self._lock:
+            info = self._info.get(media.key)
+        if info is None:
+            self._release(self._acquire(media, 0))
+            with self._lock:
+                info = self._info[media.key]
+        return info
+
+    def frame_index(self, video_path, seconds):
+        info = self.info(video_path)
+        index = int(math.floor(max(0.0, float(seconds)) * info["fps"] + 1e-6))
+        return min(index, info["frame_count"] - 1) if info["frame_count"] > 0 else index
+
+    def frame(self, video_path, seconds=None, index=None):
+        media = self.media.resolve(video_path)
+        if not media.is_file:
+            raise ValueError("Input video was not found.")
+        if index is None:
+            index = self.frame_index(media.path, seconds or 0)
+        index = max(0, int(index))
+        key = (media.key, index)
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is not None:
+                self._frames.move_to_end(key)
+                return cached, index
+
+        decoder = self._acquire(media, index)
+        try:
+            frame = decoder.read(index)
+        finally:
+            self._release(decoder)
+        if frame is None:
+            raise ValueError(f"Frame {index} could not be decoded.")
+        # Cached frames are shared between callers and must not be drawn on.
+        frame.flags.writeable = False
+        self._remember(key, frame)
+        return frame, index
+
+    def encode(self, frame, image_format="jpeg", quality=90, width=None):
+        extension, content_type, quality_flag = IMAGE_FORMATS.get(str(image_format or "jpeg").lower(), IMAGE_FORMATS["jpeg"])
+        if width and 0 < int(width) < frame.shape[1]:
+            height = max(1, round(frame.shape[0] * int(width) / frame.shape[1]))
+            frame = cv2.resize(frame, (int(width), height), interpolation=cv2.INTER_AREA)
+        params = [quality_flag, max(1, min(int(quality or 90), 100))] if quality_flag is not None else []
+        ok, encoded = cv2.imencode(extension, frame, params)
+        if not ok:
+            raise ValueError("Could not encode frame.")
+        return content_type, encoded.tobytes()
+
+    def get_frame(self, video_path, seconds=None, index=None, image_format="jpeg", quality=90, width=None):
+        try:
+            frame, index = self.frame(video_path, seconds, index)
+            content_type, body = self.encode(frame, image_format, quality, width)
+            return {
+                "status": "success",
+                "frame": index,
+                "time": index / self.info(video_path)["fps"],
+                "image": f"data:{content_type};base64," + base64.b64encode(body).decode("ascii"),
+            }
+        except (TypeError, ValueError) as error:
+            return {"status": "error", "message": str(error)}
+
+    def serve(self, query):
+        index = query.get("frame", [None])[0]
+        width = query.get("width", [None])[0]
+        frame, _ = self.frame(query.get("path", [""])[0], float(query.get("t", ["0"])[0] or 0), None if index is None else int(index))
+        return self.encode(frame, query.get("format", ["jpeg"])[0], int(query.get("quality", ["90"])[0] or 90), int(width) if width else None)
+
+    def close(self):
+        with self._lock:
+            for decoders in self._idle.values():
+                for decoder in decoders:
+                    decoder.release()
+            self._idle.clear()
+            self._counts.clear()
+            self._open = 0
+            self._frames.clear()
+            self._frame_bytes = 0
+
+    def _remember(self, key, frame):
+        with self._lock:
+            if key in self._frames:
+                return
+            self._frames[key] = frame
+            self._frame_bytes += frame.nbytes
+            while self._frame_bytes > self.cache_bytes and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                self._frame_bytes -= evicted.nbytes
+
+    def _acquire(self, media, index):
+        with self._available:
+            while True:
+                idle = self._idle.get(media.key)
+                if idle:
+                    # Prefer the decoder that reaches the frame with the shortest forward decode.
+                    best = min(idle, key=lambda decoder: index - decoder.position if 0 <= index - decoder.position <= FORWARD_DECODE_LIMIT else math.inf)
+                    idle.remove(best)
+                    if not idle:
+                        del self._idle[media.key]
+                    return best
+                if self._open < MAX_DECODERS and self._counts.get(media.key, 0) < DECODERS_PER_FILE:
+                    self._open += 1
+                    self._counts[media.key] = self._counts.get(media.key, 0) + 1
+                    break
+                if self._open >= MAX_DECODERS and self._close_idle():
+                    continue
+                self._available.wait()
+        try:
+            decoder = FrameDecoder(media)
+        except ValueError:
+            with self._available:
+                self._forget_decoder(media.key)
+                self._available.notify()
+            raise
+        with self._lock:
+            self._info[media.key] = {
+                "fps": decoder.fps,
+                "frame_count": decoder.frame_count,
+                "duration": decoder.frame_count / decoder.fps if decoder.frame_count > 0 else None,
+            }
+        return decoder
+
+    def _release(self, decoder):
+        with self._available:
+            self._idle.setdefault(decoder.key, []).append(decoder)
+            self._idle.move_to_end(decoder.key)
+            self._available.notify()
+
+    def _close_idle(self):
+        # Called with the lock held: closes one decoder of the least recently used file.
+        for key, decoders in self._idle.items():
+            decoders.pop(0).release()
+            if not decoders:
+                del self._idle[key]
+            self._forget_decoder(key)
+            return True
+        return False
+
+    def _forget_decoder(self, key):
+        self._open -= 1
+        self._counts[key] -= 1
+        if not self._counts[key]:
+            del self._counts[key]
@@ -0,0 +1,151 @@
+import math
+import subprocess
+import tempfile
+
+import cv2
+import numpy as np
+
+
+FRAME_SOURCES = ("auto", "opencv", "ffmpeg")
+
+
+def probe_video(input_path):
+    cap = cv2.VideoCapture(input_path)
+    try:
+        if not cap.isOpened():
+            return None
+        return {
+            "fps": cap.get(cv2.CAP_PROP_FPS) or 30,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+        }
+    finally:
+        cap.release()
+
+
+def open_frame_source(kind, media, start, end, size, rate, threads=None):
+    # "auto" stays on OpenCV until the ffmpeg source has been checked against real footage; ffmpeg is opt-in.
+    if kind == "ffmpeg":
+        if not media.ffmpeg:
+            raise ValueError("ffmpeg not found.")
+        return FFmpegFrameSource(media.ffmpeg, media.path, start, end, size, rate, threads)
+    return OpenCVFrameSource(media.path, start, size)
+
+
+class OpenCVFrameSource:
+    name = "opencv"
+
+    def __init__(self, input_path, start, size):
+        self.capture = cv2.VideoCapture(input_path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video: {input_path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30
+        self.size = tuple(size)
+        source_size = (int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self._resize = self.size != source_size
+        self._raw = np.empty((source_size[1], source_size[0], 3), dtype=np.uint8)
+        self._frame = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8) if self._resize else self._raw
+        self._time = None
+        self._retrieved = False
+        self._ended = False
+        self.decoded = 0
+        self.seeks = 1 if start > 0 else 0
+        if self.seeks:
+            self.capture.set(cv2.CAP_PROP_POS_MSEC, start * 1000)
+
+    def read(self, source_time, out):
+        # Decodes forward only: frames before the requested time are grabbed, never converted.
+        # Timestamps come from the container, so variable frame rate footage lines up.
+        interval = 1 / self.fps
+        while not self._ended and (self._time is None or self._time + interval <= source_time + 1e-6):
+            if not self.capture.grab():
+                self._ended = True
+                break
+            self._time = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            self._retrieved = False
+            self.decoded += 1
+        if self._time is None or (self._ended and self._time + interval <= source_time + 1e-6):
+            return None
+        if not self._retrieved:
+            ok, raw = self.capture.retrieve(self._raw)
+            if not ok:
+                return None
+            self._raw = raw
+            if self._resize:
+                cv2.resize(raw, self.size, dst=self._frame, interpolation=cv2.INTER_AREA)
+            else:
+                self._frame = raw
+            self._retrieved = True
+        np.copyto(out, self._frame)
+        return out
+
+    def close(self):
+        self.capture.release()
+
+
+class FFmpegFrameSource:
+    name = "ffmpeg"
+
+    def __init__(self, ffmpeg, input_path, start, end, size, rate, threads=None):
+        self.start = max(0.0, start)
+        self.rate = rate
+        self.fps = rate
+        self.size = tuple(size)
+        width, height = self.size
+        # ffmpeg resamples to a constant rate and scales in the decode pipe, so frame i is exactly start + i / rate.
+        command = [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-threads", str(threads or 0),
+            "-ss", f"{self.start:.3f}", "-i", input_path, "-t", f"{max(0.001, end - self.start + 1 / rate):.3f}",
+            "-map", "0:v:0", "-an", "-sn",
+            "-vf", f"fps={rate:g},scale={width}:{height}:flags=area",
+            "-pix_fmt", "bgr24", "-f", "rawvideo", "-",
+        ]
+        # stderr goes to a file so a chatty decoder can never block on a full pipe.
+        self._errors = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=self._errors, bufsize=0)
+        self._frame = np.empty((height, width, 3), dtype=np.uint8)
+        self._view = memoryview(self._frame).cast("B")
+        self._index = -1
+        self._ended = False
+        self.decoded = 0
+        self.seeks = 1 if self.start > 0 else 0
+
+    def read(self, source_time, out):
+        target = max(0, int(math.floor((source_time - self.start) * self.rate + 1e-6)))
+        while self._index < target and not self._ended:
+            if not self._read_frame():
+                self._ended = True
+                self._check_exit()
+        if self._index < target:
+            return None
+        np.copyto(out, self._frame)
+        return out
+
+    def _read_frame(self):
+        read = 0
+        total = len(self._view)
+        while read < total:
+            count = self.process.stdout.readinto(self._view[read:])
+            if not count:
+                return False
+            read += count
+        self._index += 1
+        self.decoded += 1
+        return True
+
+    def _check_exit(self):
+        if self.process.wait() == 0:
+            return
+        self._errors.seek(0)
+        lines = self._errors.read().decode("utf-8", "replace").strip().splitlines()
+        raise ValueError(f"ffmpeg could not decode the video: {lines[-1] if lines else f'exit code {self.process.returncode}'}")
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.process.stdout.close()
+        self._errors.close()
+
@@ -0,0 +1,262 @@
+import base64
+import itertools
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from .tracking_analytics_service import extract_tracks, resample_tracks
+
+
+GRID_SIZE = (48, 27)
+SAMPLE_RATE = 10
+BUCKET_SECONDS = 1.0
+# A layer is a full-frame BGRA image plus two float32 weight planes (about 25 MB at 1080p), so the cache is bounded by bytes.
+LAYER_CACHE_BYTES = 256 * 1024 * 1024
+MAX_LAYER_SIZE = 4096
+_serials = itertools.count()
+
+
+class _TrackIndex:
+    def __init__(self, items):
+        self.serial = next(_serials)
+        self.tracks = extract_tracks(items)
+        sampled = resample_tracks(self.tracks, SAMPLE_RATE)
+        self.keys = sampled["keys"]
+        self.times = sampled["times"]
+        self.positions = sampled["positions"]
+        self.start = self.times[0] if len(self.times) else 0.0
+        self._prefix = {}
+        self._lock = threading.Lock()
+
+    def members(self, group):
+        group = group or "all"
+        if group == "all":
+            return list(range(len(self.keys)))
+        if group == "ball":
+            return [index for index, key in enumerate(self.keys) if self.tracks[key]["type"] == "ball"]
+        if group in {"home", "guest"}:
+            return [index for index, key in enumerate(self.keys) if self.tracks[key]["team"] == group]
+        return [index for index, key in enumerate(self.keys) if key == group]
+
+    def prefix(self, group):
+        with self._lock:
+            cached = self._prefix.get(group)
+            if cached is None:
+                cached = self._prefix[group] = self._build_prefix(self.members(group))
+            return cached
+
+    def _build_prefix(self, members):
+        columns, rows = GRID_SIZE
+        bucket_count = max(1, int(np.ceil((self.times[-1] - self.start) / BUCKET_SECONDS)) + 1) if len(self.times) else 1
+        counts = np.zeros(bucket_count * rows * columns, dtype=np.float32)
+        if members and len(self.times):
+            points = self.positions[:, members, :]
+            valid = np.isfinite(points).all(axis=-1) & (points >= 0).all(axis=-1) & (points <= 100).all(axis=-1)
+            frame_index, _ = np.nonzero(valid)
+            cells_x = np.minimum((points[..., 0][valid] / 100 * columns).astype(np.int64), columns - 1)
+            cells_y = np.minimum((points[..., 1][valid] / 100 * rows).astype(np.int64), rows - 1)
+            buckets = ((self.times[frame_index] - self.start) / BUCKET_SECONDS).astype(np.int64)
+            flat = (buckets * rows + cells_y) * columns + cells_x
+            counts += np.bincount(flat, minlength=counts.size).astype(np.float32)
+        # prefix[b] holds every sample before bucket b, so any window is two lookups and one subtraction.
+        prefix = np.zeros((bucket_count + 1, rows, columns), dtype=np.float32)
+        np.cumsum(counts.reshape(bucket_count, rows, columns), axis=0, out=prefix[1:])
+        return prefix
+
+    def bucket(self, seconds, prefix):
+        return int(np.clip(np.floor((seconds - self.start) / BUCKET_SECONDS), 0, len(prefix) - 1))
+
+    def histogram(self, group, time_from, time_to):
+        prefix = self.prefix(group)
+        first = self.bucket(time_from, prefix)
+        last = self.bucket(time_to, prefix) + 1
+        last = min(max(last, first), len(prefix) - 1)
+        return prefix[last] - prefix[first], (first, last)
+
+    def trail(self, members, time_from, time_to):
+        window = (self.times >= time_from) & (self.times <= time_to)
+        return self.positions[window][:, members, :]
+
+
+class HeatmapService:
+    def __init__(self, project_data):
+        self.project_data = project_data
+        self._lock = threading.Lock()
+        self._indices = OrderedDict()
+        self._layers = OrderedDict()
+        self._layer_bytes = 0
+
+    def get_heatmap(self, video_path, time_from=None, time_to=None, group="all", width=960, height=540, sigma=1.5, opacity=0.65):
+        try:
+            project = self.project_data.snapshot(video_path)
+            index = self._index(("project", project.get("video_path"), project.get("revision")), project.get("items"))
+            time_from = index.start if time_from is None else float(time_from)
+            time_to = index.times[-1] if time_to is None and len(index.times) else float(time_to or 0)
+            width = max(1, min(int(width), MAX_LAYER_SIZE))
+            height = max(1, min(int(height), MAX_LAYER_SIZE))
+            layer = self._layer(index, group, time_from, time_to, width, height, float(sigma), float(opacity))
+            ok, encoded = cv2.imencode(".png", layer["bgra"])
+            if not ok:
+                return {"status": "error", "message": "Could not encode heatmap."}
+            return {
+                "status": "success",
+                "revision": project.get("revision"),
+                "time_from": time_from,
+                "time_to": time_to,
+                "image": "data:image/png;base64," + base64.b64encode(encoded.tobytes()).decode("ascii"),
+            }
+        except Exception as error:
+            print(f"Error building heatmap: {error}")
+            return {"status": "error", "message": str(error)}
+
+    def get_ghost_trail(self, video_path, time, length=3.0, group="all"):
+        try:
+            project = self.project_data.snapshot(video_path)
+            index = self._index(("project", project.get("video_path"), project.get("revision")), project.get("items"))
+            members = index.members(group)
+            trail = index.trail(members, float(time) - float(length), float(time))
+            return {
+                "status": "success",
+                "revision": project.get("revision"),
+                "trails": {
+                    index.keys[member]: [
+                        {"x": round(float(x), 3), "y": round(float(y), 3)}
+                        for x, y in trail[:, column, :] if np.isfinite(x) and np.isfinite(y)
+                    ]
+                    for column, member in enumerate(members)
+                },
+            }
+        except Exception as error:
+            print(f"Error building ghost trail: {error}")
+            return {"status": "error", "message": str(error)}
+
+    def draw(self, frame, item, overlay_data, frame_time):
+        items = (overlay_data or {}).get("items") or []
+        # Exports pass the live overlay payload; its list object identifies the snapshot for the whole render.
+        index = self._index(("overlay", id(items)), items, keep=items)
+        height, width = frame.shape[:2]
+        if item.get("type") == "heatmap":
+            self._draw_heatmap(frame, item, index, frame_time, width, height)
+        elif item.get("type") == "ghost-trail":
+            self._draw_ghost_trail(frame, item, index, frame_time, width, height)
+
+    def _draw_heatmap(self, frame, item, index, frame_time, width, height):
+        window = self._number(item.get("window"), 0)
+        start = frame_time - window if window > 0 else self._number(item.get("time_from"), index.start)
+        opacity = max(0, min(self._number(item.get("opacity"), 0.65), 1))
+        layer = self._layer(index, item.get("group") or "all", start, frame_time, width, height, self._number(item.get("sigma"), 1.5), opacity)
+        if layer["box"] is None:
+            return
+        x0, y0, x1, y1 = layer["box"]
+        region = frame[y0:y1, x0:x1]
+        alpha, inverse = layer["weights"]
+        region[:] = cv2.blendLinear(layer["bgra"][y0:y1, x0:x1, :3], region, alpha, inverse)
+
+    def _draw_ghost_trail(self, frame, item, index, frame_time, width, height):
+        length = max(0.1, self._number(item.get("length"), 3))
+        members = index.members(item.get("group") or "all")
+        trail = index.trail(members, frame_time - length, frame_time)
+        if len(trail) < 2:
+            return
+        thickness = max(1, int(self._number(item.get("width"), 3)))
+        color = _bgr(item.get("color"))
+        pixels = np.stack([trail[..., 0] / 100 * width, trail[..., 1] / 100 * height], axis=-1)
+        finite = np.isfinite(pixels).all(axis=-1)
+        if not finite.any():
+            return
+        # Work on the trails' bounding box only, so each fade band blends a small region instead of the frame.
+        margin = thickness + 2
+        x0 = max(0, int(np.floor(pixels[..., 0][finite].min())) - margin)
+        y0 = max(0, int(np.floor(pixels[..., 1][finite].min())) - margin)
+        x1 = min(width, int(np.ceil(pixels[..., 0][finite].max())) + margin)
+        y1 = min(height, int(np.ceil(pixels[..., 1][finite].max())) + margin)
+        if x1 <= x0 or y1 <= y0:
+            return
+        region = frame[y0:y1, x0:x1]
+        offset = np.array([x0, y0], dtype=np.float64)
+        bands = 3
+        for band in range(bands):
+            segment = slice(band * len(trail) // bands, (band + 1) * len(trail) // bands + 1)
+            overlay = region.copy()
+            for column, member in enumerate(members):
+                points = pixels[segment, column, :]
+                points = points[finite[segment, column]]
+                if len(points) < 2:
+                    continue
+                track = index.tracks[index.keys[member]]
+                track_color = color or ((255, 255, 255) if track["type"] == "ball" else (255, 170, 60) if track["team"] == "home" else (60, 90, 255))
+                cv2.polylines(overlay, [(points - offset).astype(np.int32)], False, track_color, thickness, cv2.LINE_AA)
+            # Older parts of the trail fade out.
+            opacity = 0.25 + 0.55 * (band + 1) / bands
+            cv2.addWeighted(overlay, opacity, region, 1 - opacity, 0, region)
+
+    def _index(self, key, items, keep=None):
+        with self._lock:
+            cached = self._indices.get(key)
+            if cached and (keep is None or cached[1] is keep):
+                self._indices.move_to_end(key)
+                return cached[0]
+        index = _TrackIndex(items)
+        with self._lock:
+            self._indices[key] = (index, keep)
+            while len(self._indices) > 4:
+                self._indices.popitem(last=False)
+        return index
+
+    def _layer(self, index, group, time_from, time_to, width, height, sigma, opacity):
+        histogram, buckets = index.histogram(group, time_from, time_to)
+        key = (index.serial, group, buckets, width, height, round(sigma, 2), round(opacity, 2))
+        with self._lock:
+            cached = self._layers.get(key)
+            if cached is not None:
+                self._layers.move_to_end(key)
+                return cached
+
+        density = cv2.GaussianBlur(histogram, (0, 0), max(0.1, sigma)) if sigma > 0 else histogram
+        peak = float(density.max())
+        bgra = np.zeros((height, width, 4), dtype=np.uint8)
+        layer = {"bgra": bgra, "weights": None, "box": None}
+        if peak > 0:
+            density = cv2.resize(density / peak, (width, height), interpolation=cv2.INTER_LINEAR)
+            np.clip(density, 0, 1, out=density)
+            alpha = np.sqrt(density) * opacity
+            bgra[..., :3] = cv2.applyColorMap((density * 255).astype(np.uint8), cv2.COLORMAP_JET)
+            bgra[..., 3] = (alpha * 255).astype(np.uint8)
+            rows = np.flatnonzero(bgra[..., 3].any(axis=1))
+            columns = np.flatnonzero(bgra[..., 3].any(axis=0))
+            if len(rows) and len(columns):
+                y0, y1, x0, x1 = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+                alpha = np.ascontiguousarray(alpha[y0:y1, x0:x1], dtype=np.float32)
+                layer["weights"] = (alpha, 1 - alpha)
+                layer["box"] = (int(x0), int(y0), int(x1), int(y1))
+
+        layer["bytes"] = bgra.nbytes + sum(weights.nbytes for weights in layer["weights"] or ())
+        with self._lock:
+            previous = self._layers.pop(key, None)
+            if previous is not None:
+                self._layer_bytes -= previous["bytes"]
+            self._layers[key] = layer
+            self._layer_bytes += layer["bytes"]
+            while self._layer_bytes > LAYER_CACHE_BYTES and len(self._layers) > 1:
+                _, evicted = self._layers.popitem(last=False)
+                self._layer_bytes -= evicted["bytes"]
+        return layer
+
+    def _number(self, value, fallback):
+        try:
+            parsed = float(value)
+            return parsed if np.isfinite(parsed) else fallback
+        except (TypeError, ValueError):
+            return fallback
+
+
+def _bgr(value):
+    text = str(value or "").lstrip("#")
+    if len(text) != 6:
+        return None
+    try:
+        return (int(text[4:6], 16), int(text[2:4], 16), int(text[0:2], 16))
+    except ValueError:
+        return None
@@ -0,0 +1,182 @@
+import json
+from fractions import Fraction
+
+from .encoding_profiles import video_args
+
+
+REEL_LABELS = ("goal", "shot")
+AUDIO_RATE = 48000
+# Relative cost per second of footage, so aggregated progress does not stall on rendered clips.
+MODE_WEIGHTS = {"copy": 0.1, "encode": 1.0, "render": 2.0}
+COPY_PIX_FMTS = {"yuv420p", "yuvj420p"}
+# Source H.264 profiles and the libx264 profile that encoded parts use to sit next to copied ones.
+X264_PROFILES = {"constrained baseline": "baseline", "baseline": "baseline", "main": "main", "high": "high"}
+# A clip is widened back to the keyframe before it by at most this much; longer GOPs are encoded instead.
+MAX_KEYFRAME_SNAP = 10.0
+
+
+def event_ranges(events, labels=REEL_LABELS, event_ids=None, pre_roll=3.0, post_roll=5.0):
+    pre_roll = max(0.0, float(pre_roll or 0))
+    post_roll = max(0.0, float(post_roll or 0))
+    if event_ids:
+        by_id = {event.get("id"): event for event in events or []}
+        selected = [by_id[event_id] for event_id in event_ids if event_id in by_id]
+    else:
+        wanted = {str(label).strip().lower() for label in labels or REEL_LABELS}
+        selected = sorted(
+            [event for event in events or [] if str(event.get("label") or "").strip().lower() in wanted],
+            key=lambda event: float(event.get("time_from") or 0),
+        )
+
+    ranges = []
+    for event in selected:
+        time_from = float(event.get("time_from") or 0)
+        time_to = max(time_from, float(event.get("time_to") or time_from))
+        ranges.append({
+            "start": int(round(max(0.0, time_from - pre_roll) * 1000)),
+            "end": int(round((time_to + post_roll) * 1000)),
+            "label": event.get("label") or "",
+        })
+    return merge_ranges(ranges)
+
+
+def merge_ranges(ranges):
+    # Order is kept as given; only neighbours that overlap are joined, so a chosen sequence never replays footage.
+    merged = []
+    for item in ranges or []:
+        start = int(item["start"])
+        end = int(item["end"])
+        if end <= start:
+            continue
+        previous = merged[-1] if merged else None
+        if previous and previous["start"] <= start <= previous["end"]:
+            previous["end"] = max(previous["end"], end)
+            continue
+        merged.append({"start": max(0, start), "end": end, "label": item.get("label") or ""})
+    return merged
+
+
+def range_has_overlays(overlay_data, start, end):
+    for item in (overlay_data or {}).get("items") or []:
+        if item.get("visible") is False or item.get("type") == "measure-grid":
+            continue
+        try:
+            time_from = float(item.get("time_from") or 0)
+            if item.get("type") == "delay":
+                time_to = time_from + float(item.get("duration") or 0)
+            else:
+                time_to = max(time_from, float(item.get("time_to") or time_from))
+        except (TypeError, ValueError):
+            continue
+        if time_from <= end and time_to >= start:
+            return True
+    return False
+
+
+def stream_command(ffprobe, input_path):
+    return [
+        ffprobe, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=codec_name,profile,level,pix_fmt,width,height,avg_frame_rate:format=start_time", "-of", "json", input_path,
+    ]
+
+
+def keyframe_command(ffprobe, input_path, starts, offset=0.0):
+    # Each interval seeks to the keyframe at or before a clip start and reads that one packet; nothing is decoded.
+    # Packet times include the container start time.
+    intervals = ",".join(f"{offset + start + 0.001:.3f}%+#1" for start in starts)
+    return [
+        ffprobe, "-v", "error", "-select_streams", "v:0", "-read_intervals", intervals,
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", input_path,
+    ]
+
+
+def parse_stream(output):
+    data = json.loads(output or "{}")
+    streams = data.get("streams") or []
+    if not streams:
+        return None
+    stream = streams[0]
+    try:
+        rate = Fraction(stream.get("avg_frame_rate") or "0/1")
+    except (ValueError, ZeroDivisionError):
+        rate = Fraction(0)
+    return {
+        "codec": str(stream.get("codec_name") or "").lower(),
+        "profile": str(stream.get("profile") or "").lower(),
+        "level": int(stream.get("level") or 0),
+        "pix_fmt": str(stream.get("pix_fmt") or "").lower(),
+        "size": (int(stream.get("width") or 0), int(stream.get("height") or 0)),
+        "rate": stream.get("avg_frame_rate") if rate > 0 else None,
+        "fps": float(rate),
+        "start_time": float((data.get("format") or {}).get("start_time") or 0),
+    }
+
+
+def parse_keyframes(output, offset=0.0):
+    keyframes = set()
+    for line in (output or "").splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags:
+            try:
+                keyframes.add(round(float(pts_time) - offset, 6))
+            except ValueError:
+                continue
+    return sorted(keyframes)
+
+
+def keyframe_before(keyframes, start):
+    # Copied clips start on the keyframe at or before the requested start, which only lengthens the pre-roll.
+    earlier = [keyframe for keyframe in keyframes if keyframe <= start + 0.001]
+    if not earlier or start - earlier[-1] > MAX_KEYFRAME_SNAP:
+        return None
+    return earlier[-1]
+
+
+def copy_compatible(stream, output_size):
+    # Copied and encoded parts end up behind one sample description in the joined MP4, so encoded parts are written
+    # with the source's profile, level, size and rate; that needs a profile libx264 can produce and plain 4:2:0.
+    return bool(
+        stream
+        and stream["codec"] == "h264"
+        and stream["profile"] in X264_PROFILES
+        and stream["pix_fmt"] == "yuv420p"
+        and stream["size"] == tuple(output_size)
+        and stream["rate"]
+    )
+
+
+def match_args(stream):
+    args = ["-profile:v", X264_PROFILES[stream["profile"]], "-r", stream["rate"]]
+    return args + (["-level:v", f"{stream['level'] / 10:.1f}"] if stream["level"] else [])
+
+
+def part_command(ffmpeg, mode, input_path, part_path, start, duration, encoding, rendered_path=None, match=None):
+    # Every part is written as MPEG-TS with in-band parameter sets and identical AAC settings,
+    # so copied and encoded parts join with the concat demuxer without touching the video again.
+    # Copied parts start on a keyframe, so input seeking lands the video and the decoded audio on the same instant.
+    head = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y"]
+    audio = ["-c:a", "aac", "-b:a", f"{encoding['audio_bitrate']}k", "-ar", str(AUDIO_RATE), "-ac", "2"]
+    span = ["-ss", f"{start:.3f}", "-t", f"{duration:.3f}"]
+    if mode == "copy":
+        inputs = ["-ss", f"{start:.6f}", "-i", input_path, "-t", f"{duration:.3f}", "-map", "0:v:0", "-map", "0:a:0?"]
+        video = ["-c:v", "copy", "-bsf:v", "h264_mp4toannexb"]
+    elif mode == "render":
+        inputs = ["-i", rendered_path, *span, "-i", input_path, "-map", "0:v:0", "-map", "1:a:0?"]
+        video = [*video_args(encoding), "-crf", str(encoding["crf"]), *(match or [])]
+    else:
+        inputs = ["-ss", f"{start:.3f}", "-i", input_path, "-t", f"{duration:.3f}", "-map", "0:v:0", "-map", "0:a:0?"]
+        video = [*video_args(encoding), "-crf", str(encoding["crf"]), *(match or [])]
+    return [*head, *inputs, *video, *audio, "-f", "mpegts", part_path]
+
+
+def concat_list(part_names):
+    return "".join("file '{}'\n".format(name.replace("'", "'\\''")) for name in part_names)
+
+
+def concat_command(ffmpeg, list_path, output_path):
+    return [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-map", "0:v:0", "-map", "0:a?", "-c", "copy", "-bsf:a", "aac_adtstoasc",
+        "-movflags", "+faststart", output_path,
+    ]
@@ -0,0 +1,338 @@
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from .media_identity import MediaResolver
+from .task_registry import TaskRegistry
+
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"}
+TILE_SIZE = 256
+TILE_QUALITY = 85
+STRIP_BYTES = 64 * 1024 * 1024
+PYRAMID_VERSION = 1
+# Below this the webview shows the plain file; tiles only pay off for images it would struggle to decode whole.
+TILED_MIN_SIDE = 4096
+SERVED_RECHECK_SECONDS = 5.0
+SERVED_CACHE_SIZE = 32
+JPEG_FRAMES = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def is_image(path):
+    return os.path.splitext(str(path or ""))[1].lower() in IMAGE_EXTENSIONS
+
+
+def image_size(path):
+    # Header-only read, so the decode target can be allocated before any pixel is decoded.
+    with open(path, "rb") as file:
+        head = file.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head.startswith(b"GIF8"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"BM"):
+            width, height = struct.unpack("<ii", head[18:26])
+            return width, abs(height)
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            chunk = head[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", head[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(head[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+            return None
+        if not head.startswith(b"\xff\xd8"):
+            return None
+        file.seek(2)
+        while True:
+            marker = file.read(2)
+            while len(marker) == 2 and marker[0] == 0xFF and marker[1] == 0xFF:
+                marker = marker[1:] + file.read(1)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            length = struct.unpack(">H", file.read(2))[0]
+            if marker[1] in JPEG_FRAMES:
+                height, width = struct.unpack(">xHH", file.read(5))
+                return width, height
+            file.seek(length - 2, os.SEEK_CUR)
+
+
+def has_alpha(path):
+    # JPEG tiles would drop transparency; only the formats that can carry it are checked.
+    with open(path, "rb") as file:
+        head = file.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            if head[25] in (4, 6):
+                return True
+            file.seek(8)
+            while True:
+                chunk = file.read(8)
+                if len(chunk) < 8 or chunk[4:] == b"IDAT":
+                    return False
+                if chunk[4:] == b"tRNS":
+                    return True
+                file.seek(struct.unpack(">I", chunk[:4])[0] + 4, os.SEEK_CUR)
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            if head[12:16] == b"VP8X":
+                return bool(head[20] & 0x10)
+            if head[12:16] == b"VP8L":
+                return bool((int.from_bytes(head[21:25], "little") >> 28) & 1)
+            return False
+        if head.startswith(b"BM"):
+            return struct.unpack("<H", head[28:30])[0] == 32
+        return False
+
+
+def tiled_size(path):
+    # GIFs (animation) and images with alpha stay on the plain <img>, and so do images small enough to show whole.
+    if os.path.splitext(path)[1].lower() == ".gif":
+        return None
+    size = image_size(path)
+    if not size or max(size) <= TILED_MIN_SIDE or has_alpha(path):
+        return None
+    return size
+
+
+def decode_image(path, raw_path):
+    # Decodes straight into a disk-backed .npy map; callers then work on strips of it.
+    size = image_size(path)
+    canvas = np.lib.format.open_memmap(raw_path, "w+", np.uint8, (size[1], size[0], 3)) if size else None
+    image = None
+    if canvas is not None:
+        try:
+            image = cv2.imread(path, canvas, cv2.IMREAD_COLOR)
+        except (TypeError, cv2.error):
+            # Builds without the imread(filename, dst, flags) overload; the copy below fills the map instead.
+            image = None
+    if image is None:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None or not image.size:
+        raise ValueError(f"Could not read image: {path}")
+    if canvas is not None and image.shape == canvas.shape and np.shares_memory(image, canvas):
+        return canvas
+    # EXIF rotation or an unknown header: the decoder allocated its own buffer, so copy it over once.
+    del canvas
+    canvas = np.lib.format.open_memmap(raw_path, "w+", np.uint8, image.shape)
+    rows = strip_rows(image.shape[1])
+    for y in range(0, image.shape[0], rows):
+        canvas[y:y + rows] = image[y:y + rows]
+    return canvas
+
+
+def strip_rows(width, multiple=1, budget=STRIP_BYTES):
+    rows = max(1, budget // max(1, width * 3))
+    return max(multiple, rows // multiple * multiple)
+
+
+def level_sizes(width, height, tile_size=TILE_SIZE):
+    sizes = [(width, height)]
+    while max(sizes[-1]) > tile_size:
+        sizes.append(((sizes[-1][0] + 1) // 2, (sizes[-1][1] + 1) // 2))
+    return sizes[::-1]
+
+
+class TilePyramid:
+    def __init__(self, directory):
+        with open(os.path.join(directory, "pyramid.json"), "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != PYRAMID_VERSION:
+            raise ValueError("Outdated tile pyramid.")
+        self.directory = directory
+        self.width = data["width"]
+        self.height = data["height"]
+        self.tile_size = data["tile_size"]
+        self.levels = data["levels"]
+        self.source = tuple(data["source"])
+
+    def tile_path(self, level, x, y):
+        level_width, level_height = self.levels[level]
+        if not (0 <= x * self.tile_size < level_width and 0 <= y * self.tile_size < level_height):
+            return None
+        return os.path.join(self.directory, str(level), f"{x}_{y}.jpg")
+
+    def public(self):
+        return {
+            "tiled": True,
+            "width": self.width,
+            "height": self.height,
+            "tile_size": self.tile_size,
+            "levels": self.levels,
+            "format": "jpeg",
+            "version": f"{self.source[0]}-{self.source[1]}",
+        }
+
+
+class ImageService:
+    def __init__(self, media=None, tasks=None):
+        self.media = media or MediaResolver()
+        self.tasks = tasks or TaskRegistry()
+        self._lock = threading.Lock()
+        self._pyramids = {}
+        self._building = {}
+        self._served = OrderedDict()
+
+    def get_tiles(self, image_path):
+        try:
+            pyramid = self._pyramid(image_path)
+        except (OSError, TypeError, ValueError, struct.error) as error:
+            return {"status": "error", "message": str(error)}
+        if not isinstance(pyramid, TilePyramid):
+            return pyramid
+        return {"status": "success", **pyramid.public()}
+
+    def serve(self, query):
+        pyramid = self._served_pyramid(query.get("path", [""])[0])
+        if not isinstance(pyramid, TilePyramid):
+            return None
+        level = int(query.get("level", ["0"])[0])
+        if not 0 <= level < len(pyramid.levels):
+            return None
+        path = pyramid.tile_path(level, int(query.get("x", ["0"])[0]), int(query.get("y", ["0"])[0]))
+        if not path:
+            return None
+        try:
+            with open(path, "rb") as file:
+                return "image/jpeg", file.read()
+        except OSError:
+            return None
+
+    def decode(self, image_path, raw_path):
+        media = self.media.resolve(image_path)
+        if not media.is_file:
+            raise ValueError("Input image was not found.")
+        return decode_image(media.path, raw_path)
+
+    def _served_pyramid(self, image_path):
+        # A zoomed view requests dozens of tiles at once; the image is re-checked every few seconds, not per tile.
+        now = time.monotonic()
+        with self._lock:
+            served = self._served.get(image_path)
+            if served and now - served[1] < SERVED_RECHECK_SECONDS:
+                return served[0]
+        try:
+            pyramid = self._pyramid(image_path, build=False)
+        except (OSError, TypeError, ValueError, struct.error):
+            return None
+        if isinstance(pyramid, TilePyramid):
+            with self._lock:
+                self._served[image_path] = (pyramid, now)
+                self._served.move_to_end(image_path)
+                while len(self._served) > SERVED_CACHE_SIZE:
+                    self._served.popitem(last=False)
+        return pyramid
+
+    def _pyramid(self, image_path, build=True):
+        media = self.media.resolve(image_path)
+        if not media.is_file or not is_image(media.path):
+            return {"status": "error", "message": "Input image was not found."}
+        directory = media.sidecar(".tiles")
+        with self._lock:
+            pyramid = self._pyramids.get(directory)
+            if pyramid and pyramid.source == (media.size, media.mtime_ns):
+                return pyramid
+        if not tiled_size(media.path):
+            return {"status": "success", "tiled": False}
+        try:
+            pyramid = TilePyramid(directory)
+            if pyramid.source == (media.size, media.mtime_ns):
+                with self._lock:
+                    self._pyramids[directory] = pyramid
+                return pyramid
+        except (OSError, KeyError, ValueError):
+            pass
+        if not build:
+            return None
+        return self._start_build(media, directory)
+
+    def _start_build(self, media, directory):
+        with self._lock:
+            task_id = self._building.get(directory)
+            if task_id and self.tasks.status(task_id).get("status") == "processing":
+                return {"status": "processing", "task_id": task_id}
+            task_id = self._building[directory] = self.tasks.create("tiles", {"message": "Building image tiles..."})
+        thread = threading.Thread(target=self._build_task, args=(task_id, media, directory), daemon=True)
+        thread.start()
+        return {"status": "processing", "task_id": task_id}
+
+    def _build_task(self, task_id, media, directory):
+        temp_directory = f"{directory}.tmp"
+        shutil.rmtree(temp_directory, ignore_errors=True)
+        try:
+            os.makedirs(temp_directory)
+            built = self._build_pyramid(task_id, media, temp_directory)
+            if built:
+                shutil.rmtree(directory, ignore_errors=True)
+                os.replace(temp_directory, directory)
+        except (OSError, ValueError, cv2.error) as error:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+            self.tasks.set(task_id, {"status": "error", "message": str(error)})
+            return
+        if not built:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+            self.tasks.set(task_id, {"status": "canceled", "progress": 0, "message": "Tile build canceled.", "estimated_seconds": 0})
+            return
+        self.tasks.set(task_id, {"status": "done", "progress": 100, "message": "Image tiles ready.", "estimated_seconds": 0})
+
+    def _build_pyramid(self, task_id, media, directory):
+        # Each level is read in strips of whole tile rows: the strip is cut into tiles and also halved into the next level's map.
+        started_at = time.time()
+        current_path = os.path.join(directory, "level.npy")
+        current = decode_image(media.path, current_path)
+        sizes = level_sizes(current.shape[1], current.shape[0])
+        total_rows = sum(height for _, height in sizes)
+        done_rows = 0
+        for level in range(len(sizes) - 1, -1, -1):
+            width, height = sizes[level]
+            level_directory = os.path.join(directory, str(level))
+            os.makedirs(level_directory)
+            next_path = os.path.join(directory, f"level_{level - 1}.npy")
+            following = None
+            if level:
+                next_width, next_height = sizes[level - 1]
+                following = np.lib.format.open_memmap(next_path, "w+", np.uint8, (next_height, next_width, 3))
+            rows = strip_rows(width, TILE_SIZE)
+            for y in range(0, height, rows):
+                if self.tasks.is_cancel_requested(task_id):
+                    del current, following
+                    return False
+                strip = np.array(current[y:y + rows])
+                for tile_y in range(0, strip.shape[0], TILE_SIZE):
+                    for tile_x in range(0, width, TILE_SIZE):
+                        ok, encoded = cv2.imencode(".jpg", strip[tile_y:tile_y + TILE_SIZE, tile_x:tile_x + TILE_SIZE], [cv2.IMWRITE_JPEG_QUALITY, TILE_QUALITY])
+                        if not ok:
+                            raise ValueError("Could not encode tile.")
+                        encoded.tofile(os.path.join(level_directory, f"{tile_x // TILE_SIZE}_{(y + tile_y) // TILE_SIZE}.jpg"))
+                if following is not None:
+                    half = cv2.resize(strip, (following.shape[1], (strip.shape[0] + 1) // 2), interpolation=cv2.INTER_AREA)
+                    following[y // 2:y // 2 + half.shape[0]] = half
+                done_rows += strip.shape[0]
+                elapsed = time.time() - started_at
+                self.tasks.set(task_id, {
+                    "progress": min(99, int(done_rows / total_rows * 100)),
+                    "estimated_seconds": round(elapsed / done_rows * (total_rows - done_rows), 1),
+                })
+            del current
+            os.remove(current_path)
+            if following is not None:
+                following.flush()
+                current, current_path = following, next_path
+        with open(os.path.join(directory, "pyramid.json"), "w", encoding="utf-8") as file:
+            json.dump({
+                "version": PYRAMID_VERSION,
+                "width": sizes[-1][0],
+                "height": sizes[-1][1],
+                "tile_size": TILE_SIZE,
+                "levels": [list(size) for size in sizes],
+                "source": [media.size, media.mtime_ns],
+            }, file)
+        return True
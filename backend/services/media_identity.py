@@ -0,0 +1,119 @@
+import os
+import shutil
+import stat
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MISSING_TOOL_TTL = 30
+MAX_IDENTITIES = 1024
+
+
+class MediaIdentity:
+    def __init__(self, path, stat_result, resolver):
+        self.path = path
+        self.real_path = os.path.realpath(path)
+        self.exists = stat_result is not None
+        self.is_file = bool(stat_result and stat.S_ISREG(stat_result.st_mode))
+        self.size = stat_result.st_size if stat_result else None
+        self.mtime_ns = stat_result.st_mtime_ns if stat_result else None
+        self._resolver = resolver
+        self.key = (self.real_path, self.size, self.mtime_ns)
+        self._sidecars = {}
+
+    # Tools are looked up on use, so a file resolved before ffmpeg was installed still finds it after MISSING_TOOL_TTL.
+    @property
+    def ffmpeg(self):
+        return self._resolver.find_tool("ffmpeg")
+
+    @property
+    def ffprobe(self):
+        return self._resolver.find_tool("ffprobe")
+
+    def sidecar(self, suffix, replace_extension=False):
+        cache_key = (suffix, replace_extension)
+        path = self._sidecars.get(cache_key)
+        if path is None:
+            base = os.path.splitext(self.path)[0] if replace_extension else self.path
+            path = self._sidecars[cache_key] = base + suffix
+        return path
+
+
+class MediaResolver:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._identities = OrderedDict()
+        self._tools = {}
+
+    def clean(self, media_path, require_absolute=False):
+        clean_path = str(media_path or "").strip()
+        if clean_path.startswith("file:"):
+            clean_path = url2pathname(urlparse(clean_path).path)
+        if not clean_path or clean_path.startswith(("http://", "https://", "blob:")):
+            raise ValueError("Invalid video path")
+        if require_absolute and not os.path.isabs(clean_path):
+            raise ValueError("Video path must be absolute")
+        return os.path.abspath(clean_path)
+
+    def resolve(self, media_path):
+        raw_key = str(media_path or "")
+        with self._lock:
+            cached = self._identities.get(raw_key)
+            if cached:
+                self._identities.move_to_end(raw_key)
+        path = cached.path if cached else self.clean(media_path)
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            stat_result = None
+
+        if cached and cached.exists == (stat_result is not None) and (
+            stat_result is None or (cached.mtime_ns, cached.size) == (stat_result.st_mtime_ns, stat_result.st_size)
+        ):
+            return cached
+
+        identity = MediaIdentity(path, stat_result, self)
+        with self._lock:
+            self._identities[raw_key] = identity
+            self._identities.move_to_end(raw_key)
+            while len(self._identities) > MAX_IDENTITIES:
+                self._identities.popitem(last=False)
+        return identity
+
+    def find_tool(self, name):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._tools.get(name)
+        if cached and (cached[0] or now - cached[1] < MISSING_TOOL_TTL):
+            return cached[0]
+
+        found = self._search_tool(name)
+        with self._lock:
+            self._tools[name] = (found, now)
+        return found
+
+    def forget(self):
+        with self._lock:
+            self._identities.clear()
+            self._tools.clear()
+
+    def _search_tool(self, name):
+        executable = f"{name}.exe" if os.name == "nt" else name
+        candidates = [
+            shutil.which(name),
+            os.path.join(os.getcwd(), executable),
+            os.path.join(os.getcwd(), "bin", executable),
+            os.path.join(os.getcwd(), "tools", "ffmpeg", "bin", executable),
+            os.path.join(ROOT_DIR, executable),
+            os.path.join(ROOT_DIR, "backend", executable),
+            os.path.join(ROOT_DIR, "bin", executable),
+            os.path.join(ROOT_DIR, "tools", "ffmpeg", "bin", executable),
+        ]
+        for candidate in candidates:
+            if candidate and os.path.isfile(candidate):
+                return candidate
+        return None
@@ -0,0 +1,244 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .media_identity import MediaResolver
+from .task_registry import TaskRegistry
+from .tracking_analytics_service import TRACK_TYPES, track_key
+
+
+SOURCE = "auto-tracking"
+WORK_WIDTH = 640
+SEARCH_RADIUS = 12
+MIN_FEATURES = 3
+LK_PARAMS = {
+    "winSize": (15, 15),
+    "maxLevel": 3,
+    "criteria": (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+}
+
+
+class PlayerTrackingService:
+    def __init__(self, project_data, media=None, tasks=None):
+        self.project_data = project_data
+        self.media = media or MediaResolver()
+        self.tasks = tasks or TaskRegistry()
+
+    def start_tracking(self, video_path, time_from, time_to=None, targets=None, rate=10, work_width=WORK_WIDTH):
+        try:
+            media = self.media.resolve(video_path)
+            time_from = max(0.0, float(time_from or 0))
+            time_to = None if time_to is None else float(time_to)
+            rate = max(1.0, min(float(rate or 10), 30.0))
+            work_width = max(160, min(int(work_width or WORK_WIDTH), 1920))
+            if not media.is_file:
+                return {"status": "error", "message": "Input video was not found."}
+            if time_to is not None and time_to <= time_from:
+                return {"status": "error", "message": "Tracking end must be after tracking start."}
+            project = self.project_data.snapshot(media.path)
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "Invalid tracking parameters."}
+
+        seeds = self._seeds(project.get("items"), time_from, targets)
+        if not seeds:
+            return {"status": "error", "message": "No player or ball markers to track from at this time."}
+
+        task_id = self.tasks.create("track", {"message": "Preparing tracking...", "targets": [seed["key"] for seed in seeds]})
+        thread = threading.Thread(
+            target=self._track_task,
+            args=(task_id, media.path, seeds, time_from, time_to, rate, work_width),
+            daemon=True,
+        )
+        thread.start()
+        return {"task_id": task_id, "status": "processing", "targets": [seed["key"] for seed in seeds]}
+
+    def get_tracking_status(self, task_id):
+        return self.tasks.status(task_id, "Tracking task was not found.")
+
+    def cancel_tracking(self, task_id):
+        return self.tasks.cancel(task_id, "Canceling tracking...", "Tracking task was not found.")
+
+    def _seeds(self, items, time_from, targets):
+        wanted = set(targets or [])
+        seeds = {}
+        for item in items or []:
+            if item.get("type") not in TRACK_TYPES or item.get("visible") is False or not isinstance(item.get("point"), dict):
+                continue
+            key = track_key(item)
+            if wanted and key not in wanted and item.get("id") not in wanted:
+                continue
+            try:
+                start = float(item.get("time_from") or 0)
+                x = float(item["point"]["x"])
+                y = float(item["point"]["y"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            # The seed is the latest marker placed at or before the start of the tracked range.
+            if start > time_from + 1e-3 or not (0 <= x <= 100 and 0 <= y <= 100):
+                continue
+            if key not in seeds or start >= seeds[key]["time"]:
+                seeds[key] = {"key": key, "time": start, "point": (x, y), "item": item}
+        return [seeds[key] for key in sorted(seeds)]
+
+    def _track_task(self, task_id, input_path, seeds, time_from, time_to, rate, work_width):
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            self.tasks.set(task_id, {"status": "error", "message": f"Could not open video: {input_path}"})
+            return
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        duration = frame_count / fps if frame_count > 0 else None
+        end = min(time_to, duration) if time_to is not None and duration else (time_to or duration or time_from + 60)
+        step = max(1, int(round(fps / rate)))
+        frame_index = int(round(time_from * fps))
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+
+        ok, frame = cap.read()
+        if not ok:
+            cap.release()
+            self.tasks.set(task_id, {"status": "error", "message": "Could not read the first tracking frame."})
+            return
+        source_height, source_width = frame.shape[:2]
+        scale = min(1.0, work_width / source_width)
+        size = (max(1, int(source_width * scale)), max(1, int(source_height * scale)))
+        previous = self._gray(frame, size)
+
+        centers = np.array([[seed["point"][0] / 100 * size[0], seed["point"][1] / 100 * size[1]] for seed in seeds], dtype=np.float32)
+        active = np.ones(len(seeds), dtype=bool)
+        samples = [[] for _ in seeds]
+        started_at = time.time()
+        last_update = 0
+
+        while active.any():
+            if self.tasks.is_cancel_requested(task_id):
+                cap.release()
+                self.tasks.set(task_id, {"status": "canceled", "progress": 0, "message": "Tracking canceled.", "estimated_seconds": 0})
+                return
+
+            # Skipped frames are grabbed without being converted; only sampled frames are retrieved.
+            for _ in range(step - 1):
+                if not cap.grab():
+                    break
+            frame_index += step
+            frame_time = frame_index / fps
+            if frame_time > end:
+                break
+            ok, frame = cap.read()
+            if not ok:
+                break
+
+            current = self._gray(frame, size)
+            points, owners = self._features(previous, centers, active, size)
+            if len(points):
+                moved, status, _ = cv2.calcOpticalFlowPyrLK(previous, current, points, None, **LK_PARAMS)
+                back, back_status, _ = cv2.calcOpticalFlowPyrLK(current, previous, moved, None, **LK_PARAMS)
+                # Forward-backward check: features that do not return to where they started are dropped.
+                good = (status[:, 0] == 1) & (back_status[:, 0] == 1) & (np.linalg.norm((back - points)[:, 0], axis=1) < 1.0)
+                shift = (moved - points)[:, 0]
+                for target in np.flatnonzero(active):
+                    mine = good & (owners == target)
+                    if mine.sum() < MIN_FEATURES:
+                        active[target] = False
+                        continue
+                    centers[target] += np.median(shift[mine], axis=0)
+                    x, y = centers[target]
+                    if not (0 <= x < size[0] and 0 <= y < size[1]):
+                        active[target] = False
+                        continue
+                    samples[target].append((frame_time, float(x / size[0] * 100), float(y / size[1] * 100)))
+            else:
+                active[:] = False
+            previous = current
+
+            now = time.time()
+            if now - last_update >= 0.5:
+                last_update = now
+                self._update_progress(task_id, time_from, frame_time, end, started_at, int(active.sum()))
+
+        cap.release()
+        if not any(samples):
+            self.tasks.set(task_id, {"status": "error", "message": "Targets were lost before the first tracked frame."})
+            return
+
+        self.tasks.set(task_id, {"progress": 99, "message": "Saving tracked markers...", "estimated_seconds": None})
+        saved = self._write_items(input_path, seeds, samples, rate)
+        elapsed = max(0.001, time.time() - started_at)
+        tracked_seconds = max(sample[-1][0] for sample in samples if sample) - time_from
+        self.tasks.set(task_id, {
+            "status": "done" if saved.get("status") == "success" else "error",
+            "progress": 100,
+            "message": "Tracking saved." if saved.get("status") == "success" else saved.get("message", "Could not save tracking."),
+            "estimated_seconds": 0,
+            "revision": saved.get("revision"),
+            "tracked": {seed["key"]: len(sample) for seed, sample in zip(seeds, samples)},
+            "lost": [seed["key"] for seed, alive in zip(seeds, active) if not alive],
+            "speed": round(tracked_seconds / elapsed, 2),
+        })
+
+    def _gray(self, frame, size):
+        if (frame.shape[1], frame.shape[0]) != size:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def _features(self, gray, centers, active, size):
+        points = []
+        owners = []
+        for target in np.flatnonzero(active):
+            x, y = centers[target]
+            x0 = max(0, int(x) - SEARCH_RADIUS)
+            y0 = max(0, int(y) - SEARCH_RADIUS)
+            x1 = min(size[0], int(x) + SEARCH_RADIUS + 1)
+            y1 = min(size[1], int(y) + SEARCH_RADIUS + 1)
+            if x1 - x0 < 3 or y1 - y0 < 3:
+                continue
+            corners = cv2.goodFeaturesToTrack(gray[y0:y1, x0:x1], 12, 0.01, 2)
+            if corners is None or len(corners) < MIN_FEATURES:
+                # Flat patches have no corners; a small grid around the marker still follows the blob.
+                grid = np.mgrid[-4:5:4, -4:5:4].reshape(2, -1).T[:, ::-1].astype(np.float32)
+                corners = (grid + [x - x0, y - y0]).reshape(-1, 1, 2)
+            points.append(corners.astype(np.float32) + np.array([x0, y0], dtype=np.float32))
+            owners.extend([target] * len(corners))
+        if not points:
+            return np.zeros((0, 1, 2), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return np.concatenate(points), np.array(owners)
+
+    def _update_progress(self, task_id, time_from, frame_time, end, started_at, active_count):
+        span = max(0.001, end - time_from)
+        progress = max(0, min(98, int((frame_time - time_from) / span * 100)))
+        elapsed = max(0.001, time.time() - started_at)
+        self.tasks.set(task_id, {
+            "progress": progress,
+            "message": f"Tracking {active_count} target(s)... {progress}%",
+            "estimated_seconds": max(0, int(elapsed / max(progress, 1) * (100 - progress))) if progress else None,
+            "speed": round((frame_time - time_from) / elapsed, 2),
+        })
+
+    def _write_items(self, input_path, seeds, samples, rate):
+        duration = round(1 / rate, 3)
+        project = self.project_data.snapshot(input_path)
+        replaced = {}
+        for seed, sample in zip(seeds, samples):
+            if sample:
+                replaced[seed["key"]] = (sample[0][0], sample[-1][0])
+        ops = []
+        for item in project.get("items") or []:
+            span = replaced.get(track_key(item)) if item.get("source") == SOURCE else None
+            if span and span[0] <= float(item.get("time_from") or 0) <= span[1] + duration:
+                ops.append({"op": "delete", "collection": "items", "id": item.get("id")})
+
+        for seed, sample in zip(seeds, samples):
+            template = {key: value for key, value in seed["item"].items() if key not in {"id", "point", "time_from", "time_to"}}
+            for frame_time, x, y in sample:
+                ops.append({"op": "upsert", "collection": "items", "item": {
+                    **template,
+                    "id": f"{SOURCE}-{seed['key']}-{int(round(frame_time * 1000))}",
+                    "point": {"x": round(x, 3), "y": round(y, 3)},
+                    "time_from": round(frame_time, 3),
+                    "time_to": round(frame_time + duration, 3),
+                    "source": SOURCE,
+                    "track": seed["key"],
+                }})
+        return self.project_data.patch(input_path, None, ops)
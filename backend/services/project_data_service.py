@@ -1,24 +1,25 @@
-import json
-import os
 from pathlib import Path
 
+from .compact_format import read_document, write_document
+from .document_patch import DocumentStore, RevisionConflict, apply_document_ops, apply_list_ops
+from .media_identity import MediaResolver
+
 
 class ProjectDataService:
-    def __init__(self):
+    def __init__(self, compact=None, media=None):
         self.extension = ".json"
+        self.media = media or MediaResolver()
+        self.compact = compact
+        self.store = DocumentStore()
+        self.collections = ("events", "items")
 
     def _clean_path(self, video_path):
-        clean_path = str(video_path or "").replace("file:///", "").replace("file://", "")
-        if not clean_path or "http://localhost" in clean_path or "blob:" in clean_path:
-            raise ValueError("Invalid video path")
-        normalized_path = os.path.normpath(clean_path)
-        if not os.path.isabs(normalized_path):
-            raise ValueError("Video path must be absolute")
-        return normalized_path
+        # A relative path would key the project to the current working directory, so projects keep requiring absolute paths.
+        self.media.clean(video_path, require_absolute=True)
+        return self.media.resolve(video_path).path
 
     def _project_path(self, video_path):
-        base, _ = os.path.splitext(self._clean_path(video_path))
-        return base + self.extension
+        return self.media.resolve(video_path).sidecar(self.extension, replace_extension=True)
 
     def file_url(self, video_path):
         return Path(self._clean_path(video_path)).as_uri()
@@ -38,37 +39,42 @@ class ProjectDataService:
         try:
             clean_path = self._clean_path(video_path)
             project_path = self._project_path(clean_path)
-            if not os.path.exists(project_path):
+            try:
+                data = read_document(project_path)
+            except FileNotFoundError:
                 data = self._empty_data(clean_path)
-                self.save(clean_path, data)
+                data["revision"] = self.save(clean_path, data).get("revision", 0)
                 return data
 
-            with open(project_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-
-            return {
+            revision = max(int(data.get("revision") or 0), self.store.revision(project_path))
+            data = {
                 **self._empty_data(clean_path),
                 **data,
                 "video_path": clean_path,
+                "revision": revision,
             }
+            self.store.remember(project_path, data, revision)
+            return dict(data)
         except Exception as error:
             print(f"Error loading project data: {error}")
             return self._empty_data(video_path)
 
-    def save(self, video_path, data):
+    def save(self, video_path, data, compact=None):
         try:
             clean_path = self._clean_path(video_path)
             project_path = self._project_path(clean_path)
-            payload = {
-                **self._empty_data(clean_path),
-                **(data or {}),
-                "video_path": clean_path,
-            }
-
-            with open(project_path, "w", encoding="utf-8") as file:
-                json.dump(payload, file, indent=2, ensure_ascii=False)
-
-            return {"status": "success", "path": project_path}
+            with self.store.lock(project_path):
+                revision = self.store.next_revision(project_path)
+                payload = {
+                    **self._empty_data(clean_path),
+                    **(data or {}),
+                    "video_path": clean_path,
+                    "revision": revision,
+                }
+                written_path = write_document(project_path, payload, compact=self.compact if compact is None else compact)
+                self.store.remember(project_path, payload, revision)
+
+            return {"status": "success", "path": written_path, "revision": revision}
         except Exception as error:
             print(f"Error saving project data: {error}")
             return {"status": "error", "message": str(error)}
@@ -80,18 +86,44 @@ class ProjectDataService:
 
     def update_event(self, video_path, event_id, patch):
         data = self.load(video_path)
-        for event in data["events"]:
-            if event.get("id") == event_id:
-                event.update(patch or {})
-                break
+        if any(event.get("id") == event_id for event in data["events"]):
+            data["events"] = apply_list_ops(data["events"], [{"op": "update", "id": event_id, "patch": patch}])
         return self.save(video_path, data)
 
     def delete_event(self, video_path, event_id):
         data = self.load(video_path)
-        data["events"] = [event for event in data["events"] if event.get("id") != event_id]
+        if any(event.get("id") == event_id for event in data["events"]):
+            data["events"] = apply_list_ops(data["events"], [{"op": "delete", "id": event_id}])
         return self.save(video_path, data)
 
     def delete_all_events(self, video_path):
         data = self.load(video_path)
         data["events"] = []
         return self.save(video_path, data)
+
+    def snapshot(self, video_path):
+        # Read-only view for analysis services: reuses the last loaded/saved document while the sidecar is unchanged.
+        try:
+            cached = self.store.cached(self._project_path(video_path))
+        except ValueError:
+            cached = None
+        return cached if cached is not None else self.load(video_path)
+
+    def revision(self, video_path):
+        return self.store.revision(self._project_path(video_path))
+
+    def patch(self, video_path, revision, ops):
+        try:
+            clean_path = self._clean_path(video_path)
+            project_path = self._project_path(clean_path)
+            with self.store.lock(project_path):
+                data = self.store.cached(project_path)
+                if data is None:
+                    data = self.load(clean_path)
+                self.store.check(project_path, revision)
+                return self.save(clean_path, apply_document_ops(data, ops, self.collections))
+        except RevisionConflict as conflict:
+            return {"status": "conflict", "revision": conflict.revision, "message": str(conflict)}
+        except Exception as error:
+            print(f"Error patching project data: {error}")
+            return {"status": "error", "message": str(error)}
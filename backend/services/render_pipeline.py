@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+RING_SIZE = 6
+POLL_SECONDS = 0.05
+STAGES = ("decode", "draw", "encode")
+_STOPPED = object()
+
+
+class RenderPipeline:
+    def __init__(self, shape, ring_size=RING_SIZE, profiler=None):
+        # A fixed ring of frames is recycled through the stages; the free queue is the only allocator.
+        self.buffers = [np.empty(shape, dtype=np.uint8) for _ in range(max(2, int(ring_size)))]
+        self.canceled = False
+        self.written = 0
+        self.profiler = profiler
+        self._timings = {stage: {"busy": 0.0, "wait": 0.0, "frames": 0} for stage in STAGES}
+        self._timings_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._cancel = None
+        self._error = None
+
+    def run(self, decode, draw, encode, count, cancel=None, progress=None):
+        # decode(index, buffer) -> bool fills a buffer (False ends the run), draw(index, buffer) edits it in place,
+        # encode(index, buffer) consumes it on the calling thread. Frames stay in order: one thread per stage, FIFO queues.
+        self._cancel = cancel
+        free = queue.Queue(len(self.buffers))
+        decoded = queue.Queue(len(self.buffers))
+        drawn = queue.Queue(len(self.buffers))
+        for slot in range(len(self.buffers)):
+            free.put(slot)
+
+        workers = [
+            threading.Thread(target=self._guard, args=(self._decode_stage, decode, count, free, decoded), name="render-decode", daemon=True),
+            threading.Thread(target=self._guard, args=(self._draw_stage, draw, decoded, drawn), name="render-draw", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        processed = 0
+        try:
+            while True:
+                item = self._get(drawn, "encode")
+                if item is None or item is _STOPPED:
+                    break
+                index, slot = item
+                started_at = time.perf_counter()
+                encode(index, self.buffers[slot])
+                self._add("encode", "busy", started_at)
+                free.put(slot)
+                processed += 1
+                self.written = processed
+                if progress:
+                    progress(processed)
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+        if self._error is not None:
+            raise self._error
+        return processed
+
+    def stage_timings(self):
+        with self._timings_lock:
+            timings = {
+                stage: {
+                    "seconds": round(values["busy"], 3),
+                    "wait_seconds": round(values["wait"], 3),
+                    "fps": round(values["frames"] / values["busy"], 1) if values["busy"] > 0 else None,
+                }
+                for stage, values in self._timings.items()
+            }
+        timings["bottleneck"] = max(STAGES, key=lambda stage: timings[stage]["seconds"])
+        return timings
+
+    def _decode_stage(self, decode, count, free, decoded):
+        for index in range(count):
+            slot = self._get(free, "decode")
+            if slot is _STOPPED:
+                return
+            started_at = time.perf_counter()
+            filled = decode(index, self.buffers[slot])
+            self._add("decode", "busy", started_at)
+            if not filled:
+                break
+            if not self._put(decoded, (index, slot)):
+                return
+        self._put(decoded, None)
+
+    def _draw_stage(self, draw, decoded, drawn):
+        while True:
+            item = self._get(decoded, "draw")
+            if item is _STOPPED:
+                return
+            if item is not None:
+                started_at = time.perf_counter()
+                draw(item[0], self.buffers[item[1]])
+                self._add("draw", "busy", started_at)
+            if not self._put(drawn, item) or item is None:
+                return
+
+    def _guard(self, stage, *args):
+        try:
+            stage(*args)
+        except BaseException as error:
+            self._error = error
+            self._stop.set()
+
+    def _stopping(self):
+        if not self._stop.is_set() and self._cancel and self._cancel():
+            self.canceled = True
+            self._stop.set()
+        return self._stop.is_set()
+
+    def _get(self, source, stage):
+        started_at = time.perf_counter()
+        try:
+            while not self._stopping():
+                try:
+                    return source.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    continue
+            return _STOPPED
+        finally:
+            self._add(stage, "wait", started_at, count=False)
+
+    def _put(self, target, item):
+        while not self._stopping():
+            try:
+                target.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _add(self, stage, kind, started_at, count=True):
+        elapsed = time.perf_counter() - started_at
+        if count and self.profiler:
+            self.profiler.record(stage, started_at, elapsed)
+        with self._timings_lock:
+            self._timings[stage][kind] += elapsed
+            if count:
+                self._timings[stage]["frames"] += 1
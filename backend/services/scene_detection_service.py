@@ -0,0 +1,285 @@
+import subprocess
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .media_identity import MediaResolver
+from .task_registry import TaskRegistry
+
+
+SOURCE = "scene-detection"
+ANALYSIS_SIZE = (160, 90)
+SAMPLE_RATE = 10
+BATCH_SIZE = 64
+FLUSH_SECONDS = 5.0
+HISTOGRAM_BINS = 8
+
+
+def frame_features(frames, previous=None):
+    # frames: (B, H, W, 3) uint8. Returns the histogram distance and motion energy of every frame
+    # against the one before it, with `previous` carrying the last frame of the prior batch.
+    count = len(frames)
+    shift = 8 - int(np.log2(HISTOGRAM_BINS))
+    quantized = (frames >> shift).astype(np.int32)
+    bins = (quantized[..., 0] * HISTOGRAM_BINS + quantized[..., 1]) * HISTOGRAM_BINS + quantized[..., 2]
+    bins += (np.arange(count, dtype=np.int32) * HISTOGRAM_BINS ** 3)[:, None, None]
+    size = HISTOGRAM_BINS ** 3
+    histograms = np.bincount(bins.ravel(), minlength=count * size).reshape(count, size).astype(np.float32)
+    histograms /= frames.shape[1] * frames.shape[2]
+    gray = frames.mean(axis=-1, dtype=np.float32)
+
+    if previous is None:
+        previous_histogram = histograms[:1]
+        previous_gray = gray[:1]
+    else:
+        previous_histogram, previous_gray = previous
+    histogram_chain = np.concatenate([previous_histogram, histograms])
+    gray_chain = np.concatenate([previous_gray, gray])
+    difference = np.abs(np.diff(histogram_chain, axis=0)).sum(axis=1) / 2
+    motion = np.abs(np.diff(gray_chain, axis=0)).mean(axis=(1, 2)) / 255
+    return difference, motion, (histograms[-1:], gray[-1:])
+
+
+class SceneDetectionService:
+    def __init__(self, project_data, media=None, tasks=None):
+        self.project_data = project_data
+        self.media = media or MediaResolver()
+        self.tasks = tasks or TaskRegistry()
+
+    def start_detection(self, video_path, time_from=0, time_to=None, sample_rate=SAMPLE_RATE, cut_threshold=0.3, activity_factor=2.5, min_activity=2.0):
+        try:
+            media = self.media.resolve(video_path)
+            options = {
+                "time_from": max(0.0, float(time_from or 0)),
+                "time_to": None if time_to is None else float(time_to),
+                "rate": max(1.0, min(float(sample_rate or SAMPLE_RATE), 30.0)),
+                "cut_threshold": max(0.05, min(float(cut_threshold), 1.0)),
+                "activity_factor": max(1.0, float(activity_factor)),
+                "min_activity": max(0.1, float(min_activity)),
+            }
+            if not media.is_file:
+                return {"status": "error", "message": "Input video was not found."}
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "Invalid detection parameters."}
+
+        task_id = self.tasks.create("detect", {"message": "Preparing detection...", "events": []})
+        thread = threading.Thread(target=self._detect_task, args=(task_id, media, options), daemon=True)
+        thread.start()
+        return {"task_id": task_id, "status": "processing"}
+
+    def _detect_task(self, task_id, media, options):
+        try:
+            self._run_detection(task_id, media, options)
+        except (cv2.error, OSError, ValueError) as error:
+            self.tasks.set(task_id, {"status": "error", "message": f"Scene detection failed: {error}", "estimated_seconds": 0})
+
+    def _run_detection(self, task_id, media, options):
+        time_from = options["time_from"]
+        rate = options["rate"]
+        duration = self._duration(media)
+        end = min(options["time_to"] or duration or 0, duration or options["time_to"] or 0)
+        if end <= time_from:
+            self.tasks.set(task_id, {"status": "error", "message": "Could not read the video duration."})
+            return
+
+        reader = self._ffmpeg_batches(media, time_from, end, rate) if media.ffmpeg else self._opencv_batches(media.path, time_from, end, rate)
+        state = {"previous": None, "differences": [], "last_cut": -np.inf, "motion": [], "activity_start": None, "activity_peak": 0.0}
+        events = []
+        started_at = time.time()
+        last_flush = started_at
+        analyzed = time_from
+        batches = 0
+        try:
+            for times, frames in reader:
+                if self.tasks.is_cancel_requested(task_id):
+                    self.tasks.set(task_id, {"status": "canceled", "progress": 0, "message": "Detection canceled.", "estimated_seconds": 0})
+                    return
+                events.extend(self._detect(times, frames, state, options))
+                analyzed = float(times[-1])
+                batches += 1
+                elapsed = max(0.001, time.time() - started_at)
+                progress = max(0, min(98, int((analyzed - time_from) / (end - time_from) * 100)))
+                self.tasks.set(task_id, {
+                    "progress": progress,
+                    "message": f"Detecting scenes... {progress}%",
+                    "estimated_seconds": int(elapsed / max(progress, 1) * (100 - progress)) if progress else None,
+                    "speed": round((analyzed - time_from) / elapsed, 2),
+                    "events": list(events),
+                })
+                # Partial results reach the project periodically so the timeline fills in while the job runs;
+                # only the part analyzed so far is replaced.
+                if time.time() - last_flush >= FLUSH_SECONDS:
+                    self._save(media.path, events, time_from, analyzed)
+                    last_flush = time.time()
+        finally:
+            reader.close()
+
+        if not batches:
+            self.tasks.set(task_id, {"status": "error", "progress": 0, "message": "No frames could be read from the video.", "estimated_seconds": 0})
+            return
+        events.extend(self._close_activity(state, analyzed, options))
+        saved = self._save(media.path, events, time_from, end)
+        elapsed = max(0.001, time.time() - started_at)
+        self.tasks.set(task_id, {
+            "status": "done" if saved.get("status") == "success" else "error",
+            "progress": 100,
+            "message": f"Found {len(events)} candidate event(s)." if saved.get("status") == "success" else saved.get("message", "Could not save events."),
+            "estimated_seconds": 0,
+            "speed": round((analyzed - time_from) / elapsed, 2),
+            "revision": saved.get("revision"),
+            "events": events,
+        })
+
+    def _detect(self, times, frames, state, options):
+        difference, motion, state["previous"] = frame_features(frames, state["previous"])
+        state["differences"].append(difference)
+        # Fast pans also move the histogram; a cut has to stand out from the typical change as well.
+        typical = np.median(np.concatenate(state["differences"][-64:]))
+        cut = (difference >= options["cut_threshold"]) & (difference >= typical * 4)
+        events = []
+        for frame_time, score in zip(times[cut], difference[cut]):
+            if frame_time - state["last_cut"] < 1.0:
+                continue
+            state["last_cut"] = frame_time
+            events.append({"id": f"{SOURCE}-cut-{int(round(frame_time * 1000))}", "label": "Cut", "time_from": round(float(frame_time), 3), "score": round(float(score), 3), "source": SOURCE})
+
+        # A cut shows up as motion too; those samples are left out of the activity baseline.
+        motion = np.where(cut, np.nan, motion)
+        state["motion"].append(motion)
+        history = np.concatenate(state["motion"])
+        baseline = np.nanmedian(history) if np.isfinite(history).any() else 0
+        window = max(1, int(options["rate"]))
+        recent = np.nan_to_num(history[-(len(motion) + window - 1):], nan=baseline)
+        recent = np.concatenate([np.full(len(motion) + window - 1 - len(recent), baseline), recent])
+        smoothed = np.convolve(recent, np.ones(window) / window, mode="valid")
+        active = smoothed > max(baseline * options["activity_factor"], 1e-3)
+        # The moving average trails the signal; shift it back by half a window.
+        centered = times - (window - 1) / (2 * options["rate"])
+        for frame_time, is_active, energy in zip(centered, active, smoothed):
+            if is_active:
+                if state["activity_start"] is None:
+                    state["activity_start"] = float(frame_time)
+                    state["activity_peak"] = 0.0
+                state["activity_peak"] = max(state["activity_peak"], float(energy / max(baseline, 1e-6)))
+            elif state["activity_start"] is not None:
+                events.extend(self._close_activity(state, float(frame_time), options))
+        return events
+
+    def _close_activity(self, state, frame_time, options):
+        start = state["activity_start"]
+        state["activity_start"] = None
+        if start is None or frame_time - start < options["min_activity"]:
+            return []
+        return [{
+            "id": f"{SOURCE}-activity-{int(round(start * 1000))}",
+            "label": "Activity",
+            "time_from": round(start, 3),
+            "time_to": round(frame_time, 3),
+            "score": round(state["activity_peak"], 3),
+            "source": SOURCE,
+        }]
+
+    def _save(self, video_path, found, time_from, time_to):
+        found_ids = {event["id"] for event in found}
+        ops = [
+            {"op": "delete", "collection": "events", "id": event["id"]}
+            for event in self.project_data.snapshot(video_path).get("events") or []
+            if event.get("source") == SOURCE and event.get("id") is not None and event["id"] not in found_ids
+            and time_from <= float(event.get("time_from") or 0) <= time_to
+        ]
+        ops += [{"op": "upsert", "collection": "events", "item": event} for event in found]
+        return self.project_data.patch(video_path, None, ops)
+
+    def _duration(self, media):
+        # The container duration is exact; OpenCV's frame count is an estimate for many VFR and MPEG-TS files.
+        if media.ffprobe:
+            try:
+                output = subprocess.run(
+                    [media.ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", media.path],
+                    capture_output=True, text=True, timeout=15,
+                ).stdout
+                return float(output.strip())
+            except (OSError, subprocess.SubprocessError, ValueError):
+                pass
+        cap = cv2.VideoCapture(media.path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0
+            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+            return frame_count / fps if fps > 0 and frame_count > 0 else None
+        finally:
+            cap.release()
+
+    def _ffmpeg_batches(self, media, time_from, time_to, rate):
+        width, height = ANALYSIS_SIZE
+        command = [
+            media.ffmpeg, "-v", "error", "-ss", f"{time_from:.3f}", "-t", f"{time_to - time_from:.3f}", "-i", media.path,
+            "-an", "-sn", "-vf", f"fps={rate},scale={width}:{height}:flags=area", "-pix_fmt", "bgr24", "-f", "rawvideo", "-",
+        ]
+        # stderr goes to a file so it can be reported without ever blocking ffmpeg on a full pipe.
+        errors = tempfile.TemporaryFile()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+        batch = np.empty((BATCH_SIZE, height, width, 3), dtype=np.uint8)
+        frame_bytes = width * height * 3
+        index = 0
+        try:
+            while True:
+                filled = 0
+                while filled < BATCH_SIZE:
+                    view = memoryview(batch[filled].reshape(-1))
+                    read = 0
+                    while read < frame_bytes:
+                        chunk = process.stdout.readinto(view[read:])
+                        if not chunk:
+                            break
+                        read += chunk
+                    if read < frame_bytes:
+                        break
+                    filled += 1
+                if filled:
+                    yield time_from + (index + np.arange(filled)) / rate, batch[:filled]
+                    index += filled
+                if filled < BATCH_SIZE:
+                    break
+            if process.wait() != 0:
+                errors.seek(0)
+                message = errors.read().decode("utf-8", "replace").strip()
+                raise OSError(message[-500:] or f"ffmpeg exited with code {process.returncode}.")
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+            errors.close()
+
+    def _opencv_batches(self, input_path, time_from, time_to, rate):
+        cap = cv2.VideoCapture(input_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        step = max(1, int(round(fps / rate)))
+        frame_index = int(round(time_from * fps))
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        batch = np.empty((BATCH_SIZE, ANALYSIS_SIZE[1], ANALYSIS_SIZE[0], 3), dtype=np.uint8)
+        times = np.empty(BATCH_SIZE)
+        filled = 0
+        try:
+            while frame_index / fps <= time_to:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                times[filled] = frame_index / fps
+                cv2.resize(frame, ANALYSIS_SIZE, dst=batch[filled], interpolation=cv2.INTER_AREA)
+                filled += 1
+                if filled == BATCH_SIZE:
+                    yield times.copy(), batch
+                    filled = 0
+                # Only sampled frames are retrieved; the rest are grabbed to keep the decoder sequential.
+                for _ in range(step - 1):
+                    if not cap.grab():
+                        break
+                frame_index += step
+            if filled:
+                yield times[:filled].copy(), batch[:filled]
+        finally:
+            cap.release()
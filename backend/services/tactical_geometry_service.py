@@ -0,0 +1,363 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+import numpy as np
+
+from .tracking_analytics_service import extract_tracks, field_calibration, project_points, resample_tracks
+
+
+GEOMETRY_KINDS = ("voronoi", "lanes", "pressure", "closest")
+PARALLEL_MIN_FRAMES = 4000
+TEAM_COLORS = {"home": "#3caaff", "guest": "#ff5a3c"}
+SOURCE = "tactical-geometry"
+# Saved overlays are one item per player and frame, so a save covers a bounded window, never the whole match.
+MAX_SAVE_SECONDS = 120
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def voronoi_cells(sites, bounds):
+    # Half-plane clipping of the field rectangle, vectorized over frames: every cell is convex,
+    # so one clip adds at most one vertex and cells fit in a fixed (4 + sites) vertex buffer.
+    # Neighbours are clipped nearest first, which leaves most later half-planes with nothing to cut.
+    frames, count, _ = sites.shape
+    size = 4 + count
+    (x0, y0), (x1, y1) = bounds
+    rectangle = np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.float64)
+    valid = np.isfinite(sites).all(axis=-1)
+    cells = np.zeros((frames, count, size, 2), dtype=np.float32)
+    counts = np.zeros((frames, count), dtype=np.int16)
+    rows = np.arange(frames)
+    for site in range(count):
+        polygons = np.zeros((frames, size, 2), dtype=np.float64)
+        polygons[:, :4] = rectangle
+        vertex_counts = np.where(valid[:, site], 4, 0)
+        origin = np.where(valid[:, site, None], sites[:, site], 0)
+        distance = np.where(valid, ((sites - origin[:, None, :]) ** 2).sum(axis=-1), np.inf)
+        distance[:, site] = np.inf
+        order = np.argsort(distance, axis=1)
+        for step in range(count - 1):
+            other = order[:, step]
+            active = valid[:, site] & np.isfinite(distance[rows, other])
+            target = np.where(active[:, None], sites[rows, other], 0)
+            normal = np.where(active[:, None], target - origin, 0)
+            offset = np.where(active, (normal * (origin + target)).sum(axis=-1) / 2, 1)
+            _clip(polygons, vertex_counts, normal, offset)
+        cells[:, site] = polygons
+        counts[:, site] = vertex_counts
+    return cells, counts
+
+
+def _clip(polygons, counts, normal, offset):
+    size = polygons.shape[1]
+    width = int(counts.max()) if len(counts) else 0
+    index = np.arange(width)
+    live = index[None, :] < counts[:, None]
+    side = polygons[:, :width, 0] * normal[:, None, 0] + polygons[:, :width, 1] * normal[:, None, 1] - offset[:, None]
+    rows = np.flatnonzero((live & (side > 0)).any(axis=1))
+    if not len(rows):
+        return
+    polygon = polygons[rows, :width]
+    side = side[rows]
+    live = live[rows]
+    following_index = np.where(index[None, :] + 1 < counts[rows, None], index[None, :] + 1, 0)
+    following = np.take_along_axis(polygon, following_index[..., None], axis=1)
+    next_side = np.take_along_axis(side, following_index, axis=1)
+    inside = side <= 0
+    crosses = live & (inside != (next_side <= 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(crosses, side / (side - next_side), 0)
+    crossing = polygon + ratio[..., None] * (following - polygon)
+
+    candidates = np.stack([polygon, crossing], axis=2).reshape(len(rows), width * 2, 2)
+    keep = np.stack([live & inside, crosses], axis=2).reshape(len(rows), width * 2)
+    order = np.argsort(~keep, axis=1, kind="stable")[:, :size]
+    polygons[rows, :order.shape[1]] = np.take_along_axis(candidates, order[..., None], axis=1)
+    counts[rows] = np.minimum(keep.sum(axis=1), size)
+
+
+def voronoi_parallel(sites, bounds, workers):
+    if workers <= 1 or len(sites) < PARALLEL_MIN_FRAMES:
+        return voronoi_cells(sites, bounds)
+    chunks = np.array_split(sites, workers)
+    try:
+        parts = list(_shared_pool(workers).map(voronoi_cells, chunks, repeat(bounds)))
+    except BrokenProcessPool:
+        _reset_pool()
+        return voronoi_cells(sites, bounds)
+    return np.concatenate([cells for cells, _ in parts]), np.concatenate([counts for _, counts in parts])
+
+
+def _shared_pool(workers):
+    # Spawning workers costs about a second each on Windows, so one pool is kept for the whole process.
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def nearest_opponents(players, teams):
+    delta = players[:, :, None, :] - players[:, None, :, :]
+    distance = np.hypot(delta[..., 0], delta[..., 1])
+    opponent = teams[:, None] != teams[None, :]
+    distance = np.where(opponent[None] & np.isfinite(distance), distance, np.inf)
+    nearest = np.argmin(distance, axis=2)
+    nearest_distance = np.take_along_axis(distance, nearest[..., None], axis=2)[..., 0]
+    return nearest, nearest_distance, distance
+
+
+def passing_lanes(players, teams, ball, lane_width, carry_distance):
+    frames, count, _ = players.shape
+    rows = np.arange(frames)
+    to_ball = np.hypot(players[..., 0] - ball[:, None, 0], players[..., 1] - ball[:, None, 1])
+    to_ball = np.where(np.isfinite(to_ball), to_ball, np.inf)
+    carrier = np.argmin(to_ball, axis=1)
+    has_carrier = to_ball[rows, carrier] <= carry_distance
+
+    start = players[rows, carrier]
+    segment = players - start[:, None, :]
+    length = np.maximum((segment ** 2).sum(axis=-1), 1e-12)
+    relative = players[:, None, :, :] - start[:, None, None, :]
+    along = np.clip((relative * segment[:, :, None, :]).sum(axis=-1) / length[..., None], 0, 1)
+    closest = start[:, None, None, :] + along[..., None] * segment[:, :, None, :]
+    gap = np.hypot(players[:, None, :, 0] - closest[..., 0], players[:, None, :, 1] - closest[..., 1])
+
+    carrier_team = teams[carrier]
+    teammate = (teams[None, :] == carrier_team[:, None]) & (np.arange(count)[None, :] != carrier[:, None])
+    opponent = teams[None, :] != carrier_team[:, None]
+    lane = teammate & has_carrier[:, None] & np.isfinite(players).all(axis=-1)
+    blocked = ((gap < lane_width) & opponent[:, None, :] & np.isfinite(gap)).any(axis=2) & lane
+    return carrier, lane, blocked
+
+
+class TacticalGeometryService:
+    def __init__(self, project_data, workers=None, cache_size=4):
+        self.project_data = project_data
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compute(self, video_path, rate=5, pressure_radius=3.0, lane_width=1.0, carry_distance=2.0):
+        rate = max(1.0, min(float(rate or 5), 30.0))
+        project = self.project_data.snapshot(video_path)
+        key = (project.get("video_path"), project.get("revision"), rate, float(pressure_radius), float(lane_width), float(carry_distance))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached:
+                self._cache.move_to_end(key)
+                return cached
+
+        started_at = time.perf_counter()
+        calibration = field_calibration(project)
+        tracks = extract_tracks(project.get("items"))
+        sampled = resample_tracks(tracks, rate, calibration=calibration)
+        keys = sampled["keys"]
+        positions = sampled["positions"]
+        player_columns = [index for index, track_key in enumerate(keys) if tracks[track_key]["type"] == "player"]
+        ball_columns = [index for index, track_key in enumerate(keys) if tracks[track_key]["type"] == "ball"]
+        players = positions[:, player_columns, :]
+        teams = np.array([tracks[keys[index]]["team"] or "guest" for index in player_columns])
+        bounds = ((0.0, 0.0), calibration["size"]) if calibration else ((0.0, 0.0), (100.0, 100.0))
+
+        cells, cell_counts = voronoi_parallel(players, bounds, self.workers)
+        nearest, nearest_distance, opponent_distance = nearest_opponents(players, teams)
+        pressure = (opponent_distance <= float(pressure_radius)).sum(axis=2)
+        if ball_columns:
+            ball = positions[:, ball_columns[0], :]
+            carrier, lanes, blocked = passing_lanes(players, teams, ball, float(lane_width), float(carry_distance))
+        else:
+            carrier = np.zeros(len(players), dtype=np.int64)
+            lanes = blocked = np.zeros(players.shape[:2], dtype=bool)
+
+        seconds = time.perf_counter() - started_at
+        result = {
+            "revision": project.get("revision"),
+            "rate": rate,
+            "units": "m" if calibration else "%",
+            "calibration": calibration,
+            "players": [keys[index] for index in player_columns],
+            "teams": teams,
+            "times": sampled["times"],
+            "positions": players,
+            "cells": cells,
+            "cell_counts": cell_counts,
+            "nearest": nearest,
+            "nearest_distance": nearest_distance,
+            "pressure": pressure,
+            "pressure_radius": float(pressure_radius),
+            "carrier": carrier,
+            "lanes": lanes,
+            "blocked": blocked,
+            "compute_seconds": seconds,
+            "frames_per_second": len(sampled["times"]) / seconds if seconds > 0 else None,
+        }
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def get_geometry(self, video_path, time_from=None, time_to=None, rate=5, kinds=None, pressure_radius=3.0, lane_width=1.0, save=False):
+        try:
+            time_from = None if time_from is None else float(time_from)
+            time_to = None if time_to is None else float(time_to)
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "Invalid geometry window."}
+        if save:
+            if time_from is None or time_to is None:
+                return {"status": "error", "message": "Saving geometry overlays needs time_from and time_to."}
+            if not 0 <= time_to - time_from <= MAX_SAVE_SECONDS:
+                return {"status": "error", "message": f"Saved geometry windows must span 0 to {MAX_SAVE_SECONDS} seconds."}
+        try:
+            result = self.compute(video_path, rate, pressure_radius, lane_width)
+        except Exception as error:
+            print(f"Error computing tactical geometry: {error}")
+            return {"status": "error", "message": str(error)}
+
+        response = {
+            "status": "success",
+            "revision": result["revision"],
+            "units": result["units"],
+            "frames": len(result["times"]),
+            "compute_seconds": round(result["compute_seconds"], 4),
+            "frames_per_second": round(result["frames_per_second"] or 0, 1),
+        }
+        if time_from is None and time_to is None and not save:
+            return response
+
+        items = self.overlay_items(result, time_from, time_to, kinds or GEOMETRY_KINDS)
+        response["items"] = items
+        if save:
+            project = self.project_data.snapshot(video_path)
+            ops = [
+                {"op": "delete", "collection": "items", "id": item.get("id")}
+                for item in project.get("items") or []
+                if item.get("source") == SOURCE and time_from <= float(item.get("time_from") or 0) <= time_to
+            ]
+            ops += [{"op": "upsert", "collection": "items", "item": item} for item in items]
+            saved = self.project_data.patch(video_path, project.get("revision"), ops)
+            response["save"] = saved
+            response["revision"] = saved.get("revision", response["revision"])
+        return response
+
+    def overlay_items(self, result, time_from=None, time_to=None, kinds=GEOMETRY_KINDS):
+        times = result["times"]
+        window = np.ones(len(times), dtype=bool)
+        try:
+            if time_from is not None:
+                window &= times >= float(time_from)
+            if time_to is not None:
+                window &= times <= float(time_to)
+        except (TypeError, ValueError) as error:
+            raise ValueError("Invalid geometry window.") from error
+        to_image = self._to_image(result["calibration"])
+        duration = 1 / result["rate"]
+        players = result["players"]
+        teams = result["teams"]
+        items = []
+        for frame in np.flatnonzero(window):
+            start = round(float(times[frame]), 3)
+            timing = {"time_from": start, "time_to": round(start + duration, 3), "source": SOURCE}
+            positions = result["positions"][frame]
+            image_positions = to_image(positions)
+            if "voronoi" in kinds:
+                for column, player in enumerate(players):
+                    count = int(result["cell_counts"][frame, column])
+                    if count < 3:
+                        continue
+                    vertices = to_image(result["cells"][frame, column, :count].astype(np.float64))
+                    items.append({
+                        "id": f"{SOURCE}-voronoi-{player}-{frame}",
+                        "type": "polygon",
+                        "label": f"Voronoi {player}",
+                        "points": self._points(vertices),
+                        "closed": True,
+                        "color": TEAM_COLORS.get(teams[column], "#45ffa2"),
+                        "fillOpacity": 0.12,
+                        "width": 1,
+                        **timing,
+                    })
+            if "lanes" in kinds:
+                carrier = int(result["carrier"][frame])
+                for column in np.flatnonzero(result["lanes"][frame]):
+                    blocked = bool(result["blocked"][frame, column])
+                    items.append({
+                        "id": f"{SOURCE}-lane-{players[column]}-{frame}",
+                        "type": "straight-line",
+                        "label": f"Lane {players[carrier]} > {players[column]}{' (blocked)' if blocked else ''}",
+                        "points": self._points(image_positions[[carrier, column]]),
+                        "color": "#ff4d4d" if blocked else "#45ffa2",
+                        "width": 2,
+                        **timing,
+                    })
+            if "pressure" in kinds:
+                for column in np.flatnonzero(result["pressure"][frame] > 0):
+                    radius = self._image_radius(positions[column], result["pressure_radius"], result["calibration"])
+                    if radius is None:
+                        continue
+                    items.append({
+                        "id": f"{SOURCE}-pressure-{players[column]}-{frame}",
+                        "type": "circle",
+                        "label": f"Pressure {players[column]}: {int(result['pressure'][frame, column])}",
+                        "center": self._points(image_positions[[column]])[0],
+                        "radius": radius,
+                        "color": "#ffcc00",
+                        "fillOpacity": 0.1,
+                        "width": 1,
+                        **timing,
+                    })
+            if "closest" in kinds:
+                for column, player in enumerate(players):
+                    distance = float(result["nearest_distance"][frame, column])
+                    if not np.isfinite(distance):
+                        continue
+                    opponent = int(result["nearest"][frame, column])
+                    items.append({
+                        "id": f"{SOURCE}-closest-{player}-{frame}",
+                        "type": "measure-line",
+                        "label": f"{distance:.1f} {result['units']}",
+                        "points": self._points(image_positions[[column, opponent]]),
+                        "color": TEAM_COLORS.get(teams[column], "#4dd8ff"),
+                        "width": 1,
+                        **timing,
+                    })
+        return items
+
+    def _to_image(self, calibration):
+        if not calibration:
+            return lambda points: points
+        inverse = np.linalg.inv(calibration["homography"])
+        return lambda points: project_points(points, inverse)
+
+    def _image_radius(self, world_point, radius, calibration):
+        if not np.isfinite(world_point).all():
+            return None
+        if not calibration:
+            return round(float(radius), 3)
+        # Circle radii are stored as a percentage of frame height: measure the projected radius vertically.
+        inverse = np.linalg.inv(calibration["homography"])
+        center, edge = project_points(np.array([world_point, world_point + [0, radius]]), inverse)
+        return round(float(abs(edge[1] - center[1])), 3)
+
+    def _points(self, points):
+        return [{"x": round(float(x), 3), "y": round(float(y), 3)} for x, y in points if np.isfinite(x) and np.isfinite(y)]
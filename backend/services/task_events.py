@@ -0,0 +1,92 @@
+import itertools
+import threading
+import time
+
+
+MAX_UPDATES_PER_SECOND = 4
+# A reloaded frontend never unsubscribes; subscriptions end with their tasks, or after an hour for unscoped ones.
+SUBSCRIPTION_SECONDS = 3600
+MAX_SUBSCRIPTIONS = 64
+
+
+class TaskEvents:
+    def __init__(self, registry, max_rate=MAX_UPDATES_PER_SECOND):
+        self.registry = registry
+        self.interval = 1 / max(0.1, float(max_rate))
+        self._condition = threading.Condition()
+        self._subscribers = {}
+        self._tokens = itertools.count(1)
+        self._pending = set()
+        self._sent_at = {}
+        self._thread = None
+
+    def subscribe(self, callback, task_ids=None):
+        with self._condition:
+            token = next(self._tokens)
+            now = time.monotonic()
+            for expired in [key for key, (_, _, expires_at) in self._subscribers.items() if expires_at <= now]:
+                del self._subscribers[expired]
+            while len(self._subscribers) >= MAX_SUBSCRIPTIONS:
+                del self._subscribers[next(iter(self._subscribers))]
+            self._subscribers[token] = (callback, set(task_ids) if task_ids else None, now + SUBSCRIPTION_SECONDS)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, daemon=True)
+                self._thread.start()
+            return token
+
+    def unsubscribe(self, token):
+        with self._condition:
+            return self._subscribers.pop(token, None) is not None
+
+    def notify(self, task_id):
+        # Called on every task write; a set of pending ids coalesces bursts into one snapshot per task.
+        if not self._subscribers:
+            return
+        with self._condition:
+            self._pending.add(task_id)
+            self._condition.notify()
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                now = time.monotonic()
+                ready = []
+                wait = self.interval
+                for task_id in list(self._pending):
+                    due = self._sent_at.get(task_id, 0) + self.interval
+                    status = self.registry.status(task_id)
+                    # Final states skip the throttle so a finished task is never reported late.
+                    if status.get("status") != "processing":
+                        self._pending.discard(task_id)
+                        self._sent_at.pop(task_id, None)
+                        ready.append(status)
+                    elif now >= due:
+                        self._pending.discard(task_id)
+                        self._sent_at[task_id] = now
+                        ready.append(status)
+                    else:
+                        wait = min(wait, due - now)
+                subscribers = list(self._subscribers.values())
+                if not ready:
+                    self._condition.wait(wait)
+                    continue
+                self._expire(ready, now)
+            for status in ready:
+                for callback, task_ids, _ in subscribers:
+                    if task_ids is None or status.get("task_id") in task_ids:
+                        try:
+                            callback(status)
+                        except Exception:
+                            pass
+
+    def _expire(self, ready, now):
+        # Called with the condition held. A scoped subscription ends once its last task has sent a final state.
+        finished = {status.get("task_id") for status in ready if status.get("status") != "processing"}
+        for token, (callback, task_ids, expires_at) in list(self._subscribers.items()):
+            if task_ids is not None and finished & task_ids:
+                task_ids = task_ids - finished
+                self._subscribers[token] = (callback, task_ids, expires_at)
+            if expires_at <= now or task_ids == set():
+                del self._subscribers[token]
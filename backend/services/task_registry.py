@@ -0,0 +1,75 @@
+import threading
+import time
+import uuid
+
+from .task_events import TaskEvents
+
+
+PRIVATE_FIELDS = {"process", "cancel_requested", "finished_at"}
+# Finished tasks stay readable long enough for a late poll, then are dropped.
+FINISHED_TASK_SECONDS = 600
+MAX_FINISHED_TASKS = 256
+
+
+class TaskRegistry:
+    def __init__(self):
+        self.active_tasks = {}
+        self._lock = threading.Lock()
+        self.events = TaskEvents(self)
+
+    def create(self, prefix, fields):
+        task_id = f"{prefix}_{uuid.uuid4().hex}"
+        self._evict()
+        self.set(task_id, {"task_id": task_id, "status": "processing", "progress": 0, "estimated_seconds": None, **fields})
+        return task_id
+
+    def set(self, task_id, patch):
+        with self._lock:
+            task = self.active_tasks.get(task_id, {})
+            task.update(patch)
+            if task.get("status") != "processing" and "finished_at" not in task:
+                task["finished_at"] = time.monotonic()
+            self.active_tasks[task_id] = task
+        self.events.notify(task_id)
+
+    def status(self, task_id, missing_message="Task was not found."):
+        with self._lock:
+            task = self.active_tasks.get(task_id)
+            if not task:
+                return {"status": "error", "message": missing_message}
+            return self.public(task)
+
+    def cancel(self, task_id, message="Canceling...", missing_message="Task was not found."):
+        with self._lock:
+            task = self.active_tasks.get(task_id)
+            if not task:
+                return {"status": "error", "message": missing_message}
+            if task.get("status") != "processing":
+                return self.public(task)
+            task["cancel_requested"] = True
+            process = task.get("process")
+            if process:
+                try:
+                    process.terminate()
+                except OSError:
+                    pass
+            task["message"] = message
+            result = self.public(task)
+        self.events.notify(task_id)
+        return result
+
+    def is_cancel_requested(self, task_id):
+        with self._lock:
+            return bool(self.active_tasks.get(task_id, {}).get("cancel_requested"))
+
+    def _evict(self):
+        with self._lock:
+            finished = sorted((task["finished_at"], task_id) for task_id, task in self.active_tasks.items() if "finished_at" in task)
+            expired = time.monotonic() - FINISHED_TASK_SECONDS
+            overflow = len(finished) - MAX_FINISHED_TASKS
+            for index, (finished_at, task_id) in enumerate(finished):
+                if finished_at < expired or index < overflow:
+                    del self.active_tasks[task_id]
+
+    def public(self, task):
+        return {key: value for key, value in task.items() if key not in PRIVATE_FIELDS}
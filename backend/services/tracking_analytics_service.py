@@ -0,0 +1,304 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+TRACK_TYPES = {"player", "ball"}
+TEAMS = ("home", "guest")
+
+
+def field_calibration(project):
+    grid = next((item for item in (project or {}).get("items") or [] if item.get("type") == "measure-grid"), None)
+    field = grid or ((project or {}).get("measure") or {}).get("field")
+    points = (field or {}).get("points") or []
+    if len(points) < 4:
+        return None
+    try:
+        image = np.array([[float(point["x"]), float(point["y"])] for point in points[:4]], dtype=np.float64)
+        ab = float(field.get("abMeters") or 0)
+        ac = float(field.get("acMeters") or 0)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if ab <= 0 or ac <= 0:
+        return None
+    world = np.array([[0, 0], [ab, 0], [0, ac], [ab, ac]], dtype=np.float64)
+    try:
+        return {"homography": homography(image, world), "size": (ab, ac)}
+    except np.linalg.LinAlgError:
+        return None
+
+
+def homography(source, target):
+    rows = []
+    values = []
+    for (x, y), (u, v) in zip(source, target):
+        rows.append([x, y, 1, 0, 0, 0, -u * x, -u * y])
+        rows.append([0, 0, 0, x, y, 1, -v * x, -v * y])
+        values.extend([u, v])
+    solution = np.linalg.solve(np.array(rows, dtype=np.float64), np.array(values, dtype=np.float64))
+    return np.append(solution, 1).reshape(3, 3)
+
+
+def project_points(points, matrix):
+    x = points[..., 0]
+    y = points[..., 1]
+    w = matrix[2, 0] * x + matrix[2, 1] * y + matrix[2, 2]
+    return np.stack([
+        (matrix[0, 0] * x + matrix[0, 1] * y + matrix[0, 2]) / w,
+        (matrix[1, 0] * x + matrix[1, 1] * y + matrix[1, 2]) / w,
+    ], axis=-1)
+
+
+def track_key(item):
+    # Generated markers carry the key of the track they were seeded from, so unlabelled seeds still form one track.
+    if item.get("track"):
+        return item["track"]
+    if item.get("type") == "ball":
+        return f"ball:{item.get('label') or 'ball'}"
+    return f"{item.get('team') or 'guest'}:{item.get('label') or item.get('id')}"
+
+
+def extract_tracks(items):
+    samples = {}
+    for item in items or []:
+        if item.get("type") not in TRACK_TYPES or item.get("visible") is False:
+            continue
+        point = item.get("point")
+        if not isinstance(point, dict):
+            continue
+        try:
+            x = float(point.get("x"))
+            y = float(point.get("y"))
+            start = float(item.get("time_from") or 0)
+            end = float(item.get("time_to") if item.get("time_to") is not None else start)
+        except (TypeError, ValueError):
+            continue
+        key = track_key(item)
+        entry = samples.get(key)
+        if entry is None:
+            entry = samples[key] = {"type": item.get("type"), "team": item.get("team") if item.get("type") == "player" else None, "rows": []}
+        # Each marker holds its position for its whole time window; gaps between windows are interpolated.
+        entry["rows"].extend(((start, x, y), (max(start, end), x, y)))
+
+    tracks = {}
+    for key in sorted(samples):
+        rows = np.array(samples[key]["rows"], dtype=np.float64)
+        rows = rows[np.argsort(rows[:, 0], kind="stable")]
+        tracks[key] = {"type": samples[key]["type"], "team": samples[key]["team"], "keyframes": rows}
+    return tracks
+
+
+def resample_tracks(tracks, rate, time_from=None, time_to=None, calibration=None):
+    keys = list(tracks)
+    if not keys:
+        return {"keys": [], "times": np.zeros(0), "positions": np.zeros((0, 0, 2))}
+    start = min(track["keyframes"][0, 0] for track in tracks.values()) if time_from is None else float(time_from)
+    end = max(track["keyframes"][-1, 0] for track in tracks.values()) if time_to is None else float(time_to)
+    times = np.arange(start, max(start, end) + 0.5 / rate, 1 / rate)
+    positions = np.full((len(times), len(keys), 2), np.nan, dtype=np.float64)
+    for index, key in enumerate(keys):
+        keyframes = tracks[key]["keyframes"]
+        inside = (times >= keyframes[0, 0]) & (times <= keyframes[-1, 0])
+        positions[inside, index, 0] = np.interp(times[inside], keyframes[:, 0], keyframes[:, 1])
+        positions[inside, index, 1] = np.interp(times[inside], keyframes[:, 0], keyframes[:, 2])
+    if calibration:
+        positions = project_points(positions, calibration["homography"])
+    return {"keys": keys, "times": times, "positions": positions}
+
+
+def hull_area(points):
+    # Gift wrapping run on every frame at once: one pass per hull vertex, O(N) work per frame and pass.
+    frames, count, _ = points.shape
+    area = np.zeros(frames, dtype=np.float64)
+    if count < 3 or frames == 0:
+        return area
+    valid = np.isfinite(points).all(axis=-1)
+    x = np.where(valid, points[..., 0], 0)
+    y = np.where(valid, points[..., 1], 0)
+    rows = np.arange(frames)
+
+    left = np.where(valid, x, np.inf).min(axis=1)
+    start = np.argmin(np.where(valid & (x == left[:, None]), y, np.inf), axis=1)
+    current = start
+    direction = np.full(frames, -np.pi / 2)
+    active = valid.sum(axis=1) >= 3
+    for _ in range(count):
+        current_x = x[rows, current]
+        current_y = y[rows, current]
+        delta_x = x - current_x[:, None]
+        delta_y = y - current_y[:, None]
+        distance = delta_x ** 2 + delta_y ** 2
+        turn = np.mod(np.arctan2(delta_y, delta_x) - direction[:, None], 2 * np.pi)
+        turn = np.where(turn > 2 * np.pi - 1e-12, 0, turn)
+        turn = np.where(valid & (distance > 1e-18), turn, np.inf)
+        closest_turn = turn.min(axis=1)
+        # Collinear candidates share the same turn; the farthest one skips the points in between.
+        following = np.argmax(np.where(turn <= closest_turn[:, None] + 1e-12, distance, -1), axis=1)
+        next_x = x[rows, following]
+        next_y = y[rows, following]
+        area += np.where(active, current_x * next_y - next_x * current_y, 0)
+        direction = np.arctan2(next_y - current_y, next_x - current_x)
+        active &= following != start
+        current = following
+        if not active.any():
+            break
+    return np.abs(area) / 2
+
+
+def triangle_area(a, b, c):
+    return np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])) / 2
+
+
+def compute_metrics(sampled, tracks, rate, triangles=None):
+    keys = sampled["keys"]
+    positions = sampled["positions"]
+    frame_step = np.diff(positions, axis=0)
+    step_length = np.hypot(frame_step[..., 0], frame_step[..., 1])
+    moved = np.nan_to_num(step_length, nan=0.0)
+    distance = np.vstack([np.zeros((1, len(keys))), np.cumsum(moved, axis=0)]) if len(positions) else np.zeros((0, len(keys)))
+    speed = np.vstack([np.full((1, len(keys)), np.nan), step_length * rate]) if len(positions) else np.zeros((0, len(keys)))
+
+    pairs = [(i, j) for i in range(len(keys)) for j in range(i + 1, len(keys))]
+    if pairs:
+        left, right = np.array(pairs).T
+        compact = positions.astype(np.float32)
+        pair_distance = np.hypot(compact[:, left, 0] - compact[:, right, 0], compact[:, left, 1] - compact[:, right, 1])
+    else:
+        pair_distance = np.zeros((len(positions), 0), dtype=np.float32)
+
+    teams = {}
+    for team in TEAMS:
+        members = [index for index, key in enumerate(keys) if tracks[key]["type"] == "player" and tracks[key]["team"] == team]
+        if not members:
+            continue
+        team_positions = positions[:, members, :]
+        x = team_positions[..., 0]
+        y = team_positions[..., 1]
+        present = np.isfinite(x)
+        count = present.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # fmax/fmin skip missing players; depth runs along the AB side of the field, width along AC.
+            depth = np.fmax.reduce(x, axis=1) - np.fmin.reduce(x, axis=1)
+            width = np.fmax.reduce(y, axis=1) - np.fmin.reduce(y, axis=1)
+            center = np.stack([np.where(present, x, 0).sum(axis=1) / count, np.where(present, y, 0).sum(axis=1) / count], axis=-1)
+        present = count > 0
+        teams[team] = {
+            "members": [keys[index] for index in members],
+            "center": center,
+            "width": width,
+            "depth": depth,
+            "hull_area": np.where(present, hull_area(team_positions), np.nan),
+        }
+
+    if triangles is None:
+        triangles = [team["members"][:3] for team in teams.values() if len(team["members"]) >= 3]
+    triangle_areas = {}
+    for triangle in triangles:
+        if len(triangle) != 3 or any(key not in keys for key in triangle):
+            continue
+        a, b, c = (positions[:, keys.index(key), :] for key in triangle)
+        triangle_areas["|".join(triangle)] = triangle_area(a, b, c)
+
+    return {
+        "distance": distance,
+        "speed": speed,
+        "pairs": [[keys[i], keys[j]] for i, j in pairs],
+        "pair_distance": pair_distance,
+        "teams": teams,
+        "triangles": triangle_areas,
+    }
+
+
+class TrackingAnalyticsService:
+    def __init__(self, project_data, cache_size=8):
+        self.project_data = project_data
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, video_path, rate=10, triangles=None):
+        rate = max(1.0, min(float(rate or 10), 60.0))
+        project = self.project_data.snapshot(video_path)
+        key = (project.get("video_path"), project.get("revision"), rate, tuple(tuple(triangle) for triangle in triangles or []))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached:
+                self._cache.move_to_end(key)
+                return cached
+
+        started_at = time.perf_counter()
+        calibration = field_calibration(project)
+        tracks = extract_tracks(project.get("items"))
+        sampled = resample_tracks(tracks, rate, calibration=calibration)
+        metrics = compute_metrics(sampled, tracks, rate, triangles or None)
+        result = {
+            "revision": project.get("revision"),
+            "rate": rate,
+            "units": "m" if calibration else "%",
+            "tracks": {key: {"type": tracks[key]["type"], "team": tracks[key]["team"]} for key in sampled["keys"]},
+            "keys": sampled["keys"],
+            "times": sampled["times"],
+            "positions": sampled["positions"],
+            **metrics,
+            "compute_seconds": time.perf_counter() - started_at,
+        }
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def get_analytics(self, video_path, rate=10, time_from=None, time_to=None, step=1, metrics=None, triangles=None):
+        try:
+            time_from = None if time_from is None else float(time_from)
+            time_to = None if time_to is None else float(time_to)
+            step = max(1, int(step or 1))
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "Invalid analytics window."}
+
+        try:
+            result = self.analyze(video_path, rate, triangles)
+        except Exception as error:
+            print(f"Error computing tracking analytics: {error}")
+            return {"status": "error", "message": str(error)}
+
+        times = result["times"]
+        window = np.ones(len(times), dtype=bool)
+        if time_from is not None:
+            window &= times >= time_from
+        if time_to is not None:
+            window &= times <= time_to
+        selected = np.flatnonzero(window)[::step]
+        wanted = set(metrics or ["positions", "distance", "speed", "teams", "triangles"])
+
+        payload = {
+            "status": "success",
+            "revision": result["revision"],
+            "rate": result["rate"],
+            "units": result["units"],
+            "tracks": result["tracks"],
+            "keys": result["keys"],
+            "times": _json_array(times[selected]),
+            "compute_seconds": round(result["compute_seconds"], 4),
+        }
+        for name in ("positions", "distance", "speed"):
+            if name in wanted:
+                payload[name] = _json_array(result[name][selected])
+        if "distances" in wanted:
+            payload["pairs"] = result["pairs"]
+            payload["pair_distance"] = _json_array(result["pair_distance"][selected])
+        if "teams" in wanted:
+            payload["teams"] = {
+                team: {"members": values["members"], **{name: _json_array(values[name][selected]) for name in ("center", "width", "depth", "hull_area")}}
+                for team, values in result["teams"].items()
+            }
+        if "triangles" in wanted:
+            payload["triangles"] = {name: _json_array(values[selected]) for name, values in result["triangles"].items()}
+        return payload
+
+
+def _json_array(values):
+    values = np.round(np.asarray(values, dtype=np.float64), 3)
+    return np.where(np.isfinite(values), values, None).tolist()
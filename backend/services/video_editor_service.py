@@ -1,54 +1,94 @@
+import base64
 import os
-import shutil
 import subprocess
 import threading
 import time
-import uuid
 import math
 import re
+import shutil
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
 
 import cv2
 import numpy as np
 
+from .encoding_profiles import encode_commands, fit_encoding, needs_reencode, pass_log_files, resolve_encoding
+from .export_profiler import ExportProfiler
+from .frame_service import IMAGE_FORMATS, FrameService
+from .frame_sources import open_frame_source, probe_video
+from .highlight_reel import (
+    COPY_PIX_FMTS,
+    MODE_WEIGHTS,
+    concat_command,
+    concat_list,
+    copy_compatible,
+    keyframe_before,
+    keyframe_command,
+    match_args,
+    merge_ranges,
+    parse_keyframes,
+    parse_stream,
+    part_command,
+    range_has_overlays,
+    stream_command,
+)
+from .image_service import ImageService, is_image, strip_rows
+from .media_identity import MediaResolver
+from .render_pipeline import RenderPipeline
+from .task_registry import TaskRegistry
+
+
+STREAM_COPY_CACHE_SIZE = 256
+PATH_POINT_PATTERN = re.compile(r"[ML]\s*(-?\d+(?:\.\d+)?)\s+(-?\d+(?:\.\d+)?)")
+
+
+@lru_cache(maxsize=4096)
+def _parse_path(path):
+    return tuple((float(x), float(y)) for x, y in PATH_POINT_PATTERN.findall(path))
+
 
 class VideoEditorService:
-    def __init__(self):
-        self.active_tasks = {}
-        self._lock = threading.Lock()
+    def __init__(self, media=None, layers=None, tasks=None, frames=None, images=None):
+        self.tasks = tasks or TaskRegistry()
+        self.media = media or MediaResolver()
+        self.frames = frames or FrameService(self.media)
+        self.images = images or ImageService(self.media, self.tasks)
+        self.layers = layers
+        self._stream_copy_cache = OrderedDict()
+        self._draw_counts = threading.local()
+        self._draw_origin = threading.local()
 
-    def export_clip(self, input_path, start_msec, end_msec, freeze_data=None, playback_speed=1.0, quality=90, include_draws=True, overlay_data=None):
+    def export_clip(self, input_path, start_msec, end_msec, freeze_data=None, playback_speed=1.0, quality=90, include_draws=True, overlay_data=None, profile=None, target_size_mb=None, max_height=None, fps=None, decoder="auto", trace=False, threads=None):
         try:
-            input_path = self._clean_input_path(input_path)
+            media = self.media.resolve(input_path)
+            input_path = media.path
             start_msec = int(start_msec)
             end_msec = int(end_msec)
             playback_speed = max(0.25, min(float(playback_speed or 1), 4))
             quality = max(50, min(int(quality or 90), 100))
-            if not os.path.isfile(input_path):
+            encoding = resolve_encoding(profile, quality, target_size_mb, max_height, threads)
+            encoding["fps"] = max(1.0, min(float(fps), 120.0)) if fps else None
+            encoding["decoder"] = decoder or "auto"
+            encoding["trace"] = bool(trace)
+            if not media.is_file:
                 return {"status": "error", "message": "Input video was not found."}
             if end_msec <= start_msec:
                 return {"status": "error", "message": "Cut end must be after cut start."}
         except (TypeError, ValueError):
             return {"status": "error", "message": "Invalid cut export parameters."}
 
-        task_id = f"cut_{uuid.uuid4().hex}"
-        has_ffmpeg = bool(self._find_tool("ffmpeg"))
+        has_ffmpeg = bool(media.ffmpeg)
         output_extension = ".mp4" if has_ffmpeg else ".webm"
         output_path = self._generate_output_path(input_path, start_msec, end_msec, output_extension)
-        self._set_task(task_id, {
-            "task_id": task_id,
-            "status": "processing",
-            "path": output_path,
-            "progress": 0,
-            "message": "Preparing export...",
-            "estimated_seconds": None,
-        })
+        task_id = self.tasks.create("cut", {"path": output_path, "message": "Preparing export..."})
 
         can_stream_copy = not include_draws and abs(playback_speed - 1.0) < 0.001
         target = self._fast_cut_task if can_stream_copy else self._render_task
         args = (
-            (task_id, input_path, output_path, start_msec, end_msec)
+            (task_id, input_path, output_path, start_msec, end_msec, encoding)
             if can_stream_copy
-            else (task_id, input_path, output_path, start_msec, end_msec, freeze_data, playback_speed, quality, overlay_data or {})
+            else (task_id, input_path, output_path, start_msec, end_msec, freeze_data, playback_speed, quality, overlay_data or {}, encoding)
         )
         thread = threading.Thread(
             target=target,
@@ -59,57 +99,156 @@ class VideoEditorService:
         return {"task_id": task_id, "status": "processing", "path": output_path}
 
     def get_export_status(self, task_id):
-        with self._lock:
-            task = self.active_tasks.get(task_id)
-            if not task:
-                return {"status": "error", "message": "Export task was not found."}
-            return self._public_task(task)
+        return self.tasks.status(task_id, "Export task was not found.")
 
     def cancel_export(self, task_id):
-        with self._lock:
-            task = self.active_tasks.get(task_id)
-            if not task:
-                return {"status": "error", "message": "Export task was not found."}
-            if task.get("status") != "processing":
-                return dict(task)
-            task["cancel_requested"] = True
-            process = task.get("process")
-            if process:
-                try:
-                    process.terminate()
-                except OSError:
-                    pass
-            task["message"] = "Canceling export..."
-            return self._public_task(task)
+        return self.tasks.cancel(task_id, "Canceling export...", "Export task was not found.")
+
+    def export_reel(self, input_path, ranges, overlay_data=None, include_draws=True, profile=None, quality=90, max_height=None, decoder="auto", trace=False, threads=None):
+        try:
+            media = self.media.resolve(input_path)
+            input_path = media.path
+            ranges = merge_ranges(ranges)
+            quality = max(50, min(int(quality or 90), 100))
+            encoding = resolve_encoding(profile, quality, None, max_height, threads)
+            encoding["decoder"] = decoder or "auto"
+            encoding["trace"] = bool(trace)
+            if not media.is_file:
+                return {"status": "error", "message": "Input video was not found."}
+            if not ranges:
+                return {"status": "error", "message": "No clips to export."}
+        except (KeyError, TypeError, ValueError):
+            return {"status": "error", "message": "Invalid reel export parameters."}
+
+        base, _ = os.path.splitext(input_path)
+        output_path = f"{base}_reel_{ranges[0]['start']}_{ranges[-1]['end']}{'.mp4' if media.ffmpeg else '.webm'}"
+        task_id = self.tasks.create("reel", {"path": output_path, "message": "Preparing reel...", "clips": len(ranges)})
+        thread = threading.Thread(
+            target=self._reel_task,
+            args=(task_id, input_path, output_path, ranges, (overlay_data or {}) if include_draws else {}, quality, encoding),
+            daemon=True,
+        )
+        thread.start()
+        return {"task_id": task_id, "status": "processing", "path": output_path, "clips": len(ranges)}
+
+    def export_still(self, input_path, overlay_data=None, display_time=0, image_format="png", quality=95):
+        try:
+            media = self.media.resolve(input_path)
+            input_path = media.path
+            display_time = float(display_time or 0)
+            quality = max(50, min(int(quality or 95), 100))
+            extension, _, quality_flag = IMAGE_FORMATS[str(image_format or "png").lower()]
+            if not media.is_file or not is_image(input_path):
+                return {"status": "error", "message": "Input image was not found."}
+        except (KeyError, TypeError, ValueError):
+            return {"status": "error", "message": "Invalid image export parameters."}
+
+        output_path = f"{os.path.splitext(input_path)[0]}_annotated{extension}"
+        params = [quality_flag, quality] if quality_flag is not None else []
+        task_id = self.tasks.create("still", {"path": output_path, "message": "Preparing image..."})
+        thread = threading.Thread(
+            target=self._still_task,
+            args=(task_id, input_path, output_path, overlay_data or {}, display_time, params),
+            daemon=True,
+        )
+        thread.start()
+        return {"task_id": task_id, "status": "processing", "path": output_path}
+
+    def render_preview(self, input_path, display_time, overlay_data=None, image_format="jpeg", quality=85, width=None, max_height=None, profile=None):
+        try:
+            started_at = time.perf_counter()
+            max_height = resolve_encoding(profile, max_height=max_height)["max_height"]
+            frame, source_frame = self._preview_frame(input_path, float(display_time or 0), overlay_data or {}, max_height)
+            content_type, body = self.frames.encode(frame, image_format, quality, width)
+            return {
+                "status": "success",
+                "time": float(display_time or 0),
+                "source_frame": source_frame,
+                "render_ms": round((time.perf_counter() - started_at) * 1000, 1),
+                "image": f"data:{content_type};base64," + base64.b64encode(body).decode("ascii"),
+            }
+        except (TypeError, ValueError) as error:
+            return {"status": "error", "message": str(error)}
 
-    def _public_task(self, task):
-        return {key: value for key, value in task.items() if key not in {"process", "cancel_requested"}}
+    def render_preview_strip(self, input_path, start_msec, end_msec, count=8, overlay_data=None, image_format="jpeg", quality=80, width=320, columns=None, max_height=None, profile=None):
+        try:
+            started_at = time.perf_counter()
+            max_height = resolve_encoding(profile, max_height=max_height)["max_height"]
+            start = int(start_msec) / 1000
+            end = int(end_msec) / 1000
+            count = max(1, min(int(count or 8), 64))
+            width = max(32, int(width or 320))
+            columns = max(1, min(int(columns or count), count))
+            if end < start:
+                return {"status": "error", "message": "Preview end must be after preview start."}
+            times = [start + (end - start) * index / max(1, count - 1) for index in range(count)]
+            tiles = []
+            for display_time in times:
+                frame, _ = self._preview_frame(input_path, display_time, overlay_data or {}, max_height)
+                # Overlays are drawn at export size first so the thumbnail is a scaled export frame.
+                height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+                tiles.append(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA))
+            rows = [tiles[index:index + columns] for index in range(0, len(tiles), columns)]
+            rows[-1] += [np.zeros_like(tiles[0])] * (columns - len(rows[-1]))
+            strip = np.vstack([np.hstack(row) for row in rows])
+            content_type, body = self.frames.encode(strip, image_format, quality)
+            return {
+                "status": "success",
+                "times": times,
+                "tile_width": width,
+                "tile_height": tiles[0].shape[0],
+                "columns": columns,
+                "render_ms": round((time.perf_counter() - started_at) * 1000, 1),
+                "image": f"data:{content_type};base64," + base64.b64encode(body).decode("ascii"),
+            }
+        except (TypeError, ValueError) as error:
+            return {"status": "error", "message": str(error)}
+
+    def _preview_frame(self, input_path, display_time, overlay_data, max_height=None):
+        # Same frame choice, scaling and drawing as _render_task, without the writer.
+        info = self.frames.info(input_path)
+        source_time = self._display_to_source_time(display_time, overlay_data)
+        source_frame = max(0, int(source_time * info["fps"]))
+        if info["frame_count"] > 0:
+            source_frame = min(source_frame, max(0, info["frame_count"] - 1))
+        frame, _ = self.frames.frame(input_path, index=source_frame)
+        output_size = self._output_size(frame.shape[1], frame.shape[0], int(max_height) if max_height else None)
+        if output_size != (frame.shape[1], frame.shape[0]):
+            frame = cv2.resize(frame, output_size, interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+        self._draw_overlays(frame, overlay_data, display_time)
+        return frame, source_frame
 
-    def _fast_cut_task(self, task_id, input_path, output_path, start, end):
+    def _fast_cut_task(self, task_id, input_path, output_path, start, end, encoding=None):
+        encoding = encoding or resolve_encoding()
+        profiler = self._create_profiler(output_path, encoding)
+        try:
+            self._fast_cut_export(task_id, input_path, output_path, start, end, encoding, profiler)
+        finally:
+            self._publish_profile(task_id, profiler)
+
+    def _fast_cut_export(self, task_id, input_path, output_path, start, end, encoding, profiler):
         ffmpeg = self._find_tool("ffmpeg")
         if not ffmpeg:
             self._set_task(task_id, {"message": "ffmpeg not found. Saving browser-compatible WebM..."})
-            self._render_task(task_id, input_path, output_path, start, end, None, 1.0, 90, {})
+            self._render_export(task_id, input_path, output_path, start, end, 1.0, 90, {}, encoding, profiler)
             return
 
         start_sec = max(0, start / 1000)
         duration_sec = max(0.001, (end - start) / 1000)
-        stream_copy = self._can_stream_copy_for_web(input_path)
-        command = [
-            ffmpeg,
-            "-hide_banner",
-            "-loglevel",
-            "error",
-            "-y",
-            "-ss",
-            f"{start_sec:.3f}",
-            "-i",
-            input_path,
-            "-t",
-            f"{duration_sec:.3f}",
-        ]
+        info = probe_video(input_path)
+        encoding = fit_encoding(encoding, info and info["height"])
+        stream_copy = not needs_reencode(encoding) and self._can_stream_copy_for_web(input_path)
+        input_args = ["-ss", f"{start_sec:.3f}", "-i", input_path, "-t", f"{duration_sec:.3f}"]
         if stream_copy:
-            command.extend([
+            commands = [[
+                ffmpeg,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-y",
+                *input_args,
                 "-map",
                 "0",
                 "-c",
@@ -119,87 +258,337 @@ class VideoEditorService:
                 "-movflags",
                 "+faststart",
                 output_path,
-            ])
+            ]]
         else:
-            command.extend([
-                "-map",
-                "0:v:0",
-                "-map",
-                "0:a?",
-                "-c:v",
-                "libx264",
-                "-preset",
-                "veryfast",
-                "-crf",
-                "20",
-                "-pix_fmt",
-                "yuv420p",
-                "-c:a",
-                "aac",
-                "-b:a",
-                "160k",
-                "-movflags",
-                "+faststart",
-                output_path,
-            ])
+            commands = encode_commands(ffmpeg, input_args, output_path, encoding, duration_sec)
 
+        label = "Saving cut with fast mode" if stream_copy else "Saving web-compatible cut"
+        self._set_task(task_id, {"progress": 1, "message": f"{label}...", "estimated_seconds": None})
         started_at = time.time()
-        self._set_task(task_id, {
-            "progress": 5,
-            "message": "Saving cut with fast mode..." if stream_copy else "Saving web-compatible cut...",
-            "estimated_seconds": None,
-        })
 
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        self._set_task(task_id, {"process": process})
+        for pass_index, command in enumerate(commands):
+            def progress(seconds, pass_index=pass_index):
+                done = (pass_index + min(1.0, seconds / duration_sec)) / len(commands)
+                percent = max(1, min(99, int(done * 100)))
+                elapsed = max(0.001, time.time() - started_at)
+                self._set_task(task_id, {
+                    "progress": percent,
+                    "message": f"{label}... {percent}%",
+                    "estimated_seconds": max(0, int(elapsed / done * (1 - done))) if done > 0 else None,
+                })
 
-        while process.poll() is None:
-            if self._is_cancel_requested(task_id):
-                try:
-                    process.terminate()
-                    process.wait(timeout=2)
-                except (OSError, subprocess.TimeoutExpired):
-                    process.kill()
+            with profiler.span("ffmpeg"):
+                returncode, stderr = self._run_tool(task_id, command, progress)
+            if returncode is None:
                 self._remove_partial_file(output_path)
+                self._remove_pass_logs(output_path)
                 self._set_task(task_id, {
                     "status": "canceled",
                     "progress": 0,
                     "message": "Export canceled.",
                     "estimated_seconds": 0,
                     "path": "",
-                    "process": None,
                 })
                 return
+            if returncode != 0:
+                self._remove_partial_file(output_path)
+                self._remove_pass_logs(output_path)
+                message = (stderr or "").strip() or "Fast cut failed."
+                self._set_task(task_id, {
+                    "status": "error",
+                    "message": message[-500:],
+                    "estimated_seconds": 0,
+                })
+                return
+        self._remove_pass_logs(output_path)
+        self._count_output(profiler, output_path)
+
+        self._set_task(task_id, {
+            "status": "done",
+            "progress": 100,
+            "message": "Cut saved.",
+            "estimated_seconds": 0,
+        })
+
+    def _reel_task(self, task_id, input_path, output_path, ranges, overlay_data, quality, encoding):
+        profiler = self._create_profiler(output_path, encoding)
+        try:
+            self._reel_export(task_id, input_path, output_path, ranges, overlay_data, quality, encoding, profiler)
+        finally:
+            self._publish_profile(task_id, profiler)
+
+    def _reel_export(self, task_id, input_path, output_path, ranges, overlay_data, quality, encoding, profiler):
+        info = probe_video(input_path)
+        if not info or info["width"] <= 0 or info["height"] <= 0:
+            self._set_task(task_id, {"status": "error", "message": f"Could not open video: {input_path}"})
+            return
 
-            elapsed = max(0, time.time() - started_at)
-            progress = min(95, 5 + int(elapsed * 5))
+        ffmpeg = self._find_tool("ffmpeg")
+        encoding = fit_encoding(encoding, info["height"])
+        target_fps = min(info["fps"], encoding.get("fps") or info["fps"])
+        output_size = self._output_size(info["width"], info["height"], encoding.get("max_height"))
+        source = self._reel_source(self.media.resolve(input_path), ranges) if ffmpeg and not needs_reencode(encoding) else None
+        # Only clips with visible overlays are drawn. The rest are copied from the keyframe before their start,
+        # unless that would replay the end of the previous clip; then they are plainly encoded.
+        previous = None
+        for item in ranges:
+            item["requested_start"] = item["start"]
+            has_overlays = range_has_overlays(overlay_data, item["start"] / 1000, item["end"] / 1000)
+            item["keyframe"] = keyframe_before(source["keyframes"], item["start"] / 1000) if source and not has_overlays else None
+            if item["keyframe"] is not None and previous and previous["start"] <= item["keyframe"] * 1000 < previous["end"]:
+                item["keyframe"] = None
+            item["mode"] = "render" if has_overlays or not ffmpeg else "copy" if item["keyframe"] is not None else "encode"
+            if item["mode"] == "copy":
+                item["start"] = int(item["keyframe"] * 1000)
+            previous = item
+        match = None
+        if len({item["mode"] == "copy" for item in ranges}) > 1:
+            if copy_compatible(source, output_size):
+                match = match_args(source)
+            else:
+                for item in ranges:
+                    if item["mode"] == "copy":
+                        item["mode"] = "encode"
+                        item["start"] = item["requested_start"]
+        weights = [(item["end"] - item["start"]) / 1000 * MODE_WEIGHTS[item["mode"]] for item in ranges]
+        total_weight = max(0.001, sum(weights))
+        started_at = time.time()
+        self._set_task(task_id, {
+            "clip_modes": [item["mode"] for item in ranges],
+            "clip_ranges": [{"start": item["start"], "end": item["end"], "requested_start": item["requested_start"], "mode": item["mode"]} for item in ranges],
+        })
+
+        def report(index, fraction):
+            done = sum(weights[:index]) + weights[index] * min(1.0, fraction)
+            progress = min(99, int(done / total_weight * 100))
+            elapsed = max(0.001, time.time() - started_at)
             self._set_task(task_id, {
                 "progress": progress,
-                "message": f"{'Saving cut with fast mode' if stream_copy else 'Saving web-compatible cut'}... {progress}%",
+                "message": f"Saving reel... clip {index + 1}/{len(ranges)}",
+                "estimated_seconds": max(0, int(elapsed / progress * (100 - progress))) if progress > 0 else None,
             })
-            time.sleep(0.5)
 
-        _, stderr = process.communicate()
-        self._set_task(task_id, {"process": None})
-        if process.returncode != 0:
+        if not ffmpeg:
+            self._render_reel_single_file(task_id, input_path, output_path, ranges, overlay_data, quality, encoding, target_fps, output_size, report, profiler)
+            return
+
+        parts_dir = f"{os.path.splitext(output_path)[0]}_parts"
+        os.makedirs(parts_dir, exist_ok=True)
+        try:
+            parts = []
+            for index, item in enumerate(ranges):
+                report(index, 0)
+                start_display = item["start"] / 1000
+                end_display = item["end"] / 1000
+                part_path = os.path.join(parts_dir, f"part_{index:03d}.ts")
+                rendered_path = None
+                if item["mode"] == "render":
+                    rendered_path = os.path.join(parts_dir, f"render_{index:03d}.mp4")
+                    out = self._open_writer(rendered_path, target_fps, output_size, quality)
+                    if not out:
+                        raise OSError(f"Could not create output: {rendered_path}")
+                    frames = max(1, int((end_display - start_display) * target_fps))
+                    try:
+                        rendered = self._render_frames(
+                            task_id, input_path, out, start_display, end_display, overlay_data, encoding, output_size, target_fps, target_fps,
+                            lambda processed, stages, index=index, frames=frames: report(index, processed / frames * 0.8),
+                            profiler,
+                        )
+                    finally:
+                        out.release()
+                    if rendered["canceled"]:
+                        self._finish_reel_canceled(task_id, output_path)
+                        return
+                    if not rendered["frames"]:
+                        continue
+                    source_start = self._display_to_source_time(start_display, overlay_data)
+                elif item["mode"] == "copy":
+                    source_start = item["keyframe"]
+                else:
+                    source_start = start_display
+                command = part_command(ffmpeg, item["mode"], input_path, part_path, source_start, end_display - start_display, encoding, rendered_path, match)
+                offset = 0.8 if item["mode"] == "render" else 0.0
+                with profiler.span("ffmpeg"):
+                    returncode, stderr = self._run_tool(
+                        task_id, command,
+                        lambda seconds, index=index, offset=offset, duration=end_display - start_display: report(index, offset + (1 - offset) * seconds / duration),
+                    )
+                if returncode is None:
+                    self._finish_reel_canceled(task_id, output_path)
+                    return
+                if returncode != 0:
+                    raise OSError((stderr or "").strip()[-500:] or f"Clip {index + 1} failed.")
+                parts.append(os.path.basename(part_path))
+                report(index, 1)
+
+            if not parts:
+                raise ValueError("No frames were exported.")
+            list_path = os.path.join(parts_dir, "parts.txt")
+            with open(list_path, "w", encoding="utf-8") as file:
+                file.write(concat_list(parts))
+            self._set_task(task_id, {"progress": 99, "message": "Joining clips...", "estimated_seconds": None})
+            with profiler.span("ffmpeg"):
+                returncode, stderr = self._run_tool(task_id, concat_command(ffmpeg, list_path, output_path))
+            if returncode is None:
+                self._finish_reel_canceled(task_id, output_path)
+                return
+            if returncode != 0:
+                raise OSError((stderr or "").strip()[-500:] or "Joining clips failed.")
+        except (OSError, ValueError, cv2.error) as error:
             self._remove_partial_file(output_path)
-            message = (stderr or "").strip() or "Fast cut failed."
-            self._set_task(task_id, {
-                "status": "error",
-                "message": message[-500:],
-                "estimated_seconds": 0,
-            })
+            self._set_task(task_id, {"status": "error", "message": str(error), "estimated_seconds": 0})
             return
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+        self._count_output(profiler, output_path)
+        self._set_task(task_id, {"status": "done", "progress": 100, "message": "Reel saved.", "estimated_seconds": 0})
 
+    def _render_reel_single_file(self, task_id, input_path, output_path, ranges, overlay_data, quality, encoding, target_fps, output_size, report, profiler):
+        # Without ffmpeg nothing can be joined afterwards, so every clip is drawn into one writer.
+        out = self._open_writer(output_path, target_fps, output_size, quality)
+        if not out:
+            self._set_task(task_id, {"status": "error", "message": f"Could not create output: {output_path}"})
+            return
+        processed_frames = 0
+        try:
+            for index, item in enumerate(ranges):
+                frames = max(1, int((item["end"] - item["start"]) / 1000 * target_fps))
+                rendered = self._render_frames(
+                    task_id, input_path, out, item["start"] / 1000, item["end"] / 1000, overlay_data, encoding, output_size, target_fps, target_fps,
+                    lambda processed, stages, index=index, frames=frames: report(index, processed / frames),
+                    profiler,
+                )
+                if rendered["canceled"]:
+                    out.release()
+                    self._finish_reel_canceled(task_id, output_path)
+                    return
+                processed_frames += rendered["frames"]
+        except (OSError, ValueError, cv2.error) as error:
+            out.release()
+            self._remove_partial_file(output_path)
+            self._set_task(task_id, {"status": "error", "message": f"Export failed: {error}"})
+            return
+        out.release()
+        if processed_frames <= 0:
+            self._remove_partial_file(output_path)
+            self._set_task(task_id, {"status": "error", "message": "No frames were exported."})
+            return
+        self._count_output(profiler, output_path)
+        self._set_task(task_id, {"status": "done", "progress": 100, "message": "Reel saved.", "estimated_seconds": 0})
+
+    def _reel_source(self, media, ranges):
+        ffprobe = media.ffprobe
+        if not ffprobe:
+            return None
+        try:
+            result = subprocess.run(stream_command(ffprobe, media.path), capture_output=True, text=True, timeout=10)
+            source = parse_stream(result.stdout)
+            if not source or source["codec"] != "h264" or source["pix_fmt"] not in COPY_PIX_FMTS:
+                return None
+            starts = [item["start"] / 1000 for item in ranges]
+            result = subprocess.run(keyframe_command(ffprobe, media.path, starts, source["start_time"]), capture_output=True, text=True, timeout=60)
+        except (OSError, subprocess.SubprocessError, ValueError):
+            return None
+        # Relative to the container start, like the -ss of the part commands.
+        source["keyframes"] = parse_keyframes(result.stdout, source["start_time"])
+        return source
+
+    def _finish_reel_canceled(self, task_id, output_path):
+        self._remove_partial_file(output_path)
         self._set_task(task_id, {
-            "status": "done",
-            "progress": 100,
-            "message": "Cut saved.",
+            "status": "canceled",
+            "progress": 0,
+            "message": "Export canceled.",
             "estimated_seconds": 0,
+            "path": "",
+            "process": None,
         })
 
+    def _still_task(self, task_id, input_path, output_path, overlay_data, display_time, params):
+        # The full-resolution image lives in a disk-backed map; only one strip of rows is in memory while drawing.
+        base, extension = os.path.splitext(output_path)
+        canvas_path = f"{base}.canvas.npy"
+        temp_path = f"{base}_tmp{extension}"
+        started_at = time.time()
+        canvas = None
+        try:
+            canvas = self.images.decode(input_path, canvas_path)
+            height, width = canvas.shape[:2]
+            rows = strip_rows(width)
+            for y in range(0, height, rows):
+                if self._is_cancel_requested(task_id):
+                    self._set_task(task_id, {"status": "canceled", "progress": 0, "path": "", "message": "Export canceled.", "estimated_seconds": 0})
+                    return
+                strip = np.array(canvas[y:y + rows])
+                # Heatmap and ghost-trail layers need the whole frame, so they are only drawn when the image is a single strip.
+                self._draw_overlays(strip, overlay_data, display_time, None if rows >= height else (0, y, width, height))
+                canvas[y:y + rows] = strip
+                progress = min(99, int(min(height, y + rows) / height * 100))
+                elapsed = time.time() - started_at
+                self._set_task(task_id, {
+                    "progress": progress,
+                    "message": f"Drawing overlays... {progress}%",
+                    "estimated_seconds": int(elapsed / progress * (100 - progress)) if progress else None,
+                })
+            canvas.flush()
+            self._set_task(task_id, {"message": "Writing image..."})
+            if not cv2.imwrite(temp_path, canvas, params):
+                raise ValueError("Could not write image.")
+            os.replace(temp_path, output_path)
+        except (OSError, ValueError, cv2.error) as error:
+            self._remove_partial_file(temp_path)
+            self._set_task(task_id, {"status": "error", "message": str(error)})
+            return
+        finally:
+            canvas = None
+            self._remove_partial_file(canvas_path)
+        self._set_task(task_id, {"status": "done", "progress": 100, "message": "Image saved.", "estimated_seconds": 0})
+
+    def _run_tool(self, task_id, command, on_progress=None):
+        # With a progress callback ffmpeg reports its output position on stdout (-progress), which replaces timer-based estimates.
+        if on_progress:
+            command = [command[0], "-progress", "pipe:1", "-nostats", *command[1:]]
+        # stderr goes to a file: nothing reads it while stdout is consumed, and a full pipe would stall ffmpeg.
+        errors = tempfile.TemporaryFile()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE if on_progress else subprocess.DEVNULL, stderr=errors, text=True)
+        self._set_task(task_id, {"process": process})
+        try:
+            if on_progress:
+                for line in process.stdout:
+                    key, _, value = line.strip().partition("=")
+                    if key == "out_time_us" and value.isdigit():
+                        on_progress(int(value) / 1_000_000)
+                process.stdout.close()
+            while True:
+                try:
+                    process.wait(timeout=0.25)
+                    break
+                except subprocess.TimeoutExpired:
+                    if self._is_cancel_requested(task_id):
+                        process.kill()
+                        process.wait()
+                        return None, ""
+            errors.seek(0)
+            stderr = errors.read().decode("utf-8", "replace")
+        finally:
+            errors.close()
+            self._set_task(task_id, {"process": None})
+        if self._is_cancel_requested(task_id):
+            return None, ""
+        return process.returncode, stderr
+
     def _can_stream_copy_for_web(self, input_path):
-        ffprobe = self._find_tool("ffprobe")
+        media = self.media.resolve(input_path)
+        cached = self._stream_copy_cache.get(media.key)
+        if cached is None:
+            cached = self._stream_copy_cache[media.key] = self._probe_stream_copy_for_web(media)
+            while len(self._stream_copy_cache) > STREAM_COPY_CACHE_SIZE:
+                self._stream_copy_cache.popitem(last=False)
+        return cached
+
+    def _probe_stream_copy_for_web(self, media):
+        ffprobe = media.ffprobe
         if not ffprobe:
             return False
 
@@ -213,7 +602,7 @@ class VideoEditorService:
             "stream=codec_name,pix_fmt",
             "-of",
             "default=noprint_wrappers=1:nokey=1",
-            input_path,
+            media.path,
         ]
         try:
             result = subprocess.run(command, capture_output=True, text=True, timeout=10)
@@ -227,70 +616,71 @@ class VideoEditorService:
             return False
         return not pix_fmt or pix_fmt in {"yuv420p", "yuvj420p"}
 
-    def _render_task(self, task_id, input_path, output_path, start, end, freeze_data, playback_speed, quality, overlay_data):
-        cap = cv2.VideoCapture(input_path)
-        if not cap.isOpened():
+    def _render_task(self, task_id, input_path, output_path, start, end, freeze_data, playback_speed, quality, overlay_data, encoding=None):
+        encoding = encoding or resolve_encoding()
+        profiler = self._create_profiler(output_path, encoding)
+        try:
+            self._render_export(task_id, input_path, output_path, start, end, playback_speed, quality, overlay_data, encoding, profiler)
+        finally:
+            self._publish_profile(task_id, profiler)
+
+    def _render_export(self, task_id, input_path, output_path, start, end, playback_speed, quality, overlay_data, encoding, profiler):
+        with profiler.span("probe"):
+            info = probe_video(input_path)
+        if not info:
             self._set_task(task_id, {"status": "error", "message": f"Could not open video: {input_path}"})
             return
 
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        fps = info["fps"]
+        width = info["width"]
+        height = info["height"]
+        frame_count = info["frame_count"]
         if width <= 0 or height <= 0:
-            cap.release()
             self._set_task(task_id, {"status": "error", "message": "Invalid video dimensions."})
             return
 
-        output_fps = max(1, fps * playback_speed)
+        target_fps = min(fps, encoding.get("fps") or fps)
+        output_fps = max(1, target_fps * playback_speed)
+        # Frames are scaled right after decode, so overlays are drawn and encoded at the target size.
+        output_size = self._output_size(width, height, encoding.get("max_height"))
         output_extension = os.path.splitext(output_path)[1].lower()
-        fourcc = cv2.VideoWriter_fourcc(*("VP80" if output_extension == ".webm" else "mp4v"))
-        out = cv2.VideoWriter(output_path, fourcc, output_fps, (width, height))
-        out.set(cv2.VIDEOWRITER_PROP_QUALITY, quality)
-        if not out.isOpened():
-            cap.release()
+        with profiler.span("open_writer"):
+            out = self._open_writer(output_path, output_fps, output_size, quality)
+        if not out:
             self._set_task(task_id, {"status": "error", "message": f"Could not create output: {output_path}"})
             return
 
         start_display = start / 1000
         end_display = end / 1000
         total_frames = max(1, int((end_display - start_display) * output_fps))
-        processed_frames = 0
         started_at = time.time()
 
-        while processed_frames < total_frames:
-            if self._is_cancel_requested(task_id):
-                cap.release()
-                out.release()
-                self._remove_partial_file(output_path)
-                self._set_task(task_id, {
-                    "status": "canceled",
-                    "progress": 0,
-                    "message": "Export canceled.",
-                    "estimated_seconds": 0,
-                    "path": "",
-                })
-                return
-
-            display_time = start_display + (processed_frames / output_fps)
-            source_time = self._display_to_source_time(display_time, overlay_data)
-            source_frame = max(0, int(source_time * fps))
-            if frame_count > 0:
-                source_frame = min(source_frame, max(0, frame_count - 1))
-            cap.set(cv2.CAP_PROP_POS_FRAMES, source_frame)
-
-            ret, frame = cap.read()
-            if not ret:
-                break
+        def progress(processed, stages):
+            self._update_progress(task_id, processed, total_frames, started_at)
+            self._set_task(task_id, {"stages": stages, "profile": profiler.summary()})
 
-            self._draw_overlays(frame, overlay_data, display_time)
-            out.write(frame)
-            processed_frames += 1
-            if processed_frames == 1 or processed_frames % 15 == 0:
-                self._update_progress(task_id, processed_frames, total_frames, started_at)
+        try:
+            rendered = self._render_frames(task_id, input_path, out, start_display, end_display, overlay_data, encoding, output_size, target_fps, output_fps, progress, profiler)
+        except (OSError, ValueError, cv2.error) as error:
+            out.release()
+            self._remove_partial_file(output_path)
+            self._set_task(task_id, {"status": "error", "message": f"Export failed: {error}"})
+            return
+        with profiler.span("close_writer"):
+            out.release()
+        processed_frames = rendered["frames"]
+        self._count_output(profiler, output_path, "rendered_bytes")
 
-        cap.release()
-        out.release()
+        if rendered["canceled"]:
+            self._remove_partial_file(output_path)
+            self._set_task(task_id, {
+                "status": "canceled",
+                "progress": 0,
+                "message": "Export canceled.",
+                "estimated_seconds": 0,
+                "path": "",
+            })
+            return
 
         if processed_frames <= 0:
             self._remove_partial_file(output_path)
@@ -299,12 +689,13 @@ class VideoEditorService:
                 "message": (
                     "No frames were exported. "
                     f"start={start}ms end={end}ms fps={fps:.3f} "
-                    f"total_frames={total_frames} frame_count={frame_count}"
+                    f"total_frames={total_frames} frame_count={frame_count} decoder={rendered['decoder']}"
                 ),
             })
             return
 
         if output_extension == ".webm":
+            self._count_output(profiler, output_path)
             self._set_task(task_id, {
                 "status": "done",
                 "progress": 100,
@@ -318,7 +709,10 @@ class VideoEditorService:
             "message": "Preparing video for app playback...",
             "estimated_seconds": None,
         })
-        if not self._make_web_compatible(output_path):
+        with profiler.span("ffmpeg"):
+            web_compatible = self._make_web_compatible(output_path, encoding, processed_frames / output_fps)
+        self._count_output(profiler, output_path)
+        if not web_compatible:
             self._set_task(task_id, {
                 "status": "done",
                 "progress": 100,
@@ -334,43 +728,99 @@ class VideoEditorService:
             "estimated_seconds": 0,
         })
 
-    def _make_web_compatible(self, output_path):
+    def _render_frames(self, task_id, input_path, out, start_display, end_display, overlay_data, encoding, output_size, target_fps, output_fps, on_progress=None, profiler=None):
+        total_frames = max(1, int((end_display - start_display) * output_fps))
+        opened_at = time.perf_counter()
+        # Display time only moves forward and delays only hold the source still, so the source decodes
+        # one forward pass from the first to the last source time instead of seeking per frame.
+        source = open_frame_source(
+            encoding.get("decoder"),
+            self.media.resolve(input_path),
+            self._display_to_source_time(start_display, overlay_data),
+            self._display_to_source_time(end_display, overlay_data),
+            output_size,
+            target_fps,
+            encoding.get("threads"),
+        )
+        pipeline = RenderPipeline((output_size[1], output_size[0], 3), profiler=profiler)
+        if profiler:
+            profiler.record("open_source", opened_at)
+
+        def decode(index, frame):
+            source_time = self._display_to_source_time(start_display + index / output_fps, overlay_data)
+            return source.read(source_time, frame) is not None
+
+        def draw(index, frame):
+            self._draw_overlays(frame, overlay_data, start_display + index / output_fps)
+            if profiler:
+                profiler.count("blend_ops", self._take_blend_count())
+
+        def encode(index, frame):
+            out.write(frame)
+
+        def progress(processed):
+            if on_progress and (processed == 1 or processed % 15 == 0):
+                on_progress(processed, pipeline.stage_timings())
+
+        try:
+            frames = pipeline.run(decode, draw, encode, total_frames, lambda: self._is_cancel_requested(task_id), progress)
+        finally:
+            source.close()
+            self._set_task(task_id, {"stages": pipeline.stage_timings()})
+            if profiler:
+                profiler.count("frames_decoded", source.decoded)
+                profiler.count("seeks", source.seeks)
+                profiler.count("frames_written", pipeline.written)
+        return {"frames": frames, "canceled": pipeline.canceled, "decoder": source.name}
+
+    def _open_writer(self, output_path, fps, size, quality):
+        extension = os.path.splitext(output_path)[1].lower()
+        fourcc = cv2.VideoWriter_fourcc(*("VP80" if extension == ".webm" else "mp4v"))
+        out = cv2.VideoWriter(output_path, fourcc, fps, size)
+        out.set(cv2.VIDEOWRITER_PROP_QUALITY, quality)
+        if not out.isOpened():
+            return None
+        return out
+
+    def _create_profiler(self, output_path, encoding):
+        return ExportProfiler(f"{os.path.splitext(output_path)[0]}.trace.json" if encoding.get("trace") else None)
+
+    def _publish_profile(self, task_id, profiler):
+        try:
+            trace_path = profiler.write_trace()
+        except OSError:
+            trace_path = None
+        self._set_task(task_id, {"profile": profiler.summary(), "trace_path": trace_path})
+
+    def _count_output(self, profiler, output_path, counter="bytes_written"):
+        try:
+            profiler.set(counter, os.path.getsize(output_path))
+        except OSError:
+            pass
+
+    def _blend(self, overlay, alpha, frame):
+        cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
+        self._draw_counts.blends = getattr(self._draw_counts, "blends", 0) + 1
+
+    def _take_blend_count(self):
+        count = getattr(self._draw_counts, "blends", 0)
+        self._draw_counts.blends = 0
+        return count
+
+    def _make_web_compatible(self, output_path, encoding=None, duration=None):
         ffmpeg = self._find_tool("ffmpeg")
         if not ffmpeg:
             return False
 
         base, extension = os.path.splitext(output_path)
         temp_path = f"{base}_web{extension or '.mp4'}"
-        command = [
-            ffmpeg,
-            "-hide_banner",
-            "-loglevel",
-            "error",
-            "-y",
-            "-i",
-            output_path,
-            "-map",
-            "0:v:0",
-            "-map",
-            "0:a?",
-            "-c:v",
-            "libx264",
-            "-preset",
-            "veryfast",
-            "-crf",
-            "20",
-            "-pix_fmt",
-            "yuv420p",
-            "-c:a",
-            "aac",
-            "-b:a",
-            "160k",
-            "-movflags",
-            "+faststart",
-            temp_path,
-        ]
+        commands = encode_commands(ffmpeg, ["-i", output_path], temp_path, encoding or resolve_encoding(), duration or 1)
         try:
-            result = subprocess.run(command, capture_output=True, text=True, timeout=None)
+            for command in commands:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=None)
+                if result.returncode != 0:
+                    break
+            self._remove_pass_logs(temp_path)
             if result.returncode != 0 or not os.path.isfile(temp_path):
                 self._remove_partial_file(temp_path)
                 return False
@@ -378,24 +828,21 @@ class VideoEditorService:
             return True
         except OSError:
             self._remove_partial_file(temp_path)
+            self._remove_pass_logs(temp_path)
             return False
 
+    def _output_size(self, width, height, max_height):
+        if not max_height or max_height >= height:
+            return width, height
+        scale = max_height / height
+        return max(2, int(round(width * scale / 2)) * 2), max(2, int(max_height) // 2 * 2)
+
+    def _remove_pass_logs(self, output_path):
+        for path in pass_log_files(output_path):
+            self._remove_partial_file(path)
+
     def _find_tool(self, name):
-        executable = f"{name}.exe" if os.name == "nt" else name
-        candidates = [
-            shutil.which(name),
-            os.path.join(os.getcwd(), executable),
-            os.path.join(os.getcwd(), "bin", executable),
-            os.path.join(os.getcwd(), "tools", "ffmpeg", "bin", executable),
-            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), executable),
-            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "backend", executable),
-            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "bin", executable),
-            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "tools", "ffmpeg", "bin", executable),
-        ]
-        for candidate in candidates:
-            if candidate and os.path.isfile(candidate):
-                return candidate
-        return None
+        return self.media.find_tool(name)
 
     def _update_progress(self, task_id, processed_frames, total_frames, started_at):
         progress = min(99, int((processed_frames / total_frames) * 100))
@@ -410,14 +857,10 @@ class VideoEditorService:
         })
 
     def _set_task(self, task_id, patch):
-        with self._lock:
-            task = self.active_tasks.get(task_id, {})
-            task.update(patch)
-            self.active_tasks[task_id] = task
+        self.tasks.set(task_id, patch)
 
     def _is_cancel_requested(self, task_id):
-        with self._lock:
-            return bool(self.active_tasks.get(task_id, {}).get("cancel_requested"))
+        return self.tasks.is_cancel_requested(task_id)
 
     def _remove_partial_file(self, output_path):
         try:
@@ -426,29 +869,38 @@ class VideoEditorService:
         except OSError:
             pass
 
-    def _draw_overlays(self, frame, overlay_data, frame_time):
+    def _draw_overlays(self, frame, overlay_data, frame_time, canvas=None):
+        # canvas=(x, y, width, height) places the frame inside a larger image: coordinates are laid out on the
+        # whole image and shifted by the origin, so a still can be drawn strip by strip.
         items = (overlay_data or {}).get("items") or []
-        height, width = frame.shape[:2]
-        for item in items:
-            if item.get("visible") is False or item.get("type") == "measure-grid":
-                continue
-            if not self._is_item_visible_at(item, frame_time):
-                continue
-            item_type = item.get("type")
-            if item_type == "chrono":
-                self._draw_chrono(frame, item, frame_time)
-            elif item_type == "delay":
-                self._draw_delay_indicator(frame, item, frame_time)
-            elif item_type == "measure-line":
-                self._draw_polyline_item(frame, item, width, height, label=True)
-            elif item_type == "vertical-projection":
-                self._draw_goal_projection_item(frame, item, width, height)
-            elif item_type in {"player", "ball"}:
-                self._draw_marker_item(frame, item, width, height)
-            elif item_type == "circle":
-                self._draw_circle_item(frame, item, width, height)
-            else:
-                self._draw_shape_item(frame, item, width, height)
+        origin_x, origin_y, width, height = canvas or (0, 0, frame.shape[1], frame.shape[0])
+        self._draw_origin.value = (origin_x, origin_y)
+        try:
+            for item in items:
+                if item.get("visible") is False or item.get("type") == "measure-grid":
+                    continue
+                if not self._is_item_visible_at(item, frame_time):
+                    continue
+                item_type = item.get("type")
+                if item_type == "chrono":
+                    self._draw_chrono(frame, item, frame_time, width)
+                elif item_type == "delay":
+                    self._draw_delay_indicator(frame, item, frame_time, height)
+                elif item_type == "measure-line":
+                    self._draw_polyline_item(frame, item, width, height, label=True)
+                elif item_type == "vertical-projection":
+                    self._draw_goal_projection_item(frame, item, width, height)
+                elif item_type in {"player", "ball"}:
+                    self._draw_marker_item(frame, item, width, height)
+                elif item_type in {"heatmap", "ghost-trail"}:
+                    if self.layers and canvas is None:
+                        self.layers.draw(frame, item, overlay_data, frame_time)
+                elif item_type == "circle":
+                    self._draw_circle_item(frame, item, width, height)
+                else:
+                    self._draw_shape_item(frame, item, width, height)
+        finally:
+            self._draw_origin.value = (0, 0)
 
     def _is_item_visible_at(self, item, frame_time):
         start = self._number(item.get("time_from"), 0)
@@ -473,7 +925,7 @@ class VideoEditorService:
             if fill_opacity > 0:
                 overlay = frame.copy()
                 cv2.fillPoly(overlay, [polygon], color, cv2.LINE_AA)
-                cv2.addWeighted(overlay, fill_opacity, frame, 1 - fill_opacity, 0, frame)
+                self._blend(overlay, fill_opacity, frame)
             cv2.polylines(frame, [polygon], True, color, thickness, cv2.LINE_AA)
         else:
             cv2.polylines(frame, [np.array(points, dtype=np.int32)], False, color, thickness, cv2.LINE_AA)
@@ -504,7 +956,7 @@ class VideoEditorService:
             overlay = frame.copy()
             cv2.fillPoly(overlay, [np.array([a, b, c], dtype=np.int32)], color, cv2.LINE_AA)
             cv2.fillPoly(overlay, [np.array([projection_a, projection_b, c], dtype=np.int32)], color, cv2.LINE_AA)
-            cv2.addWeighted(overlay, fill_opacity, frame, 1 - fill_opacity, 0, frame)
+            self._blend(overlay, fill_opacity, frame)
 
         for start, end in ((a, b), (projection_a, projection_b), (a, c), (b, c), (projection_a, c), (projection_b, c)):
             cv2.line(frame, start, end, color, thickness, cv2.LINE_AA)
@@ -538,16 +990,16 @@ class VideoEditorService:
             if fill_opacity > 0:
                 overlay = frame.copy()
                 cv2.ellipse(overlay, center, (axis_x, axis_y), angle, 0, 360, color, -1, cv2.LINE_AA)
-                cv2.addWeighted(overlay, fill_opacity, frame, 1 - fill_opacity, 0, frame)
+                self._blend(overlay, fill_opacity, frame)
             cv2.ellipse(frame, center, (axis_x, axis_y), angle, 0, 360, color, thickness, cv2.LINE_AA)
         else:
             if fill_opacity > 0:
                 overlay = frame.copy()
                 cv2.circle(overlay, center, radius_px, color, -1, cv2.LINE_AA)
-                cv2.addWeighted(overlay, fill_opacity, frame, 1 - fill_opacity, 0, frame)
+                self._blend(overlay, fill_opacity, frame)
             cv2.circle(frame, center, radius_px, color, thickness, cv2.LINE_AA)
 
-    def _draw_chrono(self, frame, item, frame_time):
+    def _draw_chrono(self, frame, item, frame_time, width):
         start = self._number(item.get("time_from"), 0)
         end = self._number(item.get("time_to"), start)
         elapsed = max(0, min(end - start, frame_time - start))
@@ -558,25 +1010,26 @@ class VideoEditorService:
         text_size, baseline = cv2.getTextSize(text, font, scale, thickness)
         padding_x = 10
         padding_y = 8
-        x2 = frame.shape[1] - 18
-        y1 = 18
+        origin_x, origin_y = self._origin()
+        x2 = width - 18 - origin_x
+        y1 = 18 - origin_y
         x1 = x2 - text_size[0] - padding_x * 2
         y2 = y1 + text_size[1] + padding_y * 2
         cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 0), -1)
         cv2.putText(frame, text, (x1 + padding_x, y2 - padding_y - baseline // 2), font, scale, (255, 255, 255), thickness, cv2.LINE_AA)
 
-    def _draw_delay_indicator(self, frame, item, frame_time):
+    def _draw_delay_indicator(self, frame, item, frame_time, height):
         start = self._number(item.get("time_from"), 0)
         duration = self._number(item.get("duration"), 0)
         if not (start <= frame_time <= start + duration):
             return
-        height = frame.shape[0]
-        x = 18
-        y = height - 52
+        origin_x, origin_y = self._origin()
+        x = 18 - origin_x
+        y = height - 52 - origin_y
         cv2.rectangle(frame, (x - 8, y - 8), (x + 28, y + 34), (0, 0, 0), -1)
         overlay = frame.copy()
         cv2.rectangle(overlay, (x - 8, y - 8), (x + 28, y + 34), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.35, frame, 0.65, 0, frame)
+        self._blend(overlay, 0.35, frame)
         cv2.rectangle(frame, (x, y), (x + 5, y + 24), (0, 0, 0), -1)
         cv2.rectangle(frame, (x + 13, y), (x + 18, y + 24), (0, 0, 0), -1)
 
@@ -605,11 +1058,15 @@ class VideoEditorService:
     def _point(self, point, width, height):
         if not isinstance(point, dict):
             return None
-        return (int((self._number(point.get("x"), 0) / 100) * width), int((self._number(point.get("y"), 0) / 100) * height))
+        origin_x, origin_y = self._origin()
+        return (int((self._number(point.get("x"), 0) / 100) * width) - origin_x, int((self._number(point.get("y"), 0) / 100) * height) - origin_y)
 
     def _path_points(self, path, width, height):
-        matches = re.findall(r"[ML]\s*(-?\d+(?:\.\d+)?)\s+(-?\d+(?:\.\d+)?)", str(path or ""))
-        return [(int((float(x) / 100) * width), int((float(y) / 100) * height)) for x, y in matches]
+        origin_x, origin_y = self._origin()
+        return [(int((x / 100) * width) - origin_x, int((y / 100) * height) - origin_y) for x, y in _parse_path(str(path or ""))]
+
+    def _origin(self):
+        return getattr(self._draw_origin, "value", (0, 0))
 
     def _bgr(self, value, fallback):
         text = str(value or "").lstrip("#")
@@ -648,9 +1105,3 @@ class VideoEditorService:
     def _generate_output_path(self, input_path, start_msec, end_msec, extension=".mp4"):
         base, _ = os.path.splitext(input_path)
         return f"{base}_clip_{start_msec}_{end_msec}{extension}"
-
-    def _clean_input_path(self, input_path):
-        clean_path = str(input_path or "").replace("file:///", "").replace("file://", "")
-        if clean_path.startswith("http://") or clean_path.startswith("https://") or clean_path.startswith("blob:"):
-            raise ValueError("Input path must be a local file")
-        return os.path.abspath(clean_path)
@@ -0,0 +1,306 @@
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from .media_identity import MediaResolver
+from .task_registry import TaskRegistry
+
+
+MAGIC = b"MOTUOWF1"
+HEADER = struct.Struct("<8sIIIIqq")
+SAMPLE_RATE = 8000
+BLOCK_SAMPLES = 64
+READ_BLOCKS = 4096
+SOURCE = "audio-peaks"
+
+
+class WaveformIndex:
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            magic, sample_rate, block, levels, blocks, size, mtime_ns = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("Not a waveform sidecar.")
+            data = np.fromfile(file, dtype="<i2")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.block = block
+        self.blocks = blocks
+        self.source = (size, mtime_ns)
+        self.duration = blocks * block / sample_rate
+        # Level 0 keeps one min/max/rms triple per block; every next level halves the count.
+        self.rms = data[:blocks]
+        self.levels = []
+        offset = blocks
+        length = blocks
+        for _ in range(levels):
+            self.levels.append(data[offset:offset + length * 2].reshape(length, 2))
+            offset += length * 2
+            length = (length + 1) // 2
+
+    def peaks(self, time_from, time_to, pixels):
+        pixels = max(1, int(pixels))
+        block_seconds = self.block / self.sample_rate
+        first = max(0, int(time_from / block_seconds))
+        last = min(self.blocks, max(first + 1, int(np.ceil(time_to / block_seconds))))
+        per_pixel = (last - first) / pixels
+        # The coarsest level with at least one entry per pixel keeps the read O(pixels).
+        level = max(0, min(len(self.levels) - 1, int(np.floor(np.log2(max(per_pixel, 1))))))
+        scale = 1 << level
+        entries = self.levels[level][first // scale:max(first // scale + 1, -(-last // scale))]
+        if not len(entries):
+            return np.zeros((0, 2), dtype=np.int16)
+        edges = np.unique(np.linspace(0, len(entries), min(pixels, len(entries)) + 1).astype(np.int64)[:-1])
+        return np.stack([
+            np.minimum.reduceat(entries[:, 0], edges),
+            np.maximum.reduceat(entries[:, 1], edges),
+        ], axis=-1)
+
+
+def write_pyramid(stream, path, source, sample_rate=SAMPLE_RATE, block=BLOCK_SAMPLES, progress=None):
+    chunk = np.empty(block * READ_BLOCKS, dtype="<i2")
+    view = memoryview(chunk).cast("B")
+    minimums = []
+    maximums = []
+    rms = []
+    tail = np.zeros(0, dtype=np.int16)
+    while True:
+        read = 0
+        while read < len(view):
+            count = stream.readinto(view[read:])
+            if not count:
+                break
+            read += count
+        samples = np.concatenate([tail, chunk[:read // 2]]) if len(tail) else chunk[:read // 2]
+        usable = len(samples) // block * block
+        if usable:
+            blocks = samples[:usable].reshape(-1, block)
+            minimums.append(blocks.min(axis=1))
+            maximums.append(blocks.max(axis=1))
+            rms.append(block_rms(blocks, axis=1))
+        tail = samples[usable:].copy()
+        if progress:
+            progress(sum(len(values) for values in rms) * block / sample_rate)
+        if read < len(view):
+            break
+    if len(tail):
+        minimums.append(tail.min(keepdims=True))
+        maximums.append(tail.max(keepdims=True))
+        rms.append(block_rms(tail, keepdims=True))
+
+    level = np.stack([np.concatenate(minimums or [np.zeros(0, np.int16)]), np.concatenate(maximums or [np.zeros(0, np.int16)])], axis=-1)
+    rms = np.concatenate(rms or [np.zeros(0, np.int16)])
+    levels = [level]
+    while len(levels[-1]) > 1:
+        current = levels[-1]
+        if len(current) % 2:
+            current = np.vstack([current, current[-1:]])
+        pairs = current.reshape(-1, 2, 2)
+        levels.append(np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=-1))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, sample_rate, block, len(levels), len(rms), source[0], source[1]))
+        file.write(rms.astype("<i2").tobytes())
+        for values in levels:
+            file.write(values.astype("<i2").tobytes())
+    os.replace(temp_path, path)
+    return len(rms)
+
+
+def block_rms(samples, **options):
+    # A full-scale square wave has an RMS of 32768, one past the int16 range.
+    return np.minimum(np.sqrt(np.mean(np.square(samples, dtype=np.float32), **options)), 32767).astype(np.int16)
+
+
+def loudness_peaks(rms, block_seconds, window=0.4, baseline_seconds=30.0, rise_db=10.0, floor_db=-35.0, min_gap=2.0):
+    if not len(rms):
+        return []
+    size = max(1, int(round(window / block_seconds)))
+    power = np.square(rms.astype(np.float64) / 32768)
+    padded = np.concatenate([[0.0], np.cumsum(power)])
+    short_term = (padded[size:] - padded[:-size]) / size
+    loudness = 10 * np.log10(np.maximum(short_term, 1e-10))
+    # Baseline: median loudness over coarse chunks, interpolated back onto every window.
+    chunk = max(size, int(baseline_seconds / block_seconds))
+    chunks = [np.median(loudness[start:start + chunk]) for start in range(0, len(loudness), chunk)]
+    centers = np.arange(len(chunks)) * chunk + chunk / 2
+    baseline = np.interp(np.arange(len(loudness)), centers, chunks)
+    over = loudness - baseline
+    candidates = np.flatnonzero((over >= rise_db) & (loudness >= floor_db))
+    peaks = []
+    for index in candidates[np.argsort(-over[candidates], kind="stable")]:
+        moment = (index + size / 2) * block_seconds
+        if all(abs(moment - other["time"]) >= min_gap for other in peaks):
+            peaks.append({"time": moment, "loudness": float(loudness[index]), "rise": float(over[index])})
+    return sorted(peaks, key=lambda peak: peak["time"])
+
+
+class WaveformService:
+    def __init__(self, project_data=None, media=None, tasks=None):
+        self.project_data = project_data
+        self.media = media or MediaResolver()
+        self.tasks = tasks or TaskRegistry()
+        self._lock = threading.Lock()
+        self._indices = {}
+        self._building = {}
+
+    def get_waveform(self, video_path, time_from=0, time_to=None, pixels=1000):
+        try:
+            index = self._index(video_path)
+            if not isinstance(index, WaveformIndex):
+                return index
+            time_to = index.duration if time_to is None else float(time_to)
+            peaks = index.peaks(max(0.0, float(time_from or 0)), time_to, pixels)
+            return {
+                "status": "success",
+                "duration": index.duration,
+                "time_from": float(time_from or 0),
+                "time_to": time_to,
+                "peaks": np.round(peaks.astype(np.float64) / 32768, 4).tolist(),
+            }
+        except (TypeError, ValueError) as error:
+            return {"status": "error", "message": str(error)}
+
+    def get_audio_peaks(self, video_path, rise_db=10.0, save=False):
+        try:
+            index = self._index(video_path)
+            if not isinstance(index, WaveformIndex):
+                return index
+            block_seconds = index.block / index.sample_rate
+            peaks = loudness_peaks(np.asarray(index.rms), block_seconds, rise_db=float(rise_db))
+        except (TypeError, ValueError) as error:
+            return {"status": "error", "message": str(error)}
+
+        events = [{
+            "id": f"{SOURCE}-{int(round(peak['time'] * 1000))}",
+            "label": "Audio peak",
+            "time_from": round(peak["time"], 3),
+            "score": round(peak["rise"], 2),
+            "source": SOURCE,
+        } for peak in peaks]
+        result = {"status": "success", "events": events}
+        if save and self.project_data:
+            found_ids = {event["id"] for event in events}
+            ops = [
+                {"op": "delete", "collection": "events", "id": event["id"]}
+                for event in self.project_data.snapshot(video_path).get("events") or []
+                if event.get("source") == SOURCE and event.get("id") is not None and event["id"] not in found_ids
+            ]
+            ops += [{"op": "upsert", "collection": "events", "item": event} for event in events]
+            saved = self.project_data.patch(video_path, None, ops)
+            if saved.get("status") != "success":
+                return {"status": "error", "message": saved.get("message", "Could not save events."), "events": events}
+            result["revision"] = saved.get("revision")
+        return result
+
+    def serve(self, query):
+        index = self._index(query.get("path", [""])[0])
+        if not isinstance(index, WaveformIndex):
+            return None
+        time_from = float(query.get("start", ["0"])[0] or 0)
+        time_to = float(query.get("end", [str(index.duration)])[0] or index.duration)
+        peaks = index.peaks(time_from, time_to, int(query.get("pixels", ["1000"])[0] or 1000))
+        return "application/octet-stream", peaks.astype("<i2").tobytes()
+
+    def _index(self, video_path):
+        media = self.media.resolve(video_path)
+        if not media.is_file:
+            return {"status": "error", "message": "Input video was not found."}
+        sidecar = media.sidecar(".waveform.bin")
+        with self._lock:
+            index = self._indices.get(sidecar)
+            if index and index.source == (media.size, media.mtime_ns):
+                return index
+        try:
+            index = WaveformIndex(sidecar)
+            if index.source == (media.size, media.mtime_ns):
+                with self._lock:
+                    self._indices[sidecar] = index
+                return index
+        except (OSError, ValueError, struct.error):
+            pass
+        return self._start_build(media, sidecar)
+
+    def _start_build(self, media, sidecar):
+        if not media.ffmpeg:
+            return {"status": "error", "message": "ffmpeg not found. It is required to read audio."}
+        with self._lock:
+            task_id = self._building.get(sidecar)
+            if task_id and self.tasks.status(task_id).get("status") == "processing":
+                return {"status": "processing", "task_id": task_id}
+            task_id = self._building[sidecar] = self.tasks.create("waveform", {"message": "Reading audio..."})
+        thread = threading.Thread(target=self._build_task, args=(task_id, media, sidecar), daemon=True)
+        thread.start()
+        return {"status": "processing", "task_id": task_id}
+
+    def _build_task(self, task_id, media, sidecar):
+        command = [
+            media.ffmpeg, "-v", "error", "-i", media.path, "-vn", "-sn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "-f", "s16le", "-acodec", "pcm_s16le", "-",
+        ]
+        duration = self._duration(media)
+        started_at = time.time()
+        # stderr goes to a file: an undrained pipe would block ffmpeg once it fills up.
+        errors = tempfile.TemporaryFile()
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+        except OSError as error:
+            errors.close()
+            self.tasks.set(task_id, {"status": "error", "message": str(error)})
+            return
+        self.tasks.set(task_id, {"process": process})
+
+        def progress(seconds):
+            if duration:
+                self.tasks.set(task_id, {"progress": min(99, int(seconds / duration * 100)), "speed": round(seconds / max(0.001, time.time() - started_at), 1)})
+
+        try:
+            blocks = write_pyramid(process.stdout, sidecar, (media.size, media.mtime_ns), progress=progress)
+        except OSError as error:
+            process.kill()
+            process.wait()
+            errors.close()
+            self._remove(sidecar)
+            self.tasks.set(task_id, {"status": "error", "message": str(error)})
+            return
+        process.wait()
+        errors.seek(0)
+        stderr = errors.read().decode("utf-8", "replace").strip()
+        errors.close()
+
+        if self.tasks.is_cancel_requested(task_id) or process.returncode:
+            self._remove(sidecar)
+        if self.tasks.is_cancel_requested(task_id):
+            self.tasks.set(task_id, {"status": "canceled", "progress": 0, "message": "Waveform canceled.", "estimated_seconds": 0})
+            return
+        if process.returncode:
+            lines = stderr.splitlines()
+            self.tasks.set(task_id, {"status": "error", "message": lines[-1] if lines else f"ffmpeg exited with code {process.returncode}."})
+            return
+        if not blocks:
+            self.tasks.set(task_id, {"status": "error", "message": "This video has no readable audio track."})
+            return
+        self.tasks.set(task_id, {"status": "done", "progress": 100, "message": "Waveform ready.", "estimated_seconds": 0})
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _duration(self, media):
+        if not media.ffprobe:
+            return None
+        try:
+            output = subprocess.run(
+                [media.ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", media.path],
+                capture_output=True, text=True, timeout=15,
+            ).stdout
+            return float(output.strip())
+        except (OSError, subprocess.SubprocessError, ValueError):
+            return None
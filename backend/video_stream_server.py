@@ -10,14 +10,18 @@ class VideoStreamServer:
         self._httpd = ThreadingHTTPServer((host, port), _VideoRequestHandler)
         self._httpd.owner = self
         self.port = self._httpd.server_address[1]
+        self.routes = {}
         self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
 
     def start(self):
         self._thread.start()
 
-    def url_for(self, video_path):
+    def route(self, path, handler, cache_control="no-cache"):
+        self.routes[path] = (handler, cache_control)
+
+    def url_for(self, video_path, route="/video"):
         clean_path = os.path.abspath(video_path)
-        return f"http://{self.host}:{self.port}/video?path={quote(clean_path)}"
+        return f"http://{self.host}:{self.port}{route}?path={quote(clean_path)}"
 
     def shutdown(self):
         self._httpd.shutdown()
@@ -31,6 +35,10 @@ class _VideoRequestHandler(BaseHTTPRequestHandler):
 
     def do_GET(self):
         parsed_url = urlparse(self.path)
+        route = self.server.owner.routes.get(parsed_url.path)
+        if route:
+            self._send_generated(*route, parse_qs(parsed_url.query))
+            return
         if parsed_url.path != "/video":
             self.send_error(404)
             return
@@ -71,6 +79,27 @@ class _VideoRequestHandler(BaseHTTPRequestHandler):
                     break
                 remaining -= len(data)
 
+    def _send_generated(self, handler, cache_control, query):
+        try:
+            result = handler(query)
+        except (TypeError, ValueError):
+            self.send_error(400)
+            return
+        if not result:
+            self.send_error(404)
+            return
+        content_type, body = result
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+
     def do_OPTIONS(self):
         self.send_response(204)
         self.send_header("Access-Control-Allow-Origin", "*")
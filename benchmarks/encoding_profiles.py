@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from backend.services.encoding_profiles import ENCODING_PROFILES, encode_commands, resolve_encoding
+from backend.services.media_identity import MediaResolver
+
+from .synthetic import synthetic_video
+
+
+def ssim(reference, candidate):
+    reference = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    candidate = cv2.cvtColor(candidate, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+
+    def blur(image):
+        return cv2.GaussianBlur(image, (11, 11), 1.5)
+
+    mu_x = blur(reference)
+    mu_y = blur(candidate)
+    sigma_x = blur(reference * reference) - mu_x * mu_x
+    sigma_y = blur(candidate * candidate) - mu_y * mu_y
+    sigma_xy = blur(reference * candidate) - mu_x * mu_y
+    value = ((2 * mu_x * mu_y + c1) * (2 * sigma_xy + c2)) / ((mu_x * mu_x + mu_y * mu_y + c1) * (sigma_x + sigma_y + c2))
+    return float(value.mean())
+
+
+def mean_ssim(source_path, encoded_path, every=5):
+    source = cv2.VideoCapture(source_path)
+    encoded = cv2.VideoCapture(encoded_path)
+    scores = []
+    index = 0
+    while True:
+        ok_source, reference = source.read()
+        ok_encoded, candidate = encoded.read()
+        if not ok_source or not ok_encoded:
+            break
+        if index % every == 0:
+            if candidate.shape != reference.shape:
+                reference = cv2.resize(reference, (candidate.shape[1], candidate.shape[0]), interpolation=cv2.INTER_AREA)
+            scores.append(ssim(reference, candidate))
+        index += 1
+    source.release()
+    encoded.release()
+    return float(np.mean(scores)) if scores else None
+
+
+def run(seconds=10, width=1920, height=1080, qualities=(60, 75, 90), target_size_mb=None, max_height=None):
+    ffmpeg = MediaResolver().find_tool("ffmpeg")
+    if not ffmpeg:
+        return {"benchmark": "encoding_profiles", "error": "ffmpeg not found"}
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        source = synthetic_video(os.path.join(directory, "source.avi"), seconds, width, height)
+        for profile in ENCODING_PROFILES:
+            for quality in qualities:
+                encoding = resolve_encoding(profile, quality, target_size_mb, max_height)
+                output = os.path.join(directory, f"{profile}_{quality}.mp4")
+                started_at = time.perf_counter()
+                for command in encode_commands(ffmpeg, ["-i", source], output, encoding, seconds, audio=False):
+                    subprocess.run(command, check=True, capture_output=True, cwd=directory)
+                elapsed = time.perf_counter() - started_at
+                results.append({
+                    "profile": profile,
+                    "quality": quality,
+                    "crf": None if target_size_mb else encoding["crf"],
+                    "preset": encoding["preset"],
+                    "max_height": encoding["max_height"],
+                    "encode_seconds": round(elapsed, 3),
+                    "speed": round(seconds / elapsed, 2),
+                    "size_mb": round(os.path.getsize(output) / 1024 / 1024, 3),
+                    "ssim": round(mean_ssim(source, output), 4),
+                })
+    return {"benchmark": "encoding_profiles", "seconds": seconds, "width": width, "height": height, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare encoding profiles by speed, size and SSIM on a synthetic clip.")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--quality", type=int, action="append", dest="qualities")
+    parser.add_argument("--target-size-mb", type=float, default=None)
+    parser.add_argument("--max-height", type=int, default=None)
+    args = parser.parse_args()
+    print(json.dumps(run(args.seconds, args.width, args.height, tuple(args.qualities or (60, 75, 90)), args.target_size_mb, args.max_height), indent=2))
+
+
+if __name__ == "__main__":
+    main()
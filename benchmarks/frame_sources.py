@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backend.services.frame_sources import FRAME_SOURCES, open_frame_source
+from backend.services.media_identity import MediaResolver
+
+from .synthetic import synthetic_video
+
+
+def read_all(kind, media, seconds, size, fps):
+    frame = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    started_at = time.perf_counter()
+    source = open_frame_source(kind, media, 0.0, seconds, size, fps)
+    frames = 0
+    try:
+        while frames < int(seconds * fps):
+            if source.read(frames / fps, frame) is None:
+                break
+            frames += 1
+    finally:
+        source.close()
+    elapsed = time.perf_counter() - started_at
+    return {"source": kind, "width": size[0], "height": size[1], "frames": frames, "seconds": round(elapsed, 3), "fps": round(frames / elapsed, 1)}
+
+
+def run(seconds=10, width=1920, height=1080, fps=30, heights=(None, 720)):
+    resolver = MediaResolver()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        media = resolver.resolve(synthetic_video(os.path.join(directory, "source.avi"), seconds, width, height, fps))
+        for kind in FRAME_SOURCES[1:]:
+            if kind == "ffmpeg" and not media.ffmpeg:
+                results.append({"source": kind, "error": "ffmpeg not found"})
+                continue
+            for target_height in heights:
+                size = (width, height) if not target_height else (int(round(width * target_height / height)) // 2 * 2, target_height)
+                results.append(read_all(kind, media, seconds, size, fps))
+    return {"benchmark": "frame_sources", "seconds": seconds, "width": width, "height": height, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OpenCV and ffmpeg frame sources by decode throughput.")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=float, default=30)
+    args = parser.parse_args()
+    print(json.dumps(run(args.seconds, args.width, args.height, args.fps), indent=2))
+
+
+if __name__ == "__main__":
+    main()
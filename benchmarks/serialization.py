@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from backend.services.project_data_service import ProjectDataService
+
+from .synthetic import synthetic_project
+
+
+def run(item_count=10000, repeat=3):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "match.mp4")
+        project = synthetic_project(video_path, item_count=item_count)
+        for name, compact in (("json", False), ("compact", True)):
+            service = ProjectDataService()
+            save_times = []
+            load_times = []
+            for _ in range(repeat):
+                started_at = time.perf_counter()
+                result = service.save(video_path, project, compact=compact)
+                save_times.append(time.perf_counter() - started_at)
+                if result.get("status") != "success":
+                    raise RuntimeError(result.get("message"))
+
+                started_at = time.perf_counter()
+                loaded = service.load(video_path)
+                load_times.append(time.perf_counter() - started_at)
+                if len(loaded["items"]) != item_count:
+                    raise RuntimeError("Round trip lost items.")
+
+            results[name] = {
+                "save_seconds": min(save_times),
+                "load_seconds": min(load_times),
+                "file_bytes": os.path.getsize(result["path"]),
+            }
+    return {"benchmark": "serialization", "items": item_count, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and compact project sidecars.")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+
+# Runs in a fresh interpreter so module caches from this process do not hide import costs.
+PROBE = r"""
+import json
+import sys
+import time
+
+started_at = time.perf_counter()
+result = {}
+import webview
+result["webview_import_seconds"] = time.perf_counter() - started_at
+mark = time.perf_counter()
+from backend.bridge import ApiBridge
+from backend.video_stream_server import VideoStreamServer
+result["bridge_import_seconds"] = time.perf_counter() - mark
+mark = time.perf_counter()
+server = VideoStreamServer()
+server.start()
+api = ApiBridge(server)
+result["bridge_init_seconds"] = time.perf_counter() - mark
+result["heavy_modules_loaded"] = sorted(name for name in ("cv2", "numpy") if name in sys.modules)
+result["ready_seconds"] = time.perf_counter() - started_at
+
+if WINDOW:
+    def shown():
+        result["time_to_window_seconds"] = time.perf_counter() - started_at
+        window.destroy()
+
+    window = webview.create_window("startup", html="<p>startup</p>", js_api=api)
+    window.events.shown += shown
+    webview.start()
+
+mark = time.perf_counter()
+api.editor
+result["first_export_service_seconds"] = time.perf_counter() - mark
+mark = time.perf_counter()
+api.prewarm()
+result["prewarm_rest_seconds"] = time.perf_counter() - mark
+server.shutdown()
+print(json.dumps({name: round(value, 4) if isinstance(value, float) else value for name, value in result.items()}))
+"""
+
+
+def measure(window):
+    started_at = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", f"WINDOW = {bool(window)}\n{PROBE}"],
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    elapsed = time.perf_counter() - started_at
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit code {completed.returncode}"}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = round(elapsed, 4)
+    return result
+
+
+def run(repeat=3, window=False):
+    runs = [measure(window) for _ in range(repeat)]
+    errors = [item["error"] for item in runs if "error" in item]
+    if errors:
+        return {"benchmark": "startup", "window": window, "error": errors[0]}
+    # Best of N: cold-cache outliers (first run after boot) say more about the disk than about the code.
+    best = {name: min(item[name] for item in runs) for name, value in runs[0].items() if isinstance(value, float)}
+    return {
+        "benchmark": "startup",
+        "window": window,
+        "repeat": repeat,
+        "heavy_modules_loaded": runs[0]["heavy_modules_loaded"],
+        "results": best,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bridge import, time to window and the cost of the lazily loaded services.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--window", action="store_true", help="Open a real window and time until it is shown (needs a display).")
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat, args.window), indent=2))
+
+
+if __name__ == "__main__":
+    main()
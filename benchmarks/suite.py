@@ -0,0 +1,240 @@
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import cv2
+
+from backend.services.media_identity import MediaResolver
+from backend.services.project_data_service import ProjectDataService
+from backend.services.video_editor_service import VideoEditorService
+from backend.video_stream_server import VideoStreamServer
+
+from .synthetic import synthetic_project, synthetic_video, transcode_video
+
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080)}
+# Metrics ending in one of these improve upwards; everything else is a duration and improves downwards.
+HIGHER_IS_BETTER = ("_fps", "_mb_per_s")
+DEFAULT_THRESHOLD = 0.15
+
+
+def build_media(directory, seconds, resolutions, ffmpeg):
+    media = {}
+    for name in resolutions:
+        width, height = RESOLUTIONS[name]
+        master = synthetic_video(os.path.join(directory, f"{name}_intra.avi"), seconds, width, height, fps=30)
+        media[f"{name}_intra"] = master
+        if ffmpeg:
+            media[f"{name}_gop250"] = transcode_video(ffmpeg, master, os.path.join(directory, f"{name}_gop250.mp4"), gop=250)
+            media[f"{name}_gop15"] = transcode_video(ffmpeg, master, os.path.join(directory, f"{name}_gop15.mp4"), gop=15)
+            media[f"{name}_vfr"] = transcode_video(ffmpeg, master, os.path.join(directory, f"{name}_vfr.mp4"), gop=60, vfr=True)
+    return media
+
+
+def overlay_project(video_path, items, seconds):
+    project = synthetic_project(video_path, item_count=items, event_count=0, duration=seconds)
+    return {"items": project["items"]}
+
+
+def wait_for(editor, task_id):
+    while True:
+        status = editor.get_export_status(task_id)
+        if status.get("status") != "processing":
+            return status
+        time.sleep(0.02)
+
+
+def measure_export(editor, video_path, seconds, items):
+    overlay_data = overlay_project(video_path, items, seconds)
+    started_at = time.perf_counter()
+    # max_height=0 lifts the draft 720p cap, so each metric is measured at the resolution in its name.
+    result = editor.export_clip(video_path, 0, int(seconds * 1000), overlay_data=overlay_data, profile="draft", max_height=0)
+    status = wait_for(editor, result["task_id"])
+    elapsed = time.perf_counter() - started_at
+    if status.get("status") != "done":
+        return {"error": status.get("message")}
+    frames = status.get("profile", {}).get("counters", {}).get("frames_written", 0)
+    return {
+        "export_seconds": round(elapsed, 3),
+        "export_fps": round(frames / elapsed, 2),
+        "bottleneck": (status.get("stages") or {}).get("bottleneck"),
+    }
+
+
+def measure_fast_cut(editor, video_path, seconds, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = editor.export_clip(video_path, int(seconds * 250), int(seconds * 750), include_draws=False)
+        status = wait_for(editor, result["task_id"])
+        if status.get("status") != "done":
+            return {"error": status.get("message")}
+        latencies.append(time.perf_counter() - started_at)
+    return {"fast_cut_seconds": round(min(latencies), 4)}
+
+
+def measure_range_requests(video_path, requests, chunk_bytes):
+    server = VideoStreamServer()
+    server.start()
+    size = os.path.getsize(video_path)
+    rng = random.Random(3)
+    path = server.url_for(video_path).split(str(server.port), 1)[1]
+    first_bytes = []
+    received = 0
+    started_at = time.perf_counter()
+    try:
+        connection = http.client.HTTPConnection(server.host, server.port, timeout=10)
+        for _ in range(requests):
+            start = rng.randrange(0, max(1, size - chunk_bytes))
+            requested_at = time.perf_counter()
+            connection.request("GET", path, headers={"Range": f"bytes={start}-{start + chunk_bytes - 1}"})
+            response = connection.getresponse()
+            response.read(1)
+            first_bytes.append(time.perf_counter() - requested_at)
+            received += 1 + len(response.read())
+        connection.close()
+    finally:
+        server.shutdown()
+    elapsed = time.perf_counter() - started_at
+    first_bytes.sort()
+    return {
+        "range_mb_per_s": round(received / 1024 / 1024 / elapsed, 2),
+        "range_first_byte_p50_seconds": round(first_bytes[len(first_bytes) // 2], 5),
+        "range_first_byte_p95_seconds": round(first_bytes[int(len(first_bytes) * 0.95)], 5),
+    }
+
+
+def measure_project(directory, item_counts, repeat):
+    results = {}
+    for items in item_counts:
+        video_path = os.path.join(directory, f"project_{items}.mp4")
+        project = synthetic_project(video_path, item_count=items)
+        service = ProjectDataService()
+        saves = []
+        loads = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            service.save(video_path, project)
+            saves.append(time.perf_counter() - started_at)
+            # A fresh service has no cached document, so load measures the sidecar read and parse.
+            started_at = time.perf_counter()
+            ProjectDataService().load(video_path)
+            loads.append(time.perf_counter() - started_at)
+        results[f"{items}_items"] = {"save_seconds": round(min(saves), 4), "load_seconds": round(min(loads), 4)}
+    return results
+
+
+def flatten(results, prefix=""):
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            metrics.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def compare(metrics, baseline, threshold=DEFAULT_THRESHOLD, overrides=None):
+    rows = []
+    for name, value in sorted(metrics.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        # The longest matching override prefix wins, so "export" can be loose while "export.1080p_intra" stays strict.
+        matches = [prefix for prefix in (overrides or {}) if name.startswith(prefix)]
+        limit = (overrides or {})[max(matches, key=len)] if matches else threshold
+        change = (value - reference) / reference
+        higher_is_better = name.endswith(HIGHER_IS_BETTER)
+        regressed = change < -limit if higher_is_better else change > limit
+        rows.append({"metric": name, "baseline": reference, "value": value, "change": round(change, 4), "threshold": limit, "regressed": regressed})
+    return rows
+
+
+def run(seconds=4, resolutions=("720p", "1080p"), items=(100, 1000), project_items=(1000, 10000), range_requests=200, chunk_bytes=1024 * 1024, repeat=3):
+    ffmpeg = MediaResolver().find_tool("ffmpeg")
+    results = {"export": {}, "fast_cut": {}, "range": {}, "project": {}}
+    skipped = []
+    with tempfile.TemporaryDirectory() as directory:
+        media = build_media(directory, seconds, resolutions, ffmpeg)
+        editor = VideoEditorService()
+        for name, video_path in media.items():
+            for count in items:
+                results["export"][f"{name}_{count}_items"] = measure_export(editor, video_path, seconds, count)
+            if ffmpeg and not name.endswith("_intra"):
+                results["fast_cut"][name] = measure_fast_cut(editor, video_path, seconds, repeat)
+        if not ffmpeg:
+            skipped += ["gop and vfr media", "fast_cut"]
+        largest = max(media.values(), key=os.path.getsize)
+        results["range"] = measure_range_requests(largest, range_requests, chunk_bytes)
+        results["project"] = measure_project(directory, project_items, repeat)
+    return {
+        "benchmark": "suite",
+        "environment": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "ffmpeg": bool(ffmpeg),
+        },
+        "settings": {"seconds": seconds, "resolutions": list(resolutions), "items": list(items), "project_items": list(project_items)},
+        "skipped": skipped,
+        "results": results,
+        "metrics": flatten(results),
+    }
+
+
+def parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        name, _, limit = value.partition("=")
+        overrides[name] = float(limit)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmark suite and compare it against a stored baseline.")
+    parser.add_argument("--seconds", type=float, default=4)
+    parser.add_argument("--resolution", action="append", choices=sorted(RESOLUTIONS), dest="resolutions")
+    parser.add_argument("--items", type=int, action="append", help="Overlay items per export (repeatable).")
+    parser.add_argument("--project-items", type=int, action="append")
+    parser.add_argument("--range-requests", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results JSON here.")
+    parser.add_argument("--baseline", help="Compare against a results JSON written earlier.")
+    parser.add_argument("--save-baseline", help="Also write the results as a new baseline.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative regression (0.15 = 15%%).")
+    parser.add_argument("--metric-threshold", action="append", metavar="PREFIX=LIMIT", help="Per-metric threshold, e.g. range=0.3.")
+    args = parser.parse_args()
+
+    report = run(
+        args.seconds,
+        tuple(args.resolutions or ("720p", "1080p")),
+        tuple(args.items or (100, 1000)),
+        tuple(args.project_items or (1000, 10000)),
+        args.range_requests,
+        repeat=args.repeat,
+    )
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        rows = compare(report["metrics"], baseline.get("metrics", {}), args.threshold, parse_overrides(args.metric_threshold))
+        report["comparison"] = {"baseline": args.baseline, "regressions": sum(row["regressed"] for row in rows), "metrics": rows}
+        exit_code = 1 if report["comparison"]["regressions"] else 0
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import math
+import random
+import subprocess
+
+
+def synthetic_project(video_path, item_count=10000, event_count=200, seed=7, duration=5400):
+    rng = random.Random(seed)
+    items = []
+    for index in range(item_count):
+        kind = index % 10
+        time_from = round(rng.uniform(0, duration), 3)
+        time_to = round(time_from + rng.uniform(0.5, 8), 3)
+        base = {
+            "id": f"item-{index}",
+            "label": f"Item {index}",
+            "color": "#45ffa2",
+            "width": 2,
+            "visible": True,
+            "time_from": time_from,
+            "time_to": time_to,
+        }
+        if kind < 6:
+            points = _stroke(rng, rng.randint(30, 120))
+            items.append({
+                **base,
+                "type": "free-line",
+                "points": points,
+                "path": " ".join(f"{'M' if i == 0 else 'L'} {p['x']} {p['y']}" for i, p in enumerate(points)),
+            })
+        elif kind < 8:
+            items.append({
+                **base,
+                "type": "polygon",
+                "closed": True,
+                "fillOpacity": 0.2,
+                "points": [_point(rng) for _ in range(rng.randint(3, 8))],
+            })
+        elif kind == 8:
+            items.append({**base, "type": "circle", "center": _point(rng), "radius": round(rng.uniform(2, 12), 3)})
+        else:
+            items.append({**base, "type": "player", "team": rng.choice(["home", "guest"]), "point": _point(rng)})
+
+    events = [
+        {"id": f"event-{index}", "label": rng.choice(["Shot", "Goal", "Pass"]), "time_from": round(rng.uniform(0, duration), 3)}
+        for index in range(event_count)
+    ]
+    return {
+        "video_path": video_path,
+        "events": events,
+        "items": items,
+        "cut": {"time_from": 0, "time_to": 0},
+    }
+
+
+def _point(rng):
+    return {"x": round(rng.uniform(0, 100), 4), "y": round(rng.uniform(0, 100), 4)}
+
+
+def _stroke(rng, count):
+    x = rng.uniform(10, 90)
+    y = rng.uniform(10, 90)
+    angle = rng.uniform(0, math.tau)
+    points = []
+    for _ in range(count):
+        angle += rng.uniform(-0.3, 0.3)
+        x = min(100, max(0, x + math.cos(angle) * 0.8))
+        y = min(100, max(0, y + math.sin(angle) * 0.8))
+        points.append({"x": round(x, 4), "y": round(y, 4)})
+    return points
+
+
+def synthetic_tracking_project(video_path, duration=5400, players_per_team=6, with_ball=True, marker_seconds=1.0, seed=11):
+    rng = random.Random(seed)
+    entities = [("player", team, str(number)) for team in ("home", "guest") for number in range(1, players_per_team + 1)]
+    if with_ball:
+        entities.append(("ball", None, "ball"))
+
+    items = []
+    for item_type, team, label in entities:
+        x = rng.uniform(20, 80)
+        y = rng.uniform(20, 80)
+        time = 0.0
+        index = 0
+        while time < duration:
+            x = min(95, max(5, x + rng.uniform(-1.5, 1.5)))
+            y = min(95, max(5, y + rng.uniform(-1.5, 1.5)))
+            item = {
+                "id": f"{item_type}-{team}-{label}-{index}",
+                "type": item_type,
+                "label": label,
+                "point": {"x": round(x, 4), "y": round(y, 4)},
+                "time_from": round(time, 3),
+                "time_to": round(time + marker_seconds * 0.5, 3),
+            }
+            if team:
+                item["team"] = team
+            items.append(item)
+            time += marker_seconds
+            index += 1
+
+    return {
+        "video_path": video_path,
+        "events": [],
+        "items": items,
+        "measure": {
+            "field": {
+                "points": [{"x": 20, "y": 20}, {"x": 80, "y": 20}, {"x": 10, "y": 80}, {"x": 90, "y": 80}],
+                "abMeters": 40,
+                "acMeters": 20,
+            }
+        },
+        "cut": {"time_from": 0, "time_to": 0},
+    }
+
+
+def synthetic_video(path, seconds=10, width=1920, height=1080, fps=25, players=12, seed=5):
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    writer.set(cv2.VIDEOWRITER_PROP_QUALITY, 95)
+    grass = np.zeros((height, width, 3), dtype=np.uint8)
+    grass[:] = (40, 120, 50)
+    stripes = (np.arange(width) // max(1, width // 12)) % 2 == 0
+    grass[:, stripes] = (45, 135, 55)
+    cv2.rectangle(grass, (width // 20, height // 10), (width - width // 20, height - height // 10), (230, 230, 230), max(2, width // 480))
+    cv2.line(grass, (width // 2, height // 10), (width // 2, height - height // 10), (230, 230, 230), max(2, width // 480))
+    start = rng.uniform([0.1, 0.15], [0.9, 0.85], (players, 2)) * (width, height)
+    velocity = rng.normal(0, 0.004, (players, 2)) * (width, height)
+    radius = max(4, height // 40)
+    for index in range(int(seconds * fps)):
+        # A slow pan plus sensor noise keeps the encoder honest; players are simple moving blobs.
+        frame = np.roll(grass, int(index * width / 2000), axis=1)
+        noise = rng.integers(0, 6, (height // 4, width // 4, 1), dtype=np.uint8)
+        frame = cv2.add(frame, cv2.resize(noise, (width, height), interpolation=cv2.INTER_NEAREST)[..., None].repeat(3, axis=2))
+        positions = start + velocity * index * np.sin(index / (fps * 4) + np.arange(players)[:, None])
+        for player, (x, y) in enumerate(positions):
+            color = (255, 170, 60) if player % 2 else (60, 90, 255)
+            cv2.circle(frame, (int(x) % width, int(y) % height), radius, color, -1, cv2.LINE_AA)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def transcode_video(ffmpeg, source_path, path, gop=250, vfr=False):
+    # libx264 with a fixed GOP; VFR jitters every timestamp by up to a third of a frame, like phone footage.
+    filters = ["setpts='N/FRAME_RATE/TB+0.33*sin(N)/FRAME_RATE/TB'"] if vfr else []
+    command = [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", source_path,
+        *(["-vf", filters[0], "-fps_mode", "vfr"] if vfr else []),
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-pix_fmt", "yuv420p",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0", "-an", path,
+    ]
+    subprocess.run(command, check=True, capture_output=True)
+    return path
@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from backend.services.project_data_service import ProjectDataService
+from backend.services.tactical_geometry_service import TacticalGeometryService
+
+from .synthetic import synthetic_tracking_project
+
+
+def run(duration=5400, players_per_team=6, rate=5, workers=None):
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "match.mp4")
+        project_data = ProjectDataService()
+        project_data.save(video_path, synthetic_tracking_project(video_path, duration, players_per_team))
+        geometry = TacticalGeometryService(project_data, workers=workers)
+
+        result = geometry.compute(video_path, rate)
+
+        started_at = time.perf_counter()
+        items = geometry.overlay_items(result, 600, 660)
+        emit_seconds = time.perf_counter() - started_at
+
+    return {
+        "benchmark": "tactical_geometry",
+        "duration_seconds": duration,
+        "players": len(result["players"]),
+        "frames": len(result["times"]),
+        "rate": rate,
+        "workers": geometry.workers,
+        "compute_seconds": result["compute_seconds"],
+        "frames_per_second": result["frames_per_second"],
+        "items_per_minute": len(items),
+        "emit_seconds_per_minute": emit_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the tactical geometry engine on a synthetic match.")
+    parser.add_argument("--duration", type=float, default=5400)
+    parser.add_argument("--players-per-team", type=int, default=6)
+    parser.add_argument("--rate", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    print(json.dumps(run(args.duration, args.players_per_team, args.rate, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
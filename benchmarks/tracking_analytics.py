@@ -0,0 +1,50 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from backend.services.project_data_service import ProjectDataService
+from backend.services.tracking_analytics_service import TrackingAnalyticsService
+
+from .synthetic import synthetic_tracking_project
+
+
+def run(duration=5400, players_per_team=6, rate=10):
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "match.mp4")
+        project_data = ProjectDataService()
+        project_data.save(video_path, synthetic_tracking_project(video_path, duration, players_per_team, with_ball=False))
+        analytics = TrackingAnalyticsService(project_data)
+
+        started_at = time.perf_counter()
+        result = analytics.analyze(video_path, rate)
+        cold_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        analytics.analyze(video_path, rate)
+        cached_seconds = time.perf_counter() - started_at
+
+    return {
+        "benchmark": "tracking_analytics",
+        "duration_seconds": duration,
+        "entities": len(result["keys"]),
+        "frames": len(result["times"]),
+        "rate": rate,
+        "compute_seconds": result["compute_seconds"],
+        "cold_seconds": cold_seconds,
+        "cached_seconds": cached_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the tracking analytics engine on a synthetic match.")
+    parser.add_argument("--duration", type=float, default=5400)
+    parser.add_argument("--players-per-team", type=int, default=6)
+    parser.add_argument("--rate", type=float, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.duration, args.players_per_team, args.rate), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.services.encoding_profiles import ENCODING_PROFILES
+from backend.services.frame_sources import FRAME_SOURCES, probe_video
+from backend.services.highlight_reel import REEL_LABELS, event_ranges
+from backend.services.media_identity import MediaResolver
+from backend.services.project_data_service import ProjectDataService
+from backend.services.task_registry import TaskRegistry
+
+
+FINAL_STATES = {"done", "error", "canceled"}
+
+
+class HeadlessRunner:
+    # The same services the desktop bridge wires up, minus the window: built on first use, so `probe` never loads the editor.
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.media = MediaResolver()
+        self.tasks = TaskRegistry()
+        self.project_data = ProjectDataService(media=self.media)
+        self._services = {}
+        self._services_lock = threading.RLock()
+        self._output_lock = threading.Lock()
+        self._jobs = {}
+        if not quiet:
+            self.tasks.events.subscribe(self._progress)
+
+    def service(self, name):
+        with self._services_lock:
+            if name not in self._services:
+                self._services[name] = self._create(name)
+            return self._services[name]
+
+    def _create(self, name):
+        if name == "frames":
+            from backend.services.frame_service import FrameService
+            return FrameService(self.media)
+        if name == "editor":
+            from backend.services.heatmap_service import HeatmapService
+            from backend.services.video_editor_service import VideoEditorService
+            return VideoEditorService(self.media, layers=HeatmapService(self.project_data), tasks=self.tasks, frames=self.service("frames"))
+        if name == "scenes":
+            from backend.services.scene_detection_service import SceneDetectionService
+            return SceneDetectionService(self.project_data, self.media, self.tasks)
+        if name == "waveforms":
+            from backend.services.waveform_service import WaveformService
+            return WaveformService(self.project_data, self.media, self.tasks)
+        if name == "analytics":
+            from backend.services.tracking_analytics_service import TrackingAnalyticsService
+            return TrackingAnalyticsService(self.project_data)
+        raise ValueError(f"Unknown service: {name}")
+
+    def emit(self, event, **fields):
+        with self._output_lock:
+            sys.stdout.write(json.dumps({"event": event, **fields}) + "\n")
+            sys.stdout.flush()
+
+    def wait(self, job, result):
+        if result.get("status") != "processing" or not result.get("task_id"):
+            return result
+        task_id = result["task_id"]
+        self._jobs[task_id] = job
+        while True:
+            status = self.tasks.status(task_id)
+            if status.get("status") in FINAL_STATES:
+                self._jobs.pop(task_id, None)
+                return status
+            time.sleep(0.1)
+
+    def cancel_all(self):
+        for task_id in list(self._jobs):
+            self.tasks.cancel(task_id, "Canceled from the command line.")
+
+    def _progress(self, status):
+        job = self._jobs.get(status.get("task_id"))
+        if job and status.get("status") == "processing":
+            self.emit("progress", job=job, task_id=status["task_id"], progress=status.get("progress"), message=status.get("message"))
+
+    def run(self, jobs, parallel):
+        failures = 0
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = [(name, executor.submit(self._run_job, name, job)) for name, job in jobs]
+            try:
+                for name, future in futures:
+                    result = future.result()
+                    failed = result.get("status") in {"error", "canceled"}
+                    failures += failed
+                    self.emit("error" if failed else "done", job=name, result=result)
+            except KeyboardInterrupt:
+                self.cancel_all()
+                for _, future in futures:
+                    future.cancel()
+                raise
+        return failures
+
+    def _run_job(self, name, job):
+        self.emit("start", job=name)
+        try:
+            return self.wait(name, job())
+        except Exception as error:
+            return {"status": "error", "message": str(error)}
+
+
+def seconds_to_msec(value):
+    return int(round(float(value) * 1000))
+
+
+def probe_job(runner, video_path):
+    def job():
+        media = runner.media.resolve(video_path)
+        info = probe_video(media.path) if media.is_file else None
+        if not info:
+            return {"status": "error", "message": f"Could not open video: {video_path}"}
+        duration = info["frame_count"] / info["fps"] if info["frame_count"] > 0 else None
+        return {"status": "success", "path": media.path, "size": media.size, "duration": duration, "ffmpeg": bool(media.ffmpeg), **info}
+    return job
+
+
+def thumbnail_job(runner, video_path, seconds, image_format, width, output_dir):
+    def job():
+        frames = runner.service("frames")
+        frame, index = frames.frame(video_path, seconds)
+        _, body = frames.encode(frame, image_format, 90, width)
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        extension = "jpg" if image_format in {"jpeg", "jpg"} else image_format
+        path = os.path.join(output_dir or os.path.dirname(os.path.abspath(video_path)), f"{stem}_{seconds_to_msec(seconds)}.{extension}")
+        with open(path, "wb") as file:
+            file.write(body)
+        return {"status": "success", "path": path, "frame": index}
+    return job
+
+
+def export_job(runner, video_path, start, end, args):
+    def job():
+        overlay_data = runner.project_data.snapshot(video_path) if args.draws else None
+        return runner.service("editor").export_clip(
+            video_path,
+            start,
+            end,
+            playback_speed=args.speed,
+            quality=args.quality,
+            include_draws=args.draws,
+            overlay_data=overlay_data,
+            profile=args.profile,
+            max_height=args.max_height,
+            fps=args.fps,
+            decoder=args.decoder,
+            trace=args.trace,
+            threads=args.threads,
+        )
+    return job
+
+
+def reel_job(runner, video_path, ranges, args):
+    def job():
+        return runner.service("editor").export_reel(
+            video_path,
+            ranges,
+            overlay_data=runner.project_data.snapshot(video_path) if args.draws else None,
+            include_draws=args.draws,
+            profile=args.profile,
+            quality=args.quality,
+            max_height=args.max_height,
+            decoder=args.decoder,
+            trace=args.trace,
+            threads=args.threads,
+        )
+    return job
+
+
+def still_job(runner, image_path, args):
+    def job():
+        return runner.service("editor").export_still(
+            image_path,
+            overlay_data=runner.project_data.snapshot(image_path),
+            display_time=args.time,
+            image_format=args.format,
+            quality=args.quality,
+        )
+    return job
+
+
+def scenes_job(runner, video_path, args):
+    def job():
+        return runner.service("scenes").start_detection(video_path, sample_rate=args.sample_rate, cut_threshold=args.threshold)
+    return job
+
+
+def audio_peaks_job(runner, video_path, args):
+    def job():
+        waveforms = runner.service("waveforms")
+        result = runner.wait(f"waveform:{video_path}", waveforms.get_audio_peaks(video_path, args.rise_db, args.save))
+        if result.get("status") != "done":
+            return result
+        return waveforms.get_audio_peaks(video_path, args.rise_db, args.save)
+    return job
+
+
+def analytics_job(runner, video_path, args):
+    def job():
+        return runner.service("analytics").get_analytics(video_path, rate=args.rate)
+    return job
+
+
+def build_jobs(runner, args):
+    jobs = []
+    for video_path in map(os.path.abspath, args.videos):
+        name = os.path.basename(video_path)
+        if args.command == "probe":
+            jobs.append((f"probe:{name}", probe_job(runner, video_path)))
+        elif args.command == "thumbnail":
+            for seconds in args.time or [0.0]:
+                jobs.append((f"thumbnail:{name}@{seconds}", thumbnail_job(runner, video_path, seconds, args.format, args.width, args.output_dir)))
+        elif args.command == "export":
+            end = args.end
+            if end is None:
+                info = probe_video(runner.media.resolve(video_path).path) or {}
+                end = info.get("frame_count", 0) / info.get("fps", 30) if info else 0
+            jobs.append((f"export:{name}", export_job(runner, video_path, seconds_to_msec(args.start), seconds_to_msec(end), args)))
+        elif args.command == "events":
+            events = runner.project_data.snapshot(video_path).get("events") or []
+            ranges = event_ranges(events, labels=args.labels or REEL_LABELS, pre_roll=args.pre_roll, post_roll=args.post_roll)
+            if args.reel:
+                jobs.append((f"reel:{name}", reel_job(runner, video_path, ranges, args)))
+                continue
+            for item in ranges:
+                jobs.append((f"export:{name}@{item['start']}-{item['end']}", export_job(runner, video_path, item["start"], item["end"], args)))
+        elif args.command == "still":
+            jobs.append((f"still:{name}", still_job(runner, video_path, args)))
+        elif args.command == "scenes":
+            jobs.append((f"scenes:{name}", scenes_job(runner, video_path, args)))
+        elif args.command == "audio-peaks":
+            jobs.append((f"audio-peaks:{name}", audio_peaks_job(runner, video_path, args)))
+        elif args.command == "analytics":
+            jobs.append((f"analytics:{name}", analytics_job(runner, video_path, args)))
+    return jobs
+
+
+def add_export_options(parser):
+    parser.add_argument("--no-draws", dest="draws", action="store_false", help="Skip overlays (stream copy when possible).")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--quality", type=int, default=90)
+    parser.add_argument("--profile", choices=sorted(ENCODING_PROFILES), default=None)
+    parser.add_argument("--max-height", type=int, default=None)
+    parser.add_argument("--fps", type=float, default=None)
+    parser.add_argument("--decoder", choices=FRAME_SOURCES, default="auto")
+    parser.add_argument("--trace", action="store_true", help="Write a Chrome trace next to each output.")
+    parser.add_argument("--threads", type=int, default=None, help="Encoder threads per job (default: the profile's).")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless exports and analysis. Prints one JSON object per line.")
+    parser.add_argument("--jobs", type=int, default=2, help="Jobs run in parallel.")
+    parser.add_argument("--quiet", action="store_true", help="Only print start and result lines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("probe", help="Print fps, size, frame count and duration.")
+    command.add_argument("videos", nargs="+")
+
+    command = commands.add_parser("thumbnail", help="Save frames as images.")
+    command.add_argument("videos", nargs="+")
+    command.add_argument("--time", type=float, action="append", help="Seconds (repeatable).")
+    command.add_argument("--format", choices=("jpeg", "webp", "png"), default="jpeg")
+    command.add_argument("--width", type=int, default=None)
+    command.add_argument("--output-dir", default=None)
+
+    command = commands.add_parser("export", help="Export one cut per video with the project's overlays.")
+    command.add_argument("videos", nargs="+")
+    command.add_argument("--start", type=float, default=0.0, help="Seconds.")
+    command.add_argument("--end", type=float, default=None, help="Seconds (default: end of video).")
+    add_export_options(command)
+
+    command = commands.add_parser("events", help="Export project events as clips or as one reel.")
+    command.add_argument("videos", nargs="+")
+    command.add_argument("--labels", nargs="+", default=None, help="Event labels (default: Goal Shot).")
+    command.add_argument("--pre-roll", type=float, default=3.0)
+    command.add_argument("--post-roll", type=float, default=5.0)
+    command.add_argument("--reel", action="store_true", help="Join all clips of a video into one reel.")
+    add_export_options(command)
+
+    command = commands.add_parser("still", help="Save images with the project's overlays drawn at full resolution.")
+    command.add_argument("videos", nargs="+", metavar="images")
+    command.add_argument("--time", type=float, default=0.0, help="Overlay time in seconds.")
+    command.add_argument("--format", choices=("png", "jpeg", "webp"), default="png")
+    command.add_argument("--quality", type=int, default=95)
+
+    command = commands.add_parser("scenes", help="Detect cuts and activity peaks and save them as events.")
+    command.add_argument("videos", nargs="+")
+    command.add_argument("--sample-rate", type=float, default=4.0)
+    command.add_argument("--threshold", type=float, default=0.3)
+
+    command = commands.add_parser("audio-peaks", help="Find loudness peaks (needs ffmpeg).")
+    command.add_argument("videos", nargs="+")
+    command.add_argument("--rise-db", type=float, default=10.0)
+    command.add_argument("--save", action="store_true", help="Add the peaks to the project events.")
+
+    command = commands.add_parser("analytics", help="Tracking analytics from the project's player markers.")
+    command.add_argument("videos", nargs="+")
+    command.add_argument("--rate", type=float, default=10.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runner = HeadlessRunner(quiet=args.quiet)
+    try:
+        failures = runner.run(build_jobs(runner, args), args.jobs)
+    except KeyboardInterrupt:
+        return 130
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,10 @@ export class CutService {
             quality: 90
         });
         this.pollTimer = null;
+        this.subscription = null;
+        this.onTaskEvent = (event) => {
+            if (event.detail?.task_id === this.state.taskId) this.applyStatus(event.detail);
+        };
     }
 
     setFromNow() {
@@ -87,9 +91,17 @@ export class CutService {
         this.startPolling();
     }
 
-    startPolling() {
+    async startPolling() {
         this.stopPolling();
-        if (!this.state.taskId || !window.pywebview?.api?.get_export_status) return;
+        if (!this.state.taskId) return;
+        if (window.pywebview?.api?.subscribe_tasks) {
+            window.addEventListener("motuo:task", this.onTaskEvent);
+            const result = await window.pywebview.api.subscribe_tasks({ task_ids: [this.state.taskId] });
+            this.subscription = result?.subscription ?? null;
+            await this.pollStatus();
+            return;
+        }
+        if (!window.pywebview?.api?.get_export_status) return;
         this.pollTimer = window.setInterval(() => this.pollStatus(), 500);
         this.pollStatus();
     }
@@ -99,11 +111,20 @@ export class CutService {
             window.clearInterval(this.pollTimer);
             this.pollTimer = null;
         }
+        window.removeEventListener("motuo:task", this.onTaskEvent);
+        if (this.subscription !== null) {
+            window.pywebview?.api?.unsubscribe_tasks?.(this.subscription);
+            this.subscription = null;
+        }
     }
 
     async pollStatus() {
         if (!this.state.taskId || !window.pywebview?.api?.get_export_status) return;
         const result = await window.pywebview.api.get_export_status(this.state.taskId);
+        this.applyStatus(result);
+    }
+
+    applyStatus(result) {
         this.state.status = result?.status || "error";
         this.state.message = result?.message || "";
         this.state.path = result?.path || this.state.path;
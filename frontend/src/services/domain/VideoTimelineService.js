@@ -7,6 +7,7 @@ export class VideoTimelineService {
             videoUrl: null,
             videoPath: null,
             mediaType: null,
+            imageTiles: null,
             currentTime: 0,
             duration: 0,
             speed: 1,
@@ -60,10 +61,28 @@ export class VideoTimelineService {
         this.state.currentTime = 0;
         this.state.duration = mediaType === "image" ? 10 : 0;
         this.state.isPlaying = false;
+        this.state.imageTiles = null;
 
+        if (mediaType === "image") this.loadImageTiles(videoPath);
         await this.projectService?.load(videoPath);
     }
 
+    async loadImageTiles(imagePath) {
+        const api = window.pywebview?.api;
+        if (!api?.get_image_tiles) return;
+        // Small images, GIFs and images with alpha come back untiled and stay on the plain <img>.
+        // Large ones build the pyramid in the background; the plain image is shown until it is ready.
+        let result = await api.get_image_tiles(imagePath);
+        while (result?.status === "processing" && this.state.videoPath === imagePath) {
+            await new Promise((resolve) => window.setTimeout(resolve, 1000));
+            const task = await api.get_task_status(result.task_id);
+            if (task?.status !== "processing") result = task?.status === "done" ? await api.get_image_tiles(imagePath) : task;
+        }
+        if (this.state.videoPath === imagePath && result?.status === "success" && result.tiled && result.tile_url) {
+            this.state.imageTiles = result;
+        }
+    }
+
     mediaTypeFor(path = "", mimeType = "") {
         if (String(mimeType).startsWith("image/")) return "image";
         if (String(mimeType).startsWith("video/")) return "video";
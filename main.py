@@ -31,7 +31,8 @@ def start_window():
         height=900,
         min_size=(1000, 700),
     )
-    webview.start(debug=False)
+    # cv2/numpy and the export services load in the background once the window is up.
+    webview.start(api.prewarm, debug=False)
 
 
 if __name__ == "__main__":
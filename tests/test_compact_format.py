@@ -0,0 +1,64 @@
+import json
+import random
+import zlib
+
+from backend.services.compact_format import MAGIC, SCALE, is_compact_file, read_document, write_document
+
+
+TOLERANCE = 0.5 / SCALE
+
+
+def path_points(path):
+    tokens = path.split()
+    assert tokens[0::3] == ["M"] + ["L"] * (len(tokens) // 3 - 1)
+    return [(float(x), float(y)) for x, y in zip(tokens[1::3], tokens[2::3])]
+
+
+def assert_close(actual, expected):
+    if isinstance(expected, dict):
+        assert set(actual) == set(expected)
+        for key in expected:
+            if key == "path" and isinstance(expected[key], str) and expected[key].startswith("M "):
+                for (ax, ay), (ex, ey) in zip(path_points(actual[key]), path_points(expected[key]), strict=True):
+                    assert abs(ax - ex) <= TOLERANCE and abs(ay - ey) <= TOLERANCE
+            else:
+                assert_close(actual[key], expected[key])
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for actual_child, expected_child in zip(actual, expected):
+            assert_close(actual_child, expected_child)
+    elif isinstance(expected, float):
+        assert abs(actual - expected) <= TOLERANCE
+    else:
+        assert actual == expected
+
+
+def test_compact_round_trip_stays_within_quantisation(tmp_path):
+    rng = random.Random(7)
+    points = [{"x": rng.uniform(-5, 105), "y": rng.uniform(-5, 105)} for _ in range(200)]
+    free_line = "M 12.5 40 " + " ".join(f"L {rng.uniform(0, 100)} {rng.uniform(0, 100)}" for _ in range(100))
+    data = {
+        "video_path": "/videos/match.mp4",
+        "revision": 3,
+        "events": [{"id": "goal-1", "label": "Goal", "time_from": 12.345}],
+        "items": [
+            {"id": "p1", "type": "polyline", "points": points, "$note": {"x": 1, "y": 2}},
+            {"id": "f1", "type": "free-line", "path": free_line},
+            {"id": "f2", "type": "free-line", "path": "M 1e-7 2 L 3 4"},
+            {"id": "c1", "type": "circle", "center": {"x": 50, "y": 50}, "radius": 10, "visible": True},
+        ],
+    }
+    path = str(tmp_path / "match.json")
+
+    written = write_document(path, data, compact=True)
+
+    assert is_compact_file(written)
+    raw = open(written, "rb").read()
+    header_length = int.from_bytes(raw[len(MAGIC):len(MAGIC) + 4], "little")
+    header = json.loads(zlib.decompress(raw[len(MAGIC) + 4:len(MAGIC) + 4 + header_length]))
+    assert header["items"][1]["path"] == {"$path": [400, 101]}
+    restored = read_document(path)
+    assert_close(restored, data)
+    assert restored["items"][1]["path"].startswith("M 12.5 40 L ")
+    assert restored["items"][2]["path"] == "M 1e-7 2 L 3 4"
+    assert json.loads(json.dumps(restored)) == restored
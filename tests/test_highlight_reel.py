@@ -0,0 +1,129 @@
+import shutil
+import subprocess
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.services.highlight_reel import keyframe_before, parse_keyframes
+from backend.services.video_editor_service import VideoEditorService
+
+
+OVERLAY = {"items": [{"id": "c1", "type": "circle", "center": {"x": 50, "y": 50}, "radius": 10, "color": "#ff0000", "width": 3, "time_from": 3.2, "time_to": 3.6}]}
+
+
+def write_video(path, seconds=6, fps=25, size=(160, 90)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for index in range(int(seconds * fps)):
+        writer.write(np.full((size[1], size[0], 3), index % 255, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def source_stream(**changes):
+    stream = {
+        "codec": "h264",
+        "profile": "high",
+        "level": 30,
+        "pix_fmt": "yuv420p",
+        "size": (160, 90),
+        "rate": "25/1",
+        "fps": 25.0,
+        "start_time": 0.0,
+        "keyframes": [0.0, 2.0, 4.0],
+    }
+    stream.update(changes)
+    return stream
+
+
+def run_reel(editor, video_path, ranges, overlay_data=None):
+    result = editor.export_reel(video_path, ranges, overlay_data=overlay_data)
+    assert result["status"] == "processing"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        status = editor.tasks.status(result["task_id"])
+        if status["status"] != "processing":
+            return status
+        time.sleep(0.05)
+    raise AssertionError("reel did not finish")
+
+
+@pytest.fixture
+def stubbed_editor(monkeypatch):
+    editor = VideoEditorService()
+    commands = []
+    monkeypatch.setattr(editor, "_find_tool", lambda name: name)
+    monkeypatch.setattr(editor, "_run_tool", lambda task_id, command, on_progress=None: (commands.append(command), (0, ""))[1])
+    editor.commands = commands
+    return editor
+
+
+def test_keyframe_before_snaps_back_and_gives_up_on_long_gops():
+    keyframes = parse_keyframes("0.000000,K__\n2.000000,K__\n2.040000,___\n")
+    assert keyframes == [0.0, 2.0]
+    assert keyframe_before(keyframes, 2.5) == 2.0
+    assert keyframe_before(keyframes, 2.0) == 2.0
+    assert keyframe_before(keyframes, 30.0) is None
+
+
+def test_mixed_reel_copies_from_previous_keyframe(tmp_path, stubbed_editor, monkeypatch):
+    video_path = write_video(tmp_path / "match.mp4")
+    monkeypatch.setattr(stubbed_editor, "_reel_source", lambda media, ranges: source_stream())
+
+    status = run_reel(stubbed_editor, video_path, [{"start": 500, "end": 1500}, {"start": 3000, "end": 3800}, {"start": 4300, "end": 5500}], OVERLAY)
+
+    assert status["status"] == "done"
+    assert status["clip_modes"] == ["copy", "render", "copy"]
+    assert [(clip["start"], clip["requested_start"]) for clip in status["clip_ranges"]] == [(0, 500), (3000, 3000), (4000, 4300)]
+    copies = [command for command in stubbed_editor.commands if "copy" in command and "-f" in command and "mpegts" in command]
+    assert [command[command.index("-ss") + 1] for command in copies] == ["0.000000", "4.000000"]
+    rendered = next(command for command in stubbed_editor.commands if "libx264" in command)
+    assert rendered[rendered.index("-profile:v") + 1] == "high"
+    assert rendered[rendered.index("-r") + 1] == "25/1"
+
+
+def test_incompatible_source_encodes_every_clip_of_a_mixed_reel(tmp_path, stubbed_editor, monkeypatch):
+    video_path = write_video(tmp_path / "match.mp4")
+    monkeypatch.setattr(stubbed_editor, "_reel_source", lambda media, ranges: source_stream(pix_fmt="yuvj420p"))
+
+    status = run_reel(stubbed_editor, video_path, [{"start": 500, "end": 1500}, {"start": 3000, "end": 3800}], OVERLAY)
+
+    assert status["clip_modes"] == ["encode", "render"]
+    assert status["clip_ranges"][0]["start"] == 500
+
+
+def test_copy_only_reel_skips_snap_into_previous_clip(tmp_path, stubbed_editor, monkeypatch):
+    video_path = write_video(tmp_path / "match.mp4")
+    monkeypatch.setattr(stubbed_editor, "_reel_source", lambda media, ranges: source_stream(keyframes=[0.0, 4.0]))
+
+    status = run_reel(stubbed_editor, video_path, [{"start": 0, "end": 2500}, {"start": 3000, "end": 3500}])
+
+    # 3.0 s would snap to 0.0 s and replay the first clip, so it is encoded from its requested start.
+    assert status["clip_modes"] == ["copy", "encode"]
+    assert status["clip_ranges"][1]["start"] == 3000
+
+
+@pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")), reason="needs ffmpeg and ffprobe")
+def test_mixed_reel_joins_and_decodes_with_ffmpeg(tmp_path):
+    source = tmp_path / "match.mp4"
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", "testsrc=size=320x180:rate=25", "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+        "-t", "12", "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-g", "50", "-keyint_min", "50", "-sc_threshold", "0",
+        "-c:a", "aac", "-shortest", str(source),
+    ], check=True)
+    editor = VideoEditorService()
+
+    status = run_reel(editor, str(source), [{"start": 2500, "end": 3000}, {"start": 3200, "end": 3900}, {"start": 8300, "end": 9500}], OVERLAY)
+
+    assert status["status"] == "done", status.get("message")
+    assert status["clip_modes"] == ["copy", "render", "copy"]
+    assert [clip["start"] for clip in status["clip_ranges"]] == [2000, 3200, 8000]
+    decoded = subprocess.run(["ffmpeg", "-v", "error", "-xerror", "-i", status["path"], "-f", "null", "-"], capture_output=True, text=True)
+    assert decoded.returncode == 0, decoded.stderr
+    capture = cv2.VideoCapture(status["path"])
+    frames = 0
+    while capture.grab():
+        frames += 1
+    capture.release()
+    assert abs(frames - 25 * (1.0 + 0.7 + 1.5)) <= 6
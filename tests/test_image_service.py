@@ -0,0 +1,36 @@
+import cv2
+import numpy as np
+
+from backend.services import image_service
+
+
+def write_image(path):
+    image = np.random.default_rng(3).integers(0, 256, (120, 200, 3), dtype=np.uint8)
+    cv2.imwrite(str(path), image)
+    return image
+
+
+def test_decode_image_fills_the_map(tmp_path):
+    image = write_image(tmp_path / "frame.png")
+
+    decoded = image_service.decode_image(str(tmp_path / "frame.png"), str(tmp_path / "frame.npy"))
+
+    assert np.array_equal(decoded, image)
+    assert np.array_equal(np.load(tmp_path / "frame.npy"), image)
+
+
+def test_decode_image_without_dst_overload(tmp_path, monkeypatch):
+    image = write_image(tmp_path / "frame.png")
+    imread = cv2.imread
+
+    def imread_without_dst(path, *args):
+        if len(args) > 1:
+            raise TypeError("imread() takes at most 2 arguments")
+        return imread(path, *args)
+
+    monkeypatch.setattr(image_service.cv2, "imread", imread_without_dst)
+
+    decoded = image_service.decode_image(str(tmp_path / "frame.png"), str(tmp_path / "frame.npy"))
+
+    assert np.array_equal(decoded, image)
+    assert np.array_equal(np.load(tmp_path / "frame.npy"), image)
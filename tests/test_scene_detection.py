@@ -0,0 +1,51 @@
+import shutil
+import time
+
+import pytest
+
+from backend.services.project_data_service import ProjectDataService
+from backend.services.scene_detection_service import SOURCE, SceneDetectionService
+
+
+def scene_event(ms, **changes):
+    return {"id": f"{SOURCE}-cut-{ms}", "label": "Cut", "time_from": ms / 1000, "source": SOURCE, **changes}
+
+
+def wait(service, task_id):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        status = service.tasks.status(task_id)
+        if status["status"] != "processing":
+            return status
+        time.sleep(0.05)
+    raise AssertionError("detection did not finish")
+
+
+def test_save_replaces_only_scene_events_in_range(tmp_path):
+    video_path = str(tmp_path / "match.mp4")
+    (tmp_path / "match.mp4").write_bytes(b"")
+    project_data = ProjectDataService()
+    manual = {"id": "goal-1", "label": "Goal", "time_from": 2.0}
+    project_data.save_events(video_path, [manual, scene_event(1000), scene_event(2500), scene_event(9000)])
+    service = SceneDetectionService(project_data)
+
+    saved = service._save(video_path, [scene_event(1500), scene_event(2500, score=0.9)], 0.0, 5.0)
+
+    assert saved["status"] == "success"
+    events = {event["id"]: event for event in project_data.load(video_path)["events"]}
+    assert set(events) == {"goal-1", f"{SOURCE}-cut-1500", f"{SOURCE}-cut-2500", f"{SOURCE}-cut-9000"}
+    assert events[f"{SOURCE}-cut-2500"]["score"] == 0.9
+
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="needs ffmpeg")
+def test_unreadable_video_fails_without_touching_saved_events(tmp_path):
+    video_path = str(tmp_path / "broken.mp4")
+    (tmp_path / "broken.mp4").write_bytes(b"\x00not a video" * 4096)
+    project_data = ProjectDataService()
+    project_data.save_events(video_path, [scene_event(1000)])
+    service = SceneDetectionService(project_data)
+
+    status = wait(service, service.start_detection(video_path, 0, 5)["task_id"])
+
+    assert status["status"] == "error"
+    assert [event["id"] for event in project_data.load(video_path)["events"]] == [f"{SOURCE}-cut-1000"]
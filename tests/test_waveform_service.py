@@ -0,0 +1,25 @@
+import numpy as np
+
+from backend.services.project_data_service import ProjectDataService
+from backend.services.waveform_service import SOURCE, WaveformIndex, WaveformService
+
+
+def test_saved_audio_peaks_replace_only_previous_peaks(tmp_path, monkeypatch):
+    video_path = str(tmp_path / "match.mp4")
+    (tmp_path / "match.mp4").write_bytes(b"")
+    project_data = ProjectDataService()
+    manual = {"id": "goal-1", "label": "Goal", "time_from": 2.0}
+    project_data.save_events(video_path, [manual, {"id": f"{SOURCE}-99000", "label": "Audio peak", "time_from": 99.0, "source": SOURCE}])
+    rms = np.full(6000, 300, dtype=np.int16)
+    rms[3000:3040] = 20000
+    index = WaveformIndex.__new__(WaveformIndex)
+    index.rms, index.block, index.sample_rate = rms, 480, 48000
+    service = WaveformService(project_data)
+    monkeypatch.setattr(service, "_index", lambda path: index)
+
+    result = service.get_audio_peaks(video_path, save=True)
+
+    assert result["status"] == "success"
+    assert result["events"]
+    saved = {event["id"] for event in project_data.load(video_path)["events"]}
+    assert saved == {"goal-1"} | {event["id"] for event in result["events"]}